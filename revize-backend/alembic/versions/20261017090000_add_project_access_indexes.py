@@ -0,0 +1,32 @@
+"""add project access indexes
+
+Revision ID: project_access_indexes
+Revises: catalog_component_items
+Create Date: 2026-10-17 09:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "project_access_indexes"
+down_revision = "catalog_component_items"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_project_user_link_user_project", "project_user_link", ["user_id", "project_id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_project_user_link_project_user", "project_user_link", ["project_id", "user_id"], if_not_exists=True
+    )
+    op.create_index("ix_projects_owner_id", "projects", ["owner_id"], if_not_exists=True)
+    op.create_index("ix_revisions_project_id", "revisions", ["project_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_revisions_project_id", table_name="revisions")
+    op.drop_index("ix_projects_owner_id", table_name="projects")
+    op.drop_index("ix_project_user_link_project_user", table_name="project_user_link")
+    op.drop_index("ix_project_user_link_user_project", table_name="project_user_link")
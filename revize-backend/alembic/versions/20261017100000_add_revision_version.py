@@ -0,0 +1,26 @@
+"""add revision version and content hash
+
+Revision ID: revision_version
+Revises: project_access_indexes
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_version"
+down_revision = "project_access_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # server_default doplní 1 všem existujícím revizím; content_hash se dopočte při prvním zápisu
+    op.add_column("revisions", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("revisions", sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("revisions", "content_hash")
+    op.drop_column("revisions", "version")
@@ -0,0 +1,82 @@
+"""add number sequences
+
+Revision ID: number_sequences
+Revises: revision_version
+Create Date: 2026-10-17 11:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "number_sequences"
+down_revision = "revision_version"
+branch_labels = None
+depends_on = None
+
+
+def _bump(counters, key, value):
+    if value > counters.get(key, 0):
+        counters[key] = value
+
+
+def upgrade():
+    op.create_table(
+        "number_sequences",
+        sa.Column("scope", sa.String(length=16), nullable=False),
+        sa.Column("owner_key", sa.Integer(), nullable=False),
+        sa.Column("prefix", sa.String(length=16), nullable=False, server_default=""),
+        sa.Column("year", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_value", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("scope", "owner_key", "prefix", "year"),
+    )
+
+    # jednorázový backfill z existujících čísel (stejné parsování jako dřív v routerech)
+    bind = op.get_bind()
+    counters = {}
+
+    for owner_id, number in bind.execute(sa.text("SELECT owner_id, number FROM projects WHERE owner_id IS NOT NULL")):
+        try:
+            _bump(counters, ("project", owner_id, "", 0), int(str(number or "").strip()))
+        except ValueError:
+            continue
+
+    # <prefix>-<year>-<projectNumber>-<seq>
+    for project_id, number in bind.execute(sa.text("SELECT project_id, number FROM revisions")):
+        parts = (number or "").split("-")
+        if len(parts) >= 4:
+            try:
+                _bump(counters, ("revision", project_id, parts[0][:16], int(parts[1])), int(parts[3]))
+            except ValueError:
+                continue
+
+    # VV-<projectNumber>-<seq>-<year>
+    if "vv_docs" in sa.inspect(bind).get_table_names():
+        for project_id, number in bind.execute(sa.text("SELECT project_id, number FROM vv_docs")):
+            parts = (number or "").split("-")
+            if len(parts) >= 4 and parts[0] == "VV":
+                try:
+                    _bump(counters, ("vv", project_id, "", int(parts[-1])), int(parts[2]))
+                except ValueError:
+                    continue
+
+    if counters:
+        table = sa.table(
+            "number_sequences",
+            sa.column("scope", sa.String),
+            sa.column("owner_key", sa.Integer),
+            sa.column("prefix", sa.String),
+            sa.column("year", sa.Integer),
+            sa.column("last_value", sa.Integer),
+        )
+        op.bulk_insert(
+            table,
+            [
+                {"scope": scope, "owner_key": owner_key, "prefix": prefix, "year": year, "last_value": value}
+                for (scope, owner_key, prefix, year), value in counters.items()
+            ],
+        )
+
+
+def downgrade():
+    op.drop_table("number_sequences")
@@ -0,0 +1,42 @@
+"""add revision summaries
+
+Revision ID: revision_summaries
+Revises: number_sequences
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_summaries"
+down_revision = "number_sequences"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "revision_summaries",
+        sa.Column("revision_id", sa.Integer(), sa.ForeignKey("revisions.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("board_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("component_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("defect_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("conclusion_safety", sa.String(length=20), nullable=True),
+        sa.Column("client_name", sa.String(), nullable=True),
+        sa.Column("next_revision_date", sa.Date(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_revision_summaries_defect_count", "revision_summaries", ["defect_count"])
+    op.create_index("ix_revision_summaries_conclusion_safety", "revision_summaries", ["conclusion_safety"])
+    op.create_index("ix_revision_summaries_client_name", "revision_summaries", ["client_name"])
+    op.create_index("ix_revision_summaries_next_revision_date", "revision_summaries", ["next_revision_date"])
+    # data existujících revizí doplní scripts/backfill_revision_summaries.py
+
+
+def downgrade():
+    op.drop_index("ix_revision_summaries_next_revision_date", table_name="revision_summaries")
+    op.drop_index("ix_revision_summaries_client_name", table_name="revision_summaries")
+    op.drop_index("ix_revision_summaries_conclusion_safety", table_name="revision_summaries")
+    op.drop_index("ix_revision_summaries_defect_count", table_name="revision_summaries")
+    op.drop_table("revision_summaries")
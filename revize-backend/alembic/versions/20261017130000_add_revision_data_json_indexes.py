@@ -0,0 +1,50 @@
+"""add revision data_json query indexes
+
+Revision ID: revision_json_indexes
+Revises: revision_summaries
+Create Date: 2026-10-17 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_json_indexes"
+down_revision = "revision_summaries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # data_json @> {...} (utils/revision_query.py)
+        op.create_index(
+            "ix_revisions_data_json_path_ops",
+            "revisions",
+            ["data_json"],
+            postgresql_using="gin",
+            postgresql_ops={"data_json": "jsonb_path_ops"},
+        )
+        # komprimované dokumenty jsou vždy kandidáti (OR data_json ? '__z__') – malý částečný index
+        op.create_index(
+            "ix_revisions_data_json_packed",
+            "revisions",
+            ["id"],
+            postgresql_where=sa.text("data_json ? '__z__'"),
+        )
+    elif bind.dialect.name == "sqlite":
+        op.create_index(
+            "ix_revisions_data_json_typ_revize",
+            "revisions",
+            [sa.text("json_extract(data_json, '$.typRevize')")],
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.drop_index("ix_revisions_data_json_packed", table_name="revisions")
+        op.drop_index("ix_revisions_data_json_path_ops", table_name="revisions")
+    elif bind.dialect.name == "sqlite":
+        op.drop_index("ix_revisions_data_json_typ_revize", table_name="revisions")
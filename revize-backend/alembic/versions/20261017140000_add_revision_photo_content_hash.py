@@ -0,0 +1,32 @@
+"""add revision photo content hash
+
+Revision ID: revision_photo_content_hash
+Revises: revision_json_indexes
+Create Date: 2026-10-17 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_photo_content_hash"
+down_revision = "revision_json_indexes"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # sloupec mohl přidat už start aplikace (main._ensure_runtime_tables)
+    if _has_column("revision_photos", "content_hash"):
+        return
+    # starší řádky zůstávají NULL (slabý ETag) – lokální úložiště dopočte
+    # scripts/normalize_photo_storage.py, GET fotky nic nepočítá ani nezapisuje
+    op.add_column("revision_photos", sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("revision_photos", "content_hash")
@@ -0,0 +1,33 @@
+"""add revision photo status
+
+Revision ID: revision_photo_status
+Revises: revision_photo_content_hash
+Create Date: 2026-10-17 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_photo_status"
+down_revision = "revision_photo_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pending = přímý upload do bucketu čeká na finalize (routers/revisions.py)
+    # sloupec i index mohl přidat už start aplikace (main._ensure_runtime_tables)
+    insp = sa.inspect(op.get_bind())
+    if "status" not in {c["name"] for c in insp.get_columns("revision_photos")}:
+        op.add_column(
+            "revision_photos",
+            sa.Column("status", sa.String(length=16), nullable=False, server_default="active"),
+        )
+    if "ix_revision_photos_status" not in {i["name"] for i in insp.get_indexes("revision_photos")}:
+        op.create_index("ix_revision_photos_status", "revision_photos", ["status"])
+
+
+def downgrade():
+    op.drop_index("ix_revision_photos_status", table_name="revision_photos")
+    op.drop_column("revision_photos", "status")
@@ -0,0 +1,46 @@
+"""add photo blobs
+
+Revision ID: photo_blobs
+Revises: revision_photo_status
+Create Date: 2026-10-17 16:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "photo_blobs"
+down_revision = "revision_photo_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    # obsahově adresované soubory fotek sdílené mezi revizemi (utils/photo_blobs.py);
+    # tabulku vytvářel i start aplikace před touto migrací
+    if not insp.has_table("photo_blobs"):
+        _create_photo_blobs()
+    # index content_hash zakládá i main._ensure_runtime_tables
+    if "ix_revision_photos_content_hash" not in {i["name"] for i in insp.get_indexes("revision_photos")}:
+        op.create_index("ix_revision_photos_content_hash", "revision_photos", ["content_hash"])
+
+
+def _create_photo_blobs():
+    op.create_table(
+        "photo_blobs",
+        sa.Column("content_hash", sa.String(length=64), primary_key=True),
+        sa.Column("source_hash", sa.String(length=64), nullable=True),
+        sa.Column("storage_key", sa.Text(), nullable=False),
+        sa.Column("mime_type", sa.String(), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_photo_blobs_source_hash", "photo_blobs", ["source_hash"])
+
+
+def downgrade():
+    op.drop_index("ix_revision_photos_content_hash", table_name="revision_photos")
+    op.drop_index("ix_photo_blobs_source_hash", table_name="photo_blobs")
+    op.drop_table("photo_blobs")
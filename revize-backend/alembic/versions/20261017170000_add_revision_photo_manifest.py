@@ -0,0 +1,30 @@
+"""add revision photo micro thumbnails and updated_at
+
+Revision ID: revision_photo_manifest
+Revises: photo_blobs
+Create Date: 2026-10-17 17:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "revision_photo_manifest"
+down_revision = "photo_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # manifest galerie (GET /revisions/{id}/photos/manifest)
+    # sloupce mohl přidat už start aplikace (main._ensure_runtime_tables)
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("revision_photos")}
+    if "micro_thumb" not in existing:
+        op.add_column("revision_photos", sa.Column("micro_thumb", sa.LargeBinary(), nullable=True))
+    if "updated_at" not in existing:
+        op.add_column("revision_photos", sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("revision_photos", "updated_at")
+    op.drop_column("revision_photos", "micro_thumb")
@@ -1,10 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import asyncio
 import os
 import sqlite3
+import threading
+import time
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util import await_only
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -12,24 +20,406 @@ DEFAULT_SQLITE_PATH = BASE_DIR / "projects.db"
 DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{DEFAULT_SQLITE_PATH.as_posix()}"
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_POSTGRES = DATABASE_URL.startswith("postgres")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+
+# ---------- Runtime profile ----------
+# DB_PROFILE vybírá sadu výchozích hodnot (development / production),
+# jednotlivé hodnoty lze přebít samostatnými env proměnnými.
+
+RUNTIME_PROFILES = {
+    "development": {
+        "sqlite": {
+            "journal_mode": "WAL",
+            "busy_timeout_ms": 5000,
+            "synchronous": "NORMAL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size_kib": 16 * 1024,
+            "single_writer": True,
+        },
+        "postgresql": {
+            "pool_size": 5,
+            "max_overflow": 10,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+            "statement_timeout_ms": 60000,
+        },
+    },
+    "production": {
+        "sqlite": {
+            "journal_mode": "WAL",
+            "busy_timeout_ms": 15000,
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size_kib": 64 * 1024,
+            "single_writer": True,
+        },
+        "postgresql": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 10,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+            "statement_timeout_ms": 15000,
+        },
+    },
+}
+
+_SQLITE_ENV = {
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "busy_timeout_ms": "SQLITE_BUSY_TIMEOUT_MS",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "cache_size_kib": "SQLITE_CACHE_SIZE_KIB",
+    "single_writer": "SQLITE_SINGLE_WRITER",
+}
+
+_POSTGRES_ENV = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+    "statement_timeout_ms": "DB_STATEMENT_TIMEOUT_MS",
+}
+
+
+def _coerce_env(raw: str, default):
+    if isinstance(default, bool):
+        return raw.strip().lower() in {"1", "true", "yes", "on"}
+    if isinstance(default, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return default
+    return raw.strip().upper()
+
+
+def _resolve_profile(name: str, dialect: str, env_map: dict) -> dict:
+    base = RUNTIME_PROFILES.get(name) or RUNTIME_PROFILES["development"]
+    settings = dict(base[dialect])
+    for key, env_name in env_map.items():
+        raw = os.getenv(env_name)
+        if raw is not None and raw.strip():
+            settings[key] = _coerce_env(raw, settings[key])
+    return settings
+
+
+DB_PROFILE = (os.getenv("DB_PROFILE") or "development").strip().lower()
+SQLITE_SETTINGS = _resolve_profile(DB_PROFILE, "sqlite", _SQLITE_ENV)
+POSTGRES_SETTINGS = _resolve_profile(DB_PROFILE, "postgresql", _POSTGRES_ENV)
+
+
+# ---------- Pool statistics ----------
+
+class PoolStats:
+    """Počítadla checkoutů a čekání na spojení z poolu (pro dimenzování concurrency)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.connects = 0
+            self.waits = 0
+            self.wait_total_s = 0.0
+            self.wait_max_s = 0.0
+            self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            # čekání pod 1 ms = spojení bylo v poolu volné
+            if seconds >= 0.001:
+                self.waits += 1
+            self.wait_total_s += seconds
+            self.wait_max_s = max(self.wait_max_s, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "connects": self.connects,
+                "waits": self.waits,
+                "wait_total_ms": round(self.wait_total_s * 1000, 3),
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+                "wait_avg_ms": round(self.wait_total_s * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "timeouts": self.timeouts,
+            }
+
+
+POOL_STATS = PoolStats()
+ASYNC_POOL_STATS = PoolStats()
+
+
+class _WaitTimingMixin:
+    """Měří dobu čekání na volné spojení z poolu."""
+
+    pool_stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.pool_stats.record_wait(time.perf_counter() - started)
+        return conn
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pool_stats = POOL_STATS
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pool_stats = ASYNC_POOL_STATS
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in {"sqlite://", "sqlite:///:memory:"} or "mode=memory" in url
+
+
+def _engine_kwargs(is_async: bool = False) -> dict:
+    poolclass = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    if IS_SQLITE:
+        kwargs: dict = {"connect_args": {"check_same_thread": False}}
+        if not _is_memory_sqlite(DATABASE_URL):
+            kwargs["poolclass"] = poolclass
+        return kwargs
+    if IS_POSTGRES:
+        connect_args: dict = {}
+        timeout_ms = int(POSTGRES_SETTINGS["statement_timeout_ms"] or 0)
+        if timeout_ms > 0:
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(timeout_ms)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+        return {
+            "poolclass": poolclass,
+            "pool_size": POSTGRES_SETTINGS["pool_size"],
+            "max_overflow": POSTGRES_SETTINGS["max_overflow"],
+            "pool_timeout": POSTGRES_SETTINGS["pool_timeout"],
+            "pool_recycle": POSTGRES_SETTINGS["pool_recycle"],
+            "pool_pre_ping": POSTGRES_SETTINGS["pool_pre_ping"],
+            "connect_args": connect_args,
+        }
+    return {}
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs())
+
+
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    POOL_STATS.record_connect()
+
+
+@event.listens_for(engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_STATS.record_checkout()
+
+
+@event.listens_for(engine, "checkin")
+def _count_checkin(dbapi_connection, connection_record):
+    POOL_STATS.record_checkin()
 
 
 @event.listens_for(Engine, "connect")
 def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
     if isinstance(dbapi_connection, sqlite3.Connection):
-        cursor = dbapi_connection.cursor()
+        apply_sqlite_pragmas(dbapi_connection)
+
+
+def apply_sqlite_pragmas(dbapi_connection) -> None:
+    settings = SQLITE_SETTINGS
+    cursor = dbapi_connection.cursor()
+    try:
         cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout_ms'])}")
+        if settings["journal_mode"]:
+            cursor.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+        if settings["synchronous"]:
+            cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+        # záporná hodnota = velikost v KiB (ne v počtu stránek)
+        cursor.execute(f"PRAGMA cache_size=-{abs(int(settings['cache_size_kib']))}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
         cursor.close()
 
 
+# ---------- SQLite single-writer path ----------
+
+class SqliteWriterBusy(RuntimeError):
+    """Zápisový zámek SQLite se nepodařilo získat do timeoutu – klient má zkusit později (503)."""
+
+
+class AsyncBackedSession(Session):
+    """Sync session uvnitř AsyncSession – zámek zápisu na ni čeká mimo event loop."""
+
+
+class SqliteWriteGate:
+    """
+    Serializuje zapisující transakce v rámci procesu (sync i async session).
+    SQLite povoluje jen jednoho zapisovatele; místo soubojů o zámek souboru
+    (``database is locked``) čekají zápisy ve frontě na procesním zámku. Čtení
+    ve WAL režimu neblokuje. Async session čeká ve vlákně (event loop neblokuje);
+    kdo se zámku nedočká do timeoutu, dostane SqliteWriterBusy.
+    """
+
+    _INFO_KEY = "_sqlite_write_gate"
+
+    def __init__(self, timeout_s: float, async_waiters: int = 16) -> None:
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._waiters = ThreadPoolExecutor(max_workers=async_waiters, thread_name_prefix="sqlite-writer")
+        self.timeout_s = timeout_s
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def _release_abandoned(self, future) -> None:
+        # čekající async požadavek byl zrušen, ale vlákno zámek mezitím získalo
+        if not future.cancelled() and future.exception() is None and future.result():
+            self._lock.release()
+
+    async def _acquire_async(self) -> bool:
+        deadline = time.monotonic() + self.timeout_s
+        future = self._waiters.submit(lambda: self._lock.acquire(timeout=max(0.0, deadline - time.monotonic())))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._release_abandoned)
+            raise
+
+    def acquire(self, session: Session) -> None:
+        if session.info.get(self._INFO_KEY):
+            return
+        started = time.perf_counter()
+        contended = not self._lock.acquire(blocking=False)
+        ok = True
+        if contended:
+            if isinstance(session, AsyncBackedSession):
+                ok = await_only(self._acquire_async())
+            else:
+                ok = self._lock.acquire(timeout=self.timeout_s)
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.acquired += 1 if ok else 0
+            self.contended += 1 if contended else 0
+            self.timeouts += 0 if ok else 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+        if not ok:
+            raise SqliteWriterBusy(f"SQLite writer busy for {waited:.1f}s")
+        session.info[self._INFO_KEY] = True
+
+    def release(self, session: Session) -> None:
+        if session.info.pop(self._INFO_KEY, False):
+            self._lock.release()
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "acquired": self.acquired,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total_s * 1000, 3),
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+            }
+
+
+def _gate_before_flush(session, flush_context, instances):
+    WRITE_GATE.acquire(session)
+
+
+def _gate_orm_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        WRITE_GATE.acquire(orm_execute_state.session)
+
+
+def _gate_release(session, transaction):
+    if transaction.parent is None:
+        WRITE_GATE.release(session)
+
+
+def _register_write_gate(target) -> None:
+    event.listen(target, "before_flush", _gate_before_flush)
+    event.listen(target, "do_orm_execute", _gate_orm_dml)
+    event.listen(target, "after_transaction_end", _gate_release)
+
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+WRITE_GATE = (
+    SqliteWriteGate(int(SQLITE_SETTINGS["busy_timeout_ms"]) / 1000.0)
+    if IS_SQLITE and SQLITE_SETTINGS["single_writer"]
+    else None
+)
+
+if WRITE_GATE is not None:
+    _register_write_gate(SessionLocal)
+    _register_write_gate(AsyncBackedSession)
+
+
+def database_runtime_stats() -> dict:
+    """Aktuální profil, nastavení a statistiky poolu (bez přihlašovacích údajů)."""
+    if IS_SQLITE:
+        dialect, settings = "sqlite", SQLITE_SETTINGS
+    elif IS_POSTGRES:
+        dialect, settings = "postgresql", POSTGRES_SETTINGS
+    else:
+        dialect, settings = engine.dialect.name, {}
+    stats = {
+        "profile": DB_PROFILE,
+        "dialect": dialect,
+        "settings": dict(settings),
+        "pool": {
+            "class": type(engine.pool).__name__,
+            "status": engine.pool.status(),
+            **POOL_STATS.snapshot(),
+        },
+    }
+    if async_engine is not None:
+        stats["async_pool"] = {
+            "class": type(async_engine.pool).__name__,
+            "status": async_engine.pool.status(),
+            **ASYNC_POOL_STATS.snapshot(),
+        }
+    if WRITE_GATE is not None:
+        stats["sqlite_writer"] = WRITE_GATE.snapshot()
+    return stats
+
 
 def get_db():
     db: Session = SessionLocal()
@@ -37,3 +427,62 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------- Async engine (asyncpg / aiosqlite) ----------
+# Hot endpointy revizí běží nativně async, aby nedržely vlákna threadpoolu
+# Starlette při čekání na DB (a nevyhladověly je pomalé exporty).
+
+def _async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+", 1)[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if driver in {"postgresql", "postgres"}:
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+
+try:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs(is_async=True))
+except ImportError:  # pragma: no cover - chybí aiosqlite / asyncpg
+    async_engine = None
+
+AsyncSessionLocal = (
+    async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=AsyncBackedSession,
+    )
+    if async_engine is not None
+    else None
+)
+
+if async_engine is not None:
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _async_connect(dbapi_connection, connection_record):
+        ASYNC_POOL_STATS.record_connect()
+        if IS_SQLITE:
+            apply_sqlite_pragmas(dbapi_connection)
+
+    @event.listens_for(async_engine.sync_engine, "checkout")
+    def _async_checkout(dbapi_connection, connection_record, connection_proxy):
+        ASYNC_POOL_STATS.record_checkout()
+
+    @event.listens_for(async_engine.sync_engine, "checkin")
+    def _async_checkin(dbapi_connection, connection_record):
+        ASYNC_POOL_STATS.record_checkin()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async DB driver is not installed (aiosqlite / asyncpg)")
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
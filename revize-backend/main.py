@@ -1,14 +1,15 @@
 ﻿from fastapi import FastAPI, Depends
 from dotenv import load_dotenv
 from fastapi import Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routers.auth import router as auth_router, get_current_user
 from routers.catalog   import router as catalog_router
 from routers.defects   import router as defects_router
 from routers.models_router    import router as models_router
 from routers.projects  import router as projects_router
-from routers.revisions import router as revisions_router
-from routers.deps import get_current_user   
+from routers.revisions import router as revisions_router, notifications_router as photo_notifications_router
+from routers.deps import get_current_user, get_current_user_async, invalidate_user_cache
 from routers.cables import router as cables_router
 from routers.devices import router as devices_router
 from routers.users import router as users_router
@@ -19,9 +20,14 @@ from routers.admin import router as admin_router
 from routers.snippets import router as snippets_router
 from routers.norms import router as norms_router
 from routers.inspection_templates import router as inspection_templates_router
+from utils.image_pipeline import IMAGE_POOL
+from utils.upload_limits import BodySizeLimitMiddleware
+from database import WRITE_GATE, SqliteWriterBusy
 
 load_dotenv()
 app = FastAPI() 
+# limity velikosti uploadů (registrují routery) – uvnitř CORS, aby 413 neslo CORS hlavičky
+app.add_middleware(BodySizeLimitMiddleware)
 
 
 # â­ CORS â€“ povol frontend na 5173
@@ -92,6 +98,18 @@ async def _cors_fallback(request: Request, call_next):
 
     return response
 
+
+@app.exception_handler(SqliteWriterBusy)
+async def _sqlite_writer_busy(request: Request, exc: SqliteWriterBusy):
+    # zápisový zámek SQLite se neuvolnil do busy_timeout – ať klient zkusí znovu
+    retry_after = max(1, round(WRITE_GATE.timeout_s)) if WRITE_GATE is not None else 1
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, retry later"},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
 # veĹ™ejnĂ© endpointy (auth)
 app.include_router(auth_router)
 
@@ -100,7 +118,7 @@ app.include_router(catalog_router,   dependencies=[Depends(get_current_user)])
 app.include_router(defects_router,   dependencies=[Depends(get_current_user)])
 app.include_router(models_router,    dependencies=[Depends(get_current_user)])
 app.include_router(projects_router,  dependencies=[Depends(get_current_user)])
-app.include_router(revisions_router, dependencies=[Depends(get_current_user)])
+app.include_router(revisions_router, dependencies=[Depends(get_current_user_async)])
 app.include_router(cables_router, dependencies=[Depends(get_current_user)])
 app.include_router(users_router, dependencies=[Depends(get_current_user)]) 
 app.include_router(companies_router, dependencies=[Depends(get_current_user)]) 
@@ -112,6 +130,8 @@ app.include_router(norms_router, dependencies=[Depends(get_current_user)])
 app.include_router(inspection_templates_router, dependencies=[Depends(get_current_user)])
 # Admin router Ĺ™eĹˇĂ­ autorizaci uvnitĹ™ handlerĹŻ; neblokuj CORS preflight pĹ™es globĂˇlnĂ­ dependency
 app.include_router(admin_router)
+# notifikace bucketu (Pub/Sub push) – ověřuje token v URL, ne JWT
+app.include_router(photo_notifications_router)
 
 
 @app.on_event("startup")
@@ -121,6 +141,24 @@ def _ensure_runtime_tables():
         defect_cols = {column["name"] for column in inspect(conn).get_columns("defects")}
         if defect_cols and "citation" not in defect_cols:
             conn.exec_driver_sql("ALTER TABLE defects ADD COLUMN citation TEXT")
+        photo_cols = {column["name"] for column in inspect(conn).get_columns("revision_photos")}
+        if photo_cols and "content_hash" not in photo_cols:
+            conn.exec_driver_sql("ALTER TABLE revision_photos ADD COLUMN content_hash VARCHAR(64)")
+        if photo_cols:
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_revision_photos_content_hash ON revision_photos (content_hash)")
+        if photo_cols and "micro_thumb" not in photo_cols:
+            blob_type = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+            conn.exec_driver_sql(f"ALTER TABLE revision_photos ADD COLUMN micro_thumb {blob_type}")
+        if photo_cols and "updated_at" not in photo_cols:
+            conn.exec_driver_sql("ALTER TABLE revision_photos ADD COLUMN updated_at TIMESTAMP")
+        if photo_cols and "status" not in photo_cols:
+            conn.exec_driver_sql("ALTER TABLE revision_photos ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'active'")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_revision_photos_status ON revision_photos (status)")
+
+
+@app.on_event("shutdown")
+def _shutdown_image_pool():
+    IMAGE_POOL.shutdown()
 
 from fastapi import HTTPException, status
 from typing import Optional
@@ -145,6 +183,7 @@ def _delete_user_fallback(uid: int, db: Session = Depends(get_db), user: UserMod
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found")
     db.delete(target)
     db.commit()
+    invalidate_user_cache(user_id=uid)
     return {"ok": True, "id": uid}
 
 @app.post("/admin/users/delete")
@@ -155,4 +194,5 @@ def _delete_user_post_fallback(payload: _DeleteUserPayload, db: Session = Depend
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found")
     db.delete(target)
     db.commit()
+    invalidate_user_cache(user_id=payload.id)
     return {"ok": True, "id": payload.id}
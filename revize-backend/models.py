@@ -7,7 +7,7 @@ import uuid as _uuid
 
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Text, Boolean,
-    ForeignKey, Table, UniqueConstraint, Date, DateTime,
+    ForeignKey, Table, UniqueConstraint, Index, Date, DateTime, LargeBinary,
     Enum, TIMESTAMP, func
 )
 from sqlalchemy.orm import relationship
@@ -15,6 +15,7 @@ from sqlalchemy import JSON  # works on both SQLite & Postgres
 from sqlalchemy.ext.mutable import MutableDict
 
 from database import Base
+from utils.compressed_json import CompressedJSON
 
 # --- Dialect-aware helpers (Postgres vs SQLite) ---
 POSTGRES = False
@@ -40,6 +41,9 @@ project_user_link = Table(
     Base.metadata,
     Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
     Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    # EXISTS kontrola přístupu (routers/access.py) jde přes (user_id, project_id)
+    Index("ix_project_user_link_user_project", "user_id", "project_id"),
+    Index("ix_project_user_link_project_user", "project_id", "user_id"),
 )
 
 
@@ -104,7 +108,7 @@ class Project(Base):
     address = Column(String, nullable=False)
     client  = Column(String, nullable=False)
 
-    owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
     owner    = relationship("User", back_populates="projects")
 
     shared_with_users = relationship(
@@ -135,15 +139,40 @@ class Revision(Base):
     conclusion_valid_until = Column(String, default="")
 
     # JSON (SQLite) / JSONB (Postgres) – mutable pro pohodlné PATCHe
+    # velké dokumenty se volitelně ukládají komprimovaně (utils/compressed_json.py)
+    # dotazové indexy (GIN jsonb_path_ops / json_extract) jsou jen v migraci revision_json_indexes
     data_json = Column(
-        MutableDict.as_mutable(JSONType if JSONType is not None else JSON),
+        MutableDict.as_mutable(CompressedJSON(JSONType if JSONType is not None else JSON)),
         nullable=False,
         default=dict,  # ORM default (server_default řeš migracemi dle DB)
     )
 
-    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     project    = relationship("Project", back_populates="revisions")
     photos     = relationship("RevisionPhoto", back_populates="revision", cascade="all, delete-orphan")
+    # souhrn z data_json – zapisuje ho utils/revision_summary.py při změně dokumentu
+    summary    = relationship("RevisionSummary", uselist=False, viewonly=True)
+
+    # verze dokumentu (ETag / If-Match) – zvyšuje se při každém zápisu, viz _touch_revision
+    version      = Column(Integer, nullable=False, default=1, server_default="1")
+    content_hash = Column(String(64), nullable=True)  # sha256 kanonického data_json
+
+    # UPDATE ... WHERE version = <načtená>; souběžný zápis skončí StaleDataError
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+# 📊 Denormalizovaný souhrn data_json pro seznamy a filtry (utils/revision_summary.py)
+class RevisionSummary(Base):
+    __tablename__ = "revision_summaries"
+
+    revision_id        = Column(Integer, ForeignKey("revisions.id", ondelete="CASCADE"), primary_key=True)
+    board_count        = Column(Integer, nullable=False, default=0)
+    component_count    = Column(Integer, nullable=False, default=0)
+    defect_count       = Column(Integer, nullable=False, default=0, index=True)
+    conclusion_safety  = Column(String(20), nullable=True, index=True)
+    client_name        = Column(String, nullable=True, index=True)
+    next_revision_date = Column(Date, nullable=True, index=True)
+    updated_at         = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 
 class RevisionPhoto(Base):
@@ -157,11 +186,32 @@ class RevisionPhoto(Base):
     mime_type = Column(String, nullable=False, default="application/octet-stream")
     file_size = Column(BigInteger, nullable=False, default=0)
     file_path = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 uloženého souboru (ETag); starší fotky dopočte scripts/normalize_photo_storage.py
+    # "pending" = vydaná upload URL pro přímý upload do bucketu, ještě nefinalizováno; jinak "active"
+    status = Column(String(16), nullable=False, default="active", server_default="active", index=True)
+    # mikronáhled pro manifest galerie (JPEG, b"" = nečitelný obrázek); chybějící dopočte IMAGE_POOL na pozadí GET manifestu
+    micro_thumb = Column(LargeBinary, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # každá změna řádku (upload, popisek, finalize) – otisk pro cache manifestu
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     revision = relationship("Revision", back_populates="photos")
 
 
+class PhotoBlob(Base):
+    """Obsahově adresovaný soubor fotky sdílený více řádky revision_photos (utils/photo_blobs.py)."""
+    __tablename__ = "photo_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 uloženého souboru
+    source_hash = Column(String(64), nullable=True, index=True)  # sha256 nahraného originálu (dedup před zpracováním)
+    storage_key = Column(Text, nullable=False)  # hodnota RevisionPhoto.file_path všech odkazujících řádků
+    mime_type = Column(String, nullable=False, default="application/octet-stream")
+    file_size = Column(BigInteger, nullable=False, default=0)
+    # počet řádků revision_photos s (content_hash, file_path=storage_key); drží mapper eventy
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 # 🔧 Defect catalog + workflow
 import enum as _enum
 
@@ -462,7 +512,7 @@ class VvDoc(Base):
     number     = Column(String(32), unique=True, nullable=False)
 
     # JSON protokolu (stejný přístup jako Revision.data_json)
-    data_json  = Column(MutableDict.as_mutable(JSON), nullable=False, default=dict)
+    data_json  = Column(MutableDict.as_mutable(CompressedJSON(JSON)), nullable=False, default=dict)
 
     # vazba na projekt (přístup se kontroluje stejně jako u revizí)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
@@ -470,3 +520,15 @@ class VvDoc(Base):
 
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# 🔢 Poslední přidělená evidenční čísla (utils/numbering.py)
+class NumberSequence(Base):
+    __tablename__ = "number_sequences"
+
+    # project: owner_key = owner_id | revision, vv: owner_key = project_id
+    scope      = Column(String(16), primary_key=True)
+    owner_key  = Column(Integer, primary_key=True)
+    prefix     = Column(String(16), primary_key=True, default="")
+    year       = Column(Integer, primary_key=True, default=0)
+    last_value = Column(Integer, nullable=False, default=0)
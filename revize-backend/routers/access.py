@@ -0,0 +1,80 @@
+# routers/access.py
+"""
+Sdílená kontrola přístupu k projektům: vlastník projektu, nebo uživatel,
+se kterým je projekt sdílen (project_user_link). Používá EXISTS místo
+outerjoin + DISTINCT, takže nenásobí řádky ani nenačítá seznam sdílených uživatelů.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Project, User as UserModel, project_user_link
+
+# rozhodnutí se pamatují v session.info – session žije jeden request
+_MEMO_KEY = "project_access_memo"
+
+
+def shared_with_clause(user_id: int, project_id_col: Any = Project.id):
+    """EXISTS (projekt je sdílen s uživatelem)."""
+    return exists().where(
+        project_user_link.c.project_id == project_id_col,
+        project_user_link.c.user_id == user_id,
+    )
+
+
+def project_access_clause(user_id: int):
+    """Predikát pro dotazy nad `projects`: vlastník, nebo sdíleno."""
+    return or_(Project.owner_id == user_id, shared_with_clause(user_id))
+
+
+def _access_memo(db: Session | AsyncSession) -> Dict[Tuple[int, int], bool]:
+    return db.info.setdefault(_MEMO_KEY, {})
+
+
+def _access_stmt(user_id: int, project_id: int):
+    return select(Project.owner_id, shared_with_clause(user_id, project_id)).where(Project.id == project_id)
+
+
+def _decide(row: Any, user_id: int) -> bool:
+    if row is None:
+        return False
+    owner_id, is_shared = row
+    return owner_id == user_id or bool(is_shared)
+
+
+def can_access_project(db: Session, user: UserModel, project_id: int) -> bool:
+    key = (user.id, project_id)
+    memo = _access_memo(db)
+    if key not in memo:
+        memo[key] = _decide(db.execute(_access_stmt(user.id, project_id)).first(), user.id)
+    return memo[key]
+
+
+def ensure_project_access_or_404(db: Session, pid: int, user: UserModel) -> Project:
+    prj = db.get(Project, pid)
+    if not prj:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if not can_access_project(db, user, prj.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return prj
+
+
+async def acan_access_project(db: AsyncSession, user: UserModel, project_id: int) -> bool:
+    key = (user.id, project_id)
+    memo = _access_memo(db)
+    if key not in memo:
+        row = (await db.execute(_access_stmt(user.id, project_id))).first()
+        memo[key] = _decide(row, user.id)
+    return memo[key]
+
+
+def forget_project_access(db: Session | AsyncSession, project_id: int) -> None:
+    """Po změně sdílení projektu v rámci stejného requestu."""
+    memo = _access_memo(db)
+    for key in [k for k in memo if k[1] == project_id]:
+        del memo[key]
@@ -10,10 +10,15 @@ from sqlalchemy.orm import Session, joinedload, defer
 from sqlalchemy import inspect
 from sqlalchemy.exc import IntegrityError
 
-from database import get_db
+from database import database_runtime_stats, get_db
 from models import User as UserModel, Revision, Defect, Project, VvDoc, SnippetPreference, UserInstrument, CompanyProfile, project_user_link
 from routers.auth import get_current_user
+from routers.deps import auth_cache_stats, invalidate_user_cache
 from schemas import DefectRead
+from utils.compressed_json import compression_stats
+from utils.image_pipeline import image_pool_stats
+from utils.gcs_urls import signed_url_stats
+from utils.photo_manifest import manifest_cache_stats
 from utils.security import hash_password
 from utils.ticr_client import verify_against_ticr
 from utils.mailersend import send_email
@@ -29,6 +34,19 @@ def _ensure_admin(user: UserModel) -> None:
 # Revisions / Projects overview
 # ---------------------------------------------------------------------------
 
+def _revision_summary_dict(summary) -> Optional[dict]:
+    if summary is None:
+        return None
+    return {
+        "board_count": summary.board_count,
+        "component_count": summary.component_count,
+        "defect_count": summary.defect_count,
+        "conclusion_safety": summary.conclusion_safety,
+        "client_name": summary.client_name,
+        "next_revision_date": summary.next_revision_date.isoformat() if summary.next_revision_date else None,
+    }
+
+
 @router.get("/revisions")
 def list_all_revisions(
     db: Session = Depends(get_db),
@@ -39,7 +57,7 @@ def list_all_revisions(
     _ensure_admin(user)
     query = (
         db.query(Revision)
-        .options(joinedload(Revision.project), defer(Revision.data_json))
+        .options(joinedload(Revision.project), joinedload(Revision.summary), defer(Revision.data_json))
         .order_by(Revision.id.desc())
     )
     if status_filter:
@@ -57,6 +75,7 @@ def list_all_revisions(
             "status": rev.status,
             "date_done": rev.date_done.isoformat() if getattr(rev, "date_done", None) else None,
             "valid_until": rev.valid_until.isoformat() if getattr(rev, "valid_until", None) else None,
+            "summary": _revision_summary_dict(rev.summary),
         }
         for rev in rows
     ]
@@ -188,6 +207,23 @@ def list_vv_for_project(
         for doc in vv_rows
     ]
 
+# ---------------------------------------------------------------------------
+# Runtime diagnostics
+# ---------------------------------------------------------------------------
+
+@router.get("/runtime/stats")
+def runtime_stats(user: UserModel = Depends(get_current_user)):
+    """Statistiky DB poolu a zápisů – podklad pro nastavení concurrency na Cloud Run."""
+    _ensure_admin(user)
+    return {
+        "database": database_runtime_stats(),
+        "auth_cache": auth_cache_stats(),
+        "json_compression": compression_stats(),
+        "image_pool": image_pool_stats(),
+        "signed_urls": signed_url_stats(),
+        "photo_manifests": manifest_cache_stats(),
+    }
+
 # ---------------------------------------------------------------------------
 # Users management
 # ---------------------------------------------------------------------------
@@ -323,6 +359,7 @@ def verify_user(
     target.verification_token = None
     db.add(target)
     db.commit()
+    invalidate_user_cache(user_id=uid)
     return {"id": target.id, "is_verified": True}
 
 
@@ -339,6 +376,7 @@ def reject_user(
     target.is_verified = False
     db.add(target)
     db.commit()
+    invalidate_user_cache(user_id=uid)
     return {"id": target.id, "is_verified": False}
 
 
@@ -403,6 +441,7 @@ def patch_user(
 
     db.add(target)
     db.commit()
+    invalidate_user_cache(user_id=uid)
     db.refresh(target)
     return {
         "id": target.id,
@@ -448,6 +487,7 @@ def delete_user(
 
         db.delete(target)
         db.commit()
+        invalidate_user_cache(user_id=uid)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Uzivatele nelze smazat kvuli vazbam v databazi.")
@@ -11,7 +11,7 @@ import logging
 from database import get_db
 from models import User
 from utils.security import hash_password, verify_password, create_access_token
-from routers.deps import get_current_user
+from routers.deps import get_current_user, invalidate_user_cache
 from utils.ticr_client import verify_against_ticr
 from utils.mailersend import send_verification_email
 
@@ -184,5 +184,6 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     user.is_verified = True
     user.verification_token = None
     db.commit()
+    invalidate_user_cache(user_id=user.id)
     return {"ok": True}
 
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from database import get_db
 from routers.auth import get_current_user
+from routers.deps import invalidate_user_cache
 from models import User, CompanyProfile  # ← používáme CompanyProfile
 from schemas import (
     CompanyProfileRead,
@@ -65,6 +66,7 @@ def create_company(
     if getattr(user, "active_company_id", None) in (None, 0):
         user.active_company_id = row.id
         db.commit()
+        invalidate_user_cache(user.email, user.id)
 
     return _to_schema(row)
 
@@ -113,4 +115,5 @@ def delete_company(
         )
         user.active_company_id = other.id if other else None
         db.commit()
+        invalidate_user_cache(user.email, user.id)
     # 204 No Content – bez těla
@@ -1,34 +1,137 @@
 # routers/deps.py
+import os
+import time
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 import jwt  # PyJWT
-from database import get_db
+from database import get_async_db, get_db
 from models import User
 from utils.security import decode_access_token  # tvoje funkce z security.py
+from utils.ttl_cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exc = HTTPException(
+# Krátkodobá cache: token -> sub a sub -> snímek řádku users.
+# Zápisy do users v tomto procesu cache invalidují (invalidate_user_cache),
+# změny z jiných instancí se projeví nejpozději po AUTH_USER_CACHE_TTL sekundách.
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "2048"))
+
+_token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# velké / často měněné sloupce se necachují – při přístupu se dotáhnou z DB
+_UNCACHED_USER_COLUMNS = {"instruments_json"}
+
+
+def _user_snapshot(user: User) -> dict:
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in sa_inspect(User).column_attrs
+        if attr.key not in _UNCACHED_USER_COLUMNS
+    }
+
+
+def _detached_user(snapshot: dict) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def _attach_cached_user(db: Session, snapshot: dict) -> User:
+    """Připoj snímek do session jako persistentní objekt bez SELECTu."""
+    return db.merge(_detached_user(snapshot), load=False)
+
+
+def _decode_sub(token: str, credentials_exc: HTTPException) -> str:
+    sub = _token_cache.get(token)
+    if sub is not None:
+        return sub
+
+    payload = decode_access_token(token)  # zvedne výjimky, když je token špatný/expir.
+    sub = payload.get("sub")
+    if not sub:
+        raise credentials_exc
+
+    exp = payload.get("exp")
+    ttl: Optional[float] = None
+    if exp is not None:
+        ttl = float(exp) - time.time()
+    _token_cache.set(token, sub, ttl=ttl)
+    return sub
+
+
+def invalidate_user_cache(email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+    """Zahoď cachovaný řádek uživatele (po změně nebo smazání v DB)."""
+    if email:
+        _user_cache.pop(email)
+    if user_id is not None:
+        _user_cache.discard_where(lambda _key, snap: snap.get("id") == user_id)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "users": _user_cache.stats()}
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate token",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    credentials_exc = _credentials_exception()
     try:
-        payload = decode_access_token(token)  # zvedne výjimky, když je token špatný/expir.
-        sub = payload.get("sub")
-        if not sub:
-            raise credentials_exc
+        sub = _decode_sub(token, credentials_exc)
+
+        cached = _user_cache.get(sub)
+        if cached is not None:
+            return _attach_cached_user(db, cached)
 
         # sub = email (tak to děláme při loginu)
         user = db.query(User).filter(User.email == sub).first()
         if not user:
             raise credentials_exc
 
+        _user_cache.set(sub, _user_snapshot(user))
+        return user
+
+    except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+        raise credentials_exc
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """
+    Varianta pro async endpointy: sdílí cache s get_current_user a z DB čte přes
+    async session, takže požadavek nezabere vlákno threadpoolu ani sync spojení.
+    Nekešované sloupce (instruments_json) se v async session líně nenačtou.
+    """
+    credentials_exc = _credentials_exception()
+    try:
+        sub = _decode_sub(token, credentials_exc)
+
+        cached = _user_cache.get(sub)
+        if cached is not None:
+            return await db.merge(_detached_user(cached), load=False)
+
+        user = (await db.execute(select(User).where(User.email == sub).limit(1))).scalars().first()
+        if not user:
+            raise credentials_exc
+
+        _user_cache.set(sub, _user_snapshot(user))
         return user
 
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
@@ -1,17 +1,22 @@
 ﻿# routers/projects.py
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import date
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from sqlalchemy import or_
+from sqlalchemy import case, func, or_, select
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Project, User as UserModel
+from models import Project, Revision, RevisionPhoto, User as UserModel, project_user_link
+from routers.access import ensure_project_access_or_404, forget_project_access, project_access_clause
 from routers.auth import get_current_user
-from schemas import ProjectRead
+from routers.revisions import PHOTO_ACTIVE, stream_photo_zip
+from utils import photo_zip
+from utils.numbering import generate_project_number
+from schemas import ProjectIndexItem, ProjectIndexPage, ProjectRead
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -56,44 +61,7 @@ def _query_user_projects(db: Session, user_id: int):
     - je vlastníkem (owner_id)
     - je mezi 'shared_with_users'
     """
-    return (
-        db.query(Project)
-        .outerjoin(Project.shared_with_users)  # type: ignore[attr-defined]
-        .filter(or_(Project.owner_id == user_id, UserModel.id == user_id))
-        .distinct()
-    )
-
-
-def _ensure_project_access_or_404(db: Session, pid: int, user: UserModel) -> Project:
-    prj = db.get(Project, pid)
-    if not prj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-
-    # přístup, pokud je vlastník, nebo je sdílen
-    shared_ids = {u.id for u in getattr(prj, "shared_with_users", [])}
-    if prj.owner_id != user.id and user.id not in shared_ids:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return prj
-
-
-def _generate_project_number(db: Session, owner_id: int) -> str:
-    rows = (
-        db.query(Project.number)
-        .filter(Project.owner_id == owner_id)
-        .all()
-    )
-
-    max_seq = 0
-    for (number,) in rows:
-        raw = str(number or "").strip()
-        if not raw:
-            continue
-        try:
-            max_seq = max(max_seq, int(raw))
-        except ValueError:
-            continue
-
-    return str(max_seq + 1)
+    return db.query(Project).filter(project_access_clause(user_id))
 
 
 def _ensure_project_number(db: Session, project: Project) -> Project:
@@ -104,11 +72,21 @@ def _ensure_project_number(db: Session, project: Project) -> Project:
     if owner_id is None:
         project.number = str(project.id)
     else:
-        project.number = _generate_project_number(db, owner_id)
+        project.number = generate_project_number(db, owner_id)
     db.add(project)
     return project
 
 
+def _as_date(value) -> Optional[date]:
+    # agregace (MIN/MAX) nad SQLite vrací ISO string místo date
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
 # --------- Routes ---------
 @router.get("", response_model=List[ProjectRead])
 def list_projects(
@@ -132,6 +110,106 @@ def list_projects(
     return projects
 
 
+INDEX_DEFAULT_LIMIT = 50
+INDEX_MAX_LIMIT = 200
+
+
+@router.get("/index", response_model=ProjectIndexPage)
+def list_project_index(
+    db: Session = Depends(get_db),
+    user: UserModel = Depends(get_current_user),
+    q: Optional[str] = Query(None),
+    limit: int = Query(INDEX_DEFAULT_LIMIT, ge=1, le=INDEX_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+):
+    """
+    Lehký přehled projektů (vlastněné i nasdílené) bez vložených revizí.
+    Ke každému projektu vrací počty revizí podle stavu, poslední `date_done`,
+    nejbližší budoucí `valid_until` a počet uživatelů se sdílením.
+    Stránkuje se kurzorem (`next_cursor`), `?q=` hledá v adrese, objednateli a čísle.
+    Počet dotazů je konstantní (stránka projektů + jeden seskupený dotaz na revize).
+    """
+    shared_count = (
+        select(func.count())
+        .select_from(project_user_link)
+        .where(project_user_link.c.project_id == Project.id)
+        .correlate(Project)
+        .scalar_subquery()
+    )
+    query = (
+        db.query(
+            Project.id,
+            Project.number,
+            Project.address,
+            Project.client,
+            Project.owner_id,
+            shared_count.label("shared_user_count"),
+        )
+        .filter(project_access_clause(user.id))
+    )
+    if q and q.strip():
+        like = f"%{q.strip().lower()}%"
+        query = query.filter(
+            or_(
+                func.lower(Project.address).like(like),
+                func.lower(Project.client).like(like),
+                func.lower(Project.number).like(like),
+            )
+        )
+    if cursor:
+        try:
+            query = query.filter(Project.id < int(cursor))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    rows = query.order_by(Project.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1].id)
+
+    items: Dict[int, ProjectIndexItem] = {
+        row.id: ProjectIndexItem(
+            id=row.id,
+            number=row.number,
+            address=row.address,
+            client=row.client,
+            owner_id=row.owner_id,
+            is_owner=row.owner_id == user.id,
+            shared_user_count=row.shared_user_count or 0,
+        )
+        for row in rows
+    }
+
+    if items:
+        today = date.today()
+        aggregates = (
+            db.query(
+                Revision.project_id,
+                Revision.status,
+                func.count(Revision.id),
+                func.max(Revision.date_done),
+                func.min(case((Revision.valid_until >= today, Revision.valid_until))),
+            )
+            .filter(Revision.project_id.in_(list(items)))
+            .group_by(Revision.project_id, Revision.status)
+            .all()
+        )
+        for project_id, status_value, count, latest_done, nearest_valid in aggregates:
+            item = items[project_id]
+            item.revision_count += count
+            key = status_value or ""
+            item.revision_counts[key] = item.revision_counts.get(key, 0) + count
+            latest_done = _as_date(latest_done)
+            nearest_valid = _as_date(nearest_valid)
+            if latest_done and (item.latest_date_done is None or latest_done > item.latest_date_done):
+                item.latest_date_done = latest_done
+            if nearest_valid and (item.nearest_valid_until is None or nearest_valid < item.nearest_valid_until):
+                item.nearest_valid_until = nearest_valid
+
+    return ProjectIndexPage(items=list(items.values()), next_cursor=next_cursor)
+
+
 @router.get("/{pid}", response_model=ProjectRead)
 def get_project(
     pid: int,
@@ -141,7 +219,7 @@ def get_project(
     """
     Detail projektu se všemi daty (včetně revizí).
     """
-    prj = _ensure_project_access_or_404(db, pid, user)
+    prj = ensure_project_access_or_404(db, pid, user)
     if not getattr(prj, "number", None):
         _ensure_project_number(db, prj)
         db.commit()
@@ -149,6 +227,27 @@ def get_project(
     return prj
 
 
+@router.get("/{pid}/photos.zip")
+def download_project_photos_zip(
+    pid: int,
+    db: Session = Depends(get_db),
+    user: UserModel = Depends(get_current_user),
+):
+    """Fotky všech revizí projektu jako ZIP streamovaný za běhu, složka na revizi."""
+    prj = ensure_project_access_or_404(db, pid, user)
+    revisions = db.execute(
+        select(Revision.id, Revision.number).where(Revision.project_id == pid).order_by(Revision.id)
+    ).all()
+    folders = {rev.id: photo_zip.folder_name(rev.number or f"revize {rev.id}") for rev in revisions}
+    photos = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.revision_id.in_(list(folders)), RevisionPhoto.status == PHOTO_ACTIVE)
+        .order_by(RevisionPhoto.revision_id, RevisionPhoto.created_at, RevisionPhoto.id)
+        .all()
+    )
+    return stream_photo_zip(photos, f"fotky-{prj.number or prj.id}", folders)
+
+
 @router.post("", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
 def create_project(
     payload: ProjectCreatePayload,
@@ -160,7 +259,7 @@ def create_project(
     Lze rovnou nasdílet dalším uživatelům.
     """
     prj = Project(
-        number=_generate_project_number(db, user.id),
+        number=generate_project_number(db, user.id),
         address=payload.address or "",
         client=payload.client or "",
         owner_id=user.id,
@@ -187,7 +286,7 @@ def patch_project(
     Částečná aktualizace projektu. Povoleno vlastníkovi i uživatelům se sdíleným přístupem
     (můžeš upravit, pokud patch smí provádět jen vlastník).
     """
-    prj = _ensure_project_access_or_404(db, pid, user)
+    prj = ensure_project_access_or_404(db, pid, user)
     if not getattr(prj, "number", None):
         _ensure_project_number(db, prj)
 
@@ -205,6 +304,7 @@ def patch_project(
     if payload.shared_with_user_ids is not None:
         users = db.query(UserModel).filter(UserModel.id.in_(payload.shared_with_user_ids)).all()
         setattr(prj, "shared_with_users", users)
+        forget_project_access(db, prj.id)
 
     db.commit()
     db.refresh(prj)
@@ -221,7 +321,7 @@ def delete_project(
     """
     Smazání projektu (jen vlastník) + ověření hesla.
     """
-    prj = _ensure_project_access_or_404(db, pid, user)
+    prj = ensure_project_access_or_404(db, pid, user)
 
     if prj.owner_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only owner can delete the project")
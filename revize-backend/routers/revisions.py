@@ -2,36 +2,99 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
+import asyncio
+from dataclasses import replace
 from datetime import date
-from io import BytesIO
+import base64
+import hashlib
+import hmac
 import json as _json
+import logging
 import os
-from pathlib import Path, PureWindowsPath
+import shutil
+import tempfile
+from pathlib import Path
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-from fastapi.responses import FileResponse, Response
-from sqlalchemy import or_
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from starlette.datastructures import FormData
+from sqlalchemy import Text, and_, case, cast, func, literal, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY, JSONB
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload, defer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy import select
 from pydantic import BaseModel
 
-from database import get_db
+from database import IS_POSTGRES, AsyncSessionLocal, get_async_db, get_db
 from routers.auth import get_current_user
-from models import Project, Revision, RevisionPhoto, User as UserModel, generate_revision_uuid
-from schemas import RevisionCreate, RevisionPhotoRead, RevisionRead, RevisionUpdate
-
-try:
-    from PIL import Image, ImageOps  # type: ignore
-except Exception:  # pragma: no cover
-    Image = None
-    ImageOps = None
+from routers.deps import get_current_user_async
+from routers.access import acan_access_project, can_access_project, project_access_clause
+from models import PhotoBlob, Project, Revision, RevisionPhoto, RevisionSummary, User as UserModel, generate_revision_uuid
+from utils import (
+    compressed_json,
+    gcs_urls,
+    image_pipeline,
+    photo_blobs,
+    photo_manifest,
+    photo_storage,
+    photo_zip,
+    raw_json,
+    revision_query,
+    revision_summary,
+)
+from utils.gcs_urls import PHOTO_URLS
+from utils.photo_manifest import MANIFESTS
+from utils.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    RangeFileResponse,
+    RangeNotSatisfiable,
+    cache_headers,
+    is_not_modified,
+    not_modified,
+    parse_range,
+    strong_etag,
+    weak_etag,
+)
+from utils.image_pipeline import IMAGE_POOL, ImagePoolBusy, ProcessedPhoto
+from utils.numbering import generate_project_number, generate_revision_number
+from utils.upload_limits import SPOOL_DIR, form_files, register_upload_limit, spool_multipart, spooled
+from utils.json_patch import (
+    JsonPatchConflict,
+    JsonPatchError,
+    PushdownPlan,
+    apply_json_patch,
+    json_patch_plan,
+    merge_patch,
+    merge_patch_plan,
+    validate_operations,
+)
+from schemas import (
+    RevisionCreate,
+    RevisionPage,
+    RevisionPhotoBatchItem,
+    RevisionPhotoBatchRead,
+    RevisionPhotoManifest,
+    RevisionPhotoManifestItem,
+    RevisionPhotoUploadCreate,
+    RevisionPhotoUploadTicket,
+    RevisionPhotoRead,
+    RevisionPhotoUrlRead,
+    RevisionRead,
+    RevisionSummaryRead,
+    RevisionUpdate,
+    RevisionVersionRead,
+)
 
 try:
     from google.cloud import storage as gcs_storage  # type: ignore
+    from google.api_core.exceptions import NotFound as GcsNotFound  # type: ignore
 except Exception:  # pragma: no cover
     gcs_storage = None
+    GcsNotFound = LookupError
 
 try:
     # oÄŤekĂˇvĂˇ se soubor auth/security.py s funkcĂ­ verify_password(plain, hashed)
@@ -44,13 +107,17 @@ except Exception:  # pragma: no cover
         )
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/revisions", tags=["revisions"])
+# bez globální auth dependency (Pub/Sub push nemá JWT) – ověřuje PHOTO_NOTIFY_TOKEN
+notifications_router = APIRouter(tags=["revisions"])
 
-UPLOAD_ROOT = Path(__file__).resolve().parents[1] / "uploads" / "revision_photos"
 PHOTO_BUCKET = (os.getenv("PHOTO_BUCKET") or os.getenv("GCS_PHOTO_BUCKET") or "").strip()
 MAX_PHOTO_UPLOAD_SIZE = 40 * 1024 * 1024
-MAX_PHOTO_LONG_EDGE = 1600
-JPEG_QUALITY = 82
+MULTIPART_OVERHEAD = 64 * 1024  # hlavičky částí + textová pole (caption, defect_uid)
+MAX_PHOTO_LONG_EDGE = image_pipeline.MAX_LONG_EDGE
+JPEG_QUALITY = image_pipeline.JPEG_QUALITY
 ALLOWED_IMAGE_TYPES = {
     "image/jpeg": ".jpg",
     "image/jpg": ".jpg",
@@ -66,6 +133,25 @@ ALLOWED_IMAGE_TYPES = {
 }
 _gcs_client = None
 
+PHOTO_ACTIVE = "active"
+PHOTO_PENDING = "pending"
+PHOTO_NOTIFY_TOKEN = (os.getenv("PHOTO_NOTIFY_TOKEN") or "").strip()
+
+PHOTO_BATCH_MAX_FILES = int(os.getenv("PHOTO_BATCH_MAX_FILES", "100"))
+PHOTO_BATCH_MAX_BYTES = int(os.getenv("PHOTO_BATCH_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# ZIP ke stažení: souběžná stahování z GCS a max. velikost objektu staženého dopředu
+PHOTO_ZIP_CONCURRENCY = int(os.getenv("PHOTO_ZIP_CONCURRENCY", "4"))
+PHOTO_ZIP_PREFETCH_MAX_BYTES = int(os.getenv("PHOTO_ZIP_PREFETCH_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# manifest galerie: kolik chybějících mikronáhledů jeden GET pošle na pozadí do IMAGE_POOL
+PHOTO_MICRO_BACKFILL_BATCH = int(os.getenv("PHOTO_MICRO_BACKFILL_BATCH", "32"))
+_MICRO_BACKFILL: set[int] = set()  # id fotek, jejichž mikronáhled se právě počítá
+
+# tělo uploadu se odmítne (413) už během přenosu, ne až po načtení celé fotky
+register_upload_limit("POST", r"/revisions/\d+/photos", MAX_PHOTO_UPLOAD_SIZE + MULTIPART_OVERHEAD)
+register_upload_limit("POST", r"/revisions/\d+/photos/batch", PHOTO_BATCH_MAX_BYTES)
+
 
 def _use_gcs_photos() -> bool:
     return bool(PHOTO_BUCKET)
@@ -92,51 +178,59 @@ def _revision_photo_to_schema(photo: RevisionPhoto) -> RevisionPhotoRead:
 
 
 def _get_revision_or_403(db: Session, rev_id: int, user: UserModel) -> Revision:
-    rev = (
-        db.query(Revision)
-        .options(joinedload(Revision.project))
-        .filter(Revision.id == rev_id)
-        .first()
-    )
+    rev = db.get(Revision, rev_id, options=[joinedload(Revision.project)])
     if not rev:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
-    if not _can_access_project(user, rev.project):
+    if not can_access_project(db, user, rev.project_id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
     return rev
 
 
-def _get_revision_photo_or_404(db: Session, rev_id: int, photo_id: int) -> RevisionPhoto:
-    photo = (
-        db.query(RevisionPhoto)
-        .filter(RevisionPhoto.id == photo_id, RevisionPhoto.revision_id == rev_id)
-        .first()
-    )
+async def _aget_revision_or_403(db: AsyncSession, rev_id: int, user: UserModel) -> Revision:
+    rev = await db.get(Revision, rev_id, options=[defer(Revision.data_json)])
+    if not rev:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
+    if not await acan_access_project(db, user, rev.project_id):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return rev
+
+
+def _get_revision_photo_or_404(db: Session, rev_id: int, photo_id: int, include_pending: bool = False) -> RevisionPhoto:
+    query = db.query(RevisionPhoto).filter(RevisionPhoto.id == photo_id, RevisionPhoto.revision_id == rev_id)
+    if not include_pending:
+        query = query.filter(RevisionPhoto.status == PHOTO_ACTIVE)
+    photo = query.first()
     if not photo:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Photo not found")
     return photo
 
 
-def _revision_upload_dir(rev_id: int) -> Path:
-    return UPLOAD_ROOT / str(rev_id)
-
-
 def _photo_storage_value(rev_id: int, filename: str) -> str:
     if _use_gcs_photos():
         return f"revision_photos/{rev_id}/{filename}"
-    return f"{rev_id}/{filename}"
+    return photo_storage.local_key(rev_id, filename)
+
+
+def _photo_blob_key(content_hash: str, ext: str) -> str:
+    return photo_blobs.cas_key(content_hash, ext, gcs=_use_gcs_photos())
 
 
-def _thumb_storage_value(file_path: str | None, rev_id: int | None = None) -> str | None:
+def _variant_storage_value(file_path: str | None, key: str, rev_id: int | None = None) -> str | None:
     if not file_path:
         return None
     if _use_gcs_photos():
         raw = str(file_path).strip()
         if not raw:
             return None
-        p = Path(raw)
-        return str(p.with_name(f"{p.stem}_thumb.jpg")).replace("\\", "/")
+        return str(_variant_path_for(Path(raw), key)).replace("\\", "/")
     resolved = _resolve_photo_path(file_path, rev_id=rev_id)
-    return str(_thumb_path_for(resolved)) if resolved else None
+    return str(_variant_path_for(resolved, key)) if resolved else None
+
+
+def _photo_variant_values(file_path: str | None, rev_id: int | None = None) -> List[str]:
+    """Uložené varianty náhledů fotky (pro mazání)."""
+    values = [_variant_storage_value(file_path, key, rev_id=rev_id) for key in image_pipeline.variant_keys()]
+    return [value for value in values if value]
 
 
 def _upload_photo_object(object_name: str, payload: bytes, content_type: str) -> None:
@@ -144,9 +238,19 @@ def _upload_photo_object(object_name: str, payload: bytes, content_type: str) ->
     if bucket is None:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Photo bucket is not configured")
     blob = bucket.blob(object_name)
+    blob.cache_control = IMMUTABLE_CACHE_CONTROL  # platí i pro odpovědi přes signed URL
     blob.upload_from_string(payload, content_type=content_type)
 
 
+def _upload_photo_file(object_name: str, path: Path, content_type: str) -> None:
+    bucket = _get_photo_bucket()
+    if bucket is None:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Photo bucket is not configured")
+    blob = bucket.blob(object_name)
+    blob.cache_control = IMMUTABLE_CACHE_CONTROL
+    blob.upload_from_filename(str(path), content_type=content_type)
+
+
 def _download_photo_object(object_name: str | None) -> bytes | None:
     if not object_name:
         return None
@@ -154,9 +258,56 @@ def _download_photo_object(object_name: str | None) -> bytes | None:
     if bucket is None:
         return None
     blob = bucket.blob(str(object_name).strip().lstrip("/"))
-    if not blob.exists():
+    # jeden požadavek místo exists() + download
+    try:
+        return blob.download_as_bytes()
+    except GcsNotFound:
+        return None
+
+
+def _get_photo_blob(object_name: str | None):
+    """Blob s metadaty (velikost) bez stažení obsahu; None = neexistuje."""
+    if not object_name:
+        return None
+    bucket = _get_photo_bucket()
+    if bucket is None:
         return None
-    return blob.download_as_bytes()
+    return bucket.get_blob(str(object_name).strip().lstrip("/"))
+
+
+def _iter_photo_blob(blob, chunk_size: int = 256 * 1024):
+    with blob.open("rb", chunk_size=chunk_size) as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _signed_photo_url(object_name: str, media_type: str, filename: str | None = None):
+    params = {"response_type": media_type}
+    if filename:
+        params["response_disposition"] = f'inline; filename="{filename}"'
+    return PHOTO_URLS.url_for(_get_photo_bucket().blob(object_name), **params)
+
+
+def _photo_redirect(object_name: str, media_type: str, filename: str | None = None) -> RedirectResponse:
+    url, _ = _signed_photo_url(object_name, media_type, filename)
+    return RedirectResponse(
+        url,
+        status_code=status.HTTP_302_FOUND,
+        headers={"Cache-Control": f"private, max-age={PHOTO_URLS.redirect_max_age()}"},
+    )
+
+
+def _hash_photo_object(object_name: str) -> str | None:
+    blob = _get_photo_blob(object_name)
+    if blob is None:
+        return None
+    digest = hashlib.sha256()
+    for chunk in _iter_photo_blob(blob):
+        digest.update(chunk)
+    return digest.hexdigest()
 
 
 def _delete_photo_object(object_name: str | None) -> None:
@@ -168,57 +319,27 @@ def _delete_photo_object(object_name: str | None) -> None:
     blob = bucket.blob(str(object_name).strip().lstrip("/"))
     try:
         blob.delete()
-    except Exception:
+    except GcsNotFound:
         pass
+    except Exception as exc:
+        # zbytek uklidí scripts/gc_photo_storage.py
+        logger.warning("Deleting photo object %s failed: %s", object_name, exc)
 
 
 def _resolve_photo_path(file_path: str | None, rev_id: int | None = None) -> Path | None:
-    if not file_path:
-        return None
-
-    raw = str(file_path).strip()
-    if not raw:
-        return None
-
-    candidates: list[Path] = []
-    raw_path = Path(raw)
-
-    if raw_path.is_absolute():
-        candidates.append(raw_path)
-    else:
-        candidates.append(UPLOAD_ROOT / raw_path)
-
-    win_name = PureWindowsPath(raw).name
-    posix_name = raw_path.name
-    basename = win_name or posix_name
-
-    if rev_id is not None and basename:
-        candidates.append(_revision_upload_dir(rev_id) / basename)
-    if basename:
-        candidates.append(UPLOAD_ROOT / basename)
-
-    seen: set[str] = set()
-    ordered: list[Path] = []
-    for candidate in candidates:
-        key = str(candidate)
-        if key in seen:
-            continue
-        seen.add(key)
-        ordered.append(candidate)
+    return photo_storage.resolve_local_path(file_path, rev_id=rev_id)
 
-    for candidate in ordered:
-        if candidate.is_file():
-            return candidate
 
-    return ordered[0] if ordered else None
+def _safe_photo_extension(upload: UploadFile) -> str:
+    return _photo_extension_for(upload.content_type, upload.filename)
 
 
-def _safe_photo_extension(upload: UploadFile) -> str:
-    content_type = (upload.content_type or "").lower().strip()
+def _photo_extension_for(content_type: str | None, filename: str | None) -> str:
+    content_type = (content_type or "").lower().strip()
     if content_type in ALLOWED_IMAGE_TYPES:
         return ALLOWED_IMAGE_TYPES[content_type]
 
-    suffix = Path(upload.filename or "").suffix.lower()
+    suffix = Path(filename or "").suffix.lower()
     if suffix in ALLOWED_IMAGE_TYPES.values():
         return suffix
 
@@ -241,45 +362,6 @@ def _safe_photo_extension(upload: UploadFile) -> str:
     raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Only image uploads are supported")
 
 
-def _compress_upload_image(
-    payload: bytes,
-    source_ext: str,
-    content_type: str | None,
-) -> tuple[bytes, str, str]:
-    if Image is None or ImageOps is None:
-        return payload, source_ext, (content_type or "application/octet-stream").lower()
-
-    try:
-        from io import BytesIO
-
-        with Image.open(BytesIO(payload)) as img:
-            img = ImageOps.exif_transpose(img)
-
-            width, height = img.size
-            longest_edge = max(width, height)
-            if longest_edge > MAX_PHOTO_LONG_EDGE:
-                scale = MAX_PHOTO_LONG_EDGE / float(longest_edge)
-                resized = (
-                    max(1, int(round(width * scale))),
-                    max(1, int(round(height * scale))),
-                )
-                img = img.resize(resized, Image.Resampling.LANCZOS)
-
-            if img.mode in {"RGBA", "LA"} or (img.mode == "P" and "transparency" in img.info):
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                alpha = img.convert("RGBA")
-                background.paste(alpha, mask=alpha.getchannel("A"))
-                img = background
-            else:
-                img = img.convert("RGB")
-
-            out = BytesIO()
-            img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
-            return out.getvalue(), ".jpg", "image/jpeg"
-    except Exception:
-        return payload, source_ext, (content_type or "application/octet-stream").lower()
-
-
 def _delete_file_if_exists(path_str: str | None, rev_id: int | None = None) -> None:
     if _use_gcs_photos():
         _delete_photo_object(path_str)
@@ -288,117 +370,192 @@ def _delete_file_if_exists(path_str: str | None, rev_id: int | None = None) -> N
     if not path:
         return
     try:
-        if path.is_file():
-            path.unlink()
-    except Exception:
-        pass
+        path.unlink(missing_ok=True)
+    except OSError as exc:
+        logger.warning("Deleting photo file %s failed: %s", path, exc)
 
 
-def _thumb_path_for(path: Path) -> Path:
-    return path.with_name(f"{path.stem}_thumb.jpg")
+def _variant_path_for(path: Path, key: str) -> Path:
+    return path.with_name(f"{path.stem}_{key}")
 
 
-def _generate_thumbnail(image_path: Path) -> Path:
-    thumb_path = _thumb_path_for(image_path)
-    if thumb_path.is_file():
-        return thumb_path
-    if Image is None or ImageOps is None:
-        return image_path
-    try:
-        with Image.open(image_path) as img:
-            img = ImageOps.exif_transpose(img)
-            img = img.convert("RGB")
-            img.thumbnail((480, 360))
-            img.save(thumb_path, format="JPEG", quality=82, optimize=True)
-        return thumb_path
-    except Exception:
-        return image_path
+def _ensure_local_variant(image_path: Path, key: str) -> Path | None:
+    """Varianta na disku; u starších fotek se dogenerují všechny najednou (jedno dekódování)."""
+    variant_path = _variant_path_for(image_path, key)
+    if variant_path.is_file():
+        return variant_path
+    variants = image_pipeline.variants_from_source(image_path.read_bytes())
+    for variant_key, data in variants.items():
+        _variant_path_for(image_path, variant_key).write_bytes(data)
+    return variant_path if key in variants else None
 
 
-def _generate_thumbnail_bytes(payload: bytes) -> bytes | None:
-    if Image is None or ImageOps is None:
-        return None
-    try:
-        with Image.open(BytesIO(payload)) as img:
-            img = ImageOps.exif_transpose(img)
-            img = img.convert("RGB")
-            img.thumbnail((480, 360))
-            out = BytesIO()
-            img.save(out, format="JPEG", quality=82, optimize=True)
-            return out.getvalue()
-    except Exception:
-        return None
+def _ensure_gcs_variant(file_path: str, key: str) -> bytes | None:
+    payload = _download_photo_object(_variant_storage_value(file_path, key))
+    if payload is not None:
+        return payload
+    original = _download_photo_object(file_path)
+    if original is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
+    variants = image_pipeline.variants_from_source(original)
+    _upload_photo_variants(file_path, variants)
+    return variants.get(key)
 
-def _normalize_project_number(project_number: Any, project_id: Any) -> str:
-    raw = str(project_number or "").strip()
-    if raw:
-        try:
-            return str(int(raw))
-        except ValueError:
-            return raw
+
+def _upload_photo_variants(storage_value: str, variants: Dict[str, bytes]) -> None:
+    for key, data in variants.items():
+        fmt = key.rsplit(".", 1)[-1]
+        _upload_photo_object(_variant_storage_value(storage_value, key), data, image_pipeline.FORMAT_MIME[fmt])
+
+
+def _wants_webp(request: Request) -> bool:
+    return "webp" in image_pipeline.THUMB_FORMATS and "image/webp" in request.headers.get("accept", "").lower()
+
+
+def _spooled_photo(upload: UploadFile) -> tuple[Path, str, str]:
+    """
+    Souborová část ze spool_multipart (už na disku, velikost i sha256 spočtené při
+    čtení těla): 413 nad limit, 400 pro prázdný soubor. Vrací (cesta, přípona, hash).
+    """
+    spool = spooled(upload)
+    if spool.too_large:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Photo is too large")
+    if spool.size == 0:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+    return spool.path, _safe_photo_extension(upload), spool.digest.hexdigest()
+
+
+def _multipart_body(properties: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+    # tělo se čte ručně (spool_multipart) – schéma pro OpenAPI dokumentaci
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": properties, "required": required}
+                }
+            },
+        }
+    }
+
+
+async def _process_photo_or_503(source_path: Path, source_ext: str, content_type: str | None) -> ProcessedPhoto:
+    """Zpracování v process poolu (mimo event loop); plná fronta = 503 + Retry-After."""
     try:
-        return str(int(project_id))
-    except Exception:
-        return "0"
+        return await IMAGE_POOL.process_photo(str(source_path), source_ext, content_type, MAX_PHOTO_LONG_EDGE, JPEG_QUALITY)
+    except ImagePoolBusy:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Photo processing is busy, retry later",
+            headers={"Retry-After": str(IMAGE_POOL.retry_after_s)},
+        )
 
 
-def _generate_revision_number(
-    db: Session,
-    project_id: int,
-    project_number: str,
-    year: int,
-    prefix: str,
-) -> str:
+def _store_processed_photo(processed: ProcessedPhoto, source_path: Path) -> str:
     """
-    Format: <prefix>-<year>-<projectNumber>-<seq>
-    seq is per-project, per-prefix and per-year.
+    Uloží fotku i náhledy (GCS / disk) pod obsahovou adresou (utils/photo_blobs.py);
+    volat mimo event loop. Vrací hodnotu pro file_path. Už uložený obsah se znovu
+    nezapisuje. Bez zpracovaných dat (processed.payload is None) se ukládá spool
+    soubor beze změny.
     """
-    prefix_base = str(prefix)
-    normalized_project_number = _normalize_project_number(project_number, project_id)
-    prefix = f"{prefix_base}-{year}-{normalized_project_number}-"
+    storage_value = _photo_blob_key(processed.content_hash, processed.ext)
 
-    rows = (
-        db.query(Revision.number)
-        .filter(Revision.project_id == project_id)
-        .filter(Revision.number.like(f"{prefix}%"))
-        .all()
-    )
+    if _use_gcs_photos():
+        if _get_photo_blob(storage_value) is not None:
+            return storage_value
+        # varianty první: existující originál = kompletní blob
+        _upload_photo_variants(storage_value, processed.variants)
+        if processed.payload is None:
+            _upload_photo_file(storage_value, source_path, processed.mime_type)
+        else:
+            _upload_photo_object(storage_value, processed.payload, processed.mime_type)
+    else:
+        target_path = photo_storage.UPLOAD_ROOT / storage_value
+        if target_path.is_file():
+            return storage_value
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        for key, data in processed.variants.items():
+            _variant_path_for(target_path, key).write_bytes(data)
+        # zápis přes dočasné jméno – souběžný upload stejného obsahu nikdy neuvidí půlku souboru
+        partial = target_path.with_name(f".{uuid4().hex}.part")
+        if processed.payload is None:
+            shutil.copyfile(source_path, partial)
+        else:
+            partial.write_bytes(processed.payload)
+        os.replace(partial, target_path)
+    return storage_value
 
-    max_seq = 0
-    for (num,) in rows:
-        parts = (num or "").split("-")
-        if len(parts) >= 4 and parts[0] == prefix_base and parts[1] == str(year):
-            try:
-                max_seq = max(max_seq, int(parts[3]))
-            except Exception:
-                pass
 
-    next_seq = max_seq + 1
-    return f"{prefix}{next_seq:03d}"
+async def _ingest_photo(
+    spool_path: Path,
+    source_ext: str,
+    content_type: str | None,
+    known: PhotoBlob | None,
+    slots: asyncio.Semaphore | None = None,
+) -> tuple[ProcessedPhoto, str]:
+    """
+    Spool soubor -> (popis uloženého souboru, file_path). Známý originál (blob se
+    stejným source_hash) se nezpracovává ani neukládá – fotka jen dostane odkaz.
+    """
+    if known is not None:
+        described = ProcessedPhoto(
+            None, Path(known.storage_key).suffix, known.mime_type, known.file_size, content_hash=known.content_hash
+        )
+        return described, known.storage_key
+    if slots is None:
+        processed = await _process_photo_or_503(spool_path, source_ext, content_type)
+    else:
+        async with slots:
+            processed = await _process_photo_or_503(spool_path, source_ext, content_type)
+    storage_value = await asyncio.to_thread(_store_processed_photo, processed, spool_path)
+    return processed, storage_value
 
 
-def _generate_project_number(db: Session, owner_id: int) -> str:
-    rows = db.query(Project.number).filter(Project.owner_id == owner_id).all()
-    max_seq = 0
-    for (number,) in rows:
-        raw = str(number or "").strip()
-        if not raw:
-            continue
-        try:
-            max_seq = max(max_seq, int(raw))
-        except ValueError:
-            continue
-    return str(max_seq + 1)
+async def _blobs_by_source(db: AsyncSession, source_hashes: List[str]) -> Dict[str, PhotoBlob]:
+    if not source_hashes:
+        return {}
+    rows = (
+        await db.execute(select(PhotoBlob).where(PhotoBlob.source_hash.in_(set(source_hashes))))
+    ).scalars().all()
+    return {blob.source_hash: blob for blob in rows}
 
 
+def _link_photo_blobs(db: Session, stored: List[tuple[ProcessedPhoto, str, str]]) -> List[str]:
+    """
+    Řádky blobů pro uložené fotky (processed, file_path, source_hash); vrací file_path
+    pro každou. Obsah, který už blob má pod jiným klíčem (převzatá starší fotka),
+    dostane ten klíč – nově zapsaný soubor pak zůstane bez odkazu a smaže se.
+    """
+    return [
+        photo_blobs.ensure_blob(
+            db,
+            content_hash=processed.content_hash,
+            source_hash=source_hash,
+            storage_key=storage_value,
+            mime_type=processed.mime_type,
+            file_size=processed.size,
+        ).storage_key
+        for processed, storage_value, source_hash in stored
+    ]
 
-def _can_access_project(user: UserModel, prj: Project) -> bool:
-    """VlastnĂ­k projektu, nebo uĹľivatel, se kterĂ˝m je projekt sdĂ­len."""
-    try:
-        return prj.owner_id == user.id or any(u.id == user.id for u in prj.shared_with_users)
-    except Exception:
-        # kdyĹľ nenĂ­ relace shared_with_users, ber jen vlastnĂ­ka
-        return prj.owner_id == user.id
+
+def _stored_photo_hash(photo: RevisionPhoto, rev_id: int) -> str | None:
+    if _use_gcs_photos():
+        return _hash_photo_object(photo.file_path)
+    path = _resolve_photo_path(photo.file_path, rev_id=rev_id)
+    return image_pipeline.sha256_file(str(path)) if path and path.is_file() else None
+
+
+def _unused_photo_files(
+    db: Session, removed: List[tuple[str | None, str]], managed: set
+) -> List[str]:
+    """
+    Po commitu smazání fotek (content_hash, file_path): soubory k odstranění. Soubor
+    blobu jen po posledním odkazu, soubory bez blobu (starší klíče po revizích) vždy.
+    """
+    own = [path for content_hash, path in removed if (content_hash, path) not in managed]
+    shared = [content_hash for content_hash, path in removed if (content_hash, path) in managed]
+    return own + photo_blobs.release_unreferenced(db, shared)
 
 
 def _ensure_date(d: Any) -> Optional[date]:
@@ -434,6 +591,47 @@ def _to_schema(rev: Revision) -> RevisionRead:
     return RevisionRead.model_validate(rev, from_attributes=True)
 
 
+def _touch_revision(rev: Revision, *, content: bool = True) -> None:
+    """Volat při každém zápisu revize: nová verze (ETag) a hash data_json."""
+    rev.version = (rev.version or 0) + 1
+    if content or not rev.content_hash:
+        rev.content_hash = raw_json.content_hash(rev.data_json or {})
+
+
+def _revision_etag(rev: Revision) -> str:
+    return f'"{rev.id}-{rev.version or 1}"'
+
+
+def _etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """If-None-Match (weak porovnání) / If-Match (strong) proti aktuálnímu ETagu."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _raw_data_json_column():
+    """data_json jako text přímo z DB (Postgres: jsonb::text), bez dekódování v driveru."""
+    return cast(Revision.__table__.c.data_json, Text).label("data_json_raw")
+
+
+def _raw_revision_response(rev: Revision, raw_data_json: Any) -> Response:
+    """RevisionRead bez průchodu data_json přes Pydantic: obálka + uložený JSON."""
+    fields = {name: getattr(rev, name, None) for name in RevisionRead.model_fields if name != "data_json"}
+    envelope = RevisionRead.model_validate(fields).model_dump_json(exclude={"data_json"}).encode("utf-8")
+    body = raw_json.splice_field(envelope, "data_json", raw_json.object_bytes(compressed_json.expand_raw(raw_data_json)))
+    return Response(content=body, media_type="application/json")
+
+
 def _get_user_password_hash(user: UserModel) -> Optional[str]:
     # Podporuj obÄ› varianty nĂˇzvĹŻ
     h = getattr(user, "password_hash", None)
@@ -444,34 +642,226 @@ def _get_user_password_hash(user: UserModel) -> Optional[str]:
 
 # ---------- Listing ----------
 
-@router.get("", response_model=List[RevisionRead])
-def list_revisions(
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_current_user),
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+# povolené klíče řazení: název -> (sloupec, může být NULL)
+_LIST_SORT_KEYS = {
+    "id": (Revision.id, False),
+    "number": (Revision.number, False),
+    "status": (Revision.status, False),
+    "type": (Revision.type, False),
+    "date_done": (Revision.date_done, False),
+    "valid_until": (Revision.valid_until, True),
+    # souhrn z data_json (revision_summaries; chybí-li řádek, hodnota je NULL)
+    "board_count": (RevisionSummary.board_count, True),
+    "component_count": (RevisionSummary.component_count, True),
+    "defect_count": (RevisionSummary.defect_count, True),
+    "client_name": (RevisionSummary.client_name, True),
+    "next_revision_date": (RevisionSummary.next_revision_date, True),
+}
+_DATE_SORT_KEYS = {"date_done", "valid_until", "next_revision_date"}
+
+
+def _encode_cursor(sort: str, order: str, values: list) -> str:
+    raw = _json.dumps({"s": sort, "o": order, "v": values}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = _json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data.get("s") != sort or data.get("o") != order:
+            raise ValueError("cursor was issued for a different ordering")
+        values = list(data["v"])
+        if sort in _DATE_SORT_KEYS:
+            idx = 1 if _LIST_SORT_KEYS[sort][1] else 0
+            values[idx] = date.fromisoformat(values[idx]) if values[idx] is not None else None
+        return values
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _list_order_keys(sort: str, descending: bool) -> list:
+    """(výraz, sestupně?) – NULL hodnoty vždy na konec, id jako tie-breaker."""
+    column, nullable = _LIST_SORT_KEYS[sort]
+    keys = []
+    if nullable:
+        keys.append((case((column.is_(None), 1), else_=0), False))
+    if sort != "id":
+        keys.append((column, descending))
+    keys.append((Revision.id, descending))
+    return keys
+
+
+def _keyset_after(keys: list, values: list):
+    """Predikát „řádek leží za kurzorem“ pro víceklíčové řazení."""
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        value = values[i]
+        if value is None:
+            continue
+        prefix = [
+            expr_j.is_(None) if value_j is None else expr_j == value_j
+            for (expr_j, _), value_j in zip(keys[:i], values[:i])
+        ]
+        clauses.append(and_(*prefix, expr < value if descending else expr > value))
+    return or_(*clauses) if clauses else None
+
+
+def _list_cursor_values(row, sort: str) -> list:
+    last = row._mapping
+    values: list = []
+    if _LIST_SORT_KEYS[sort][1]:
+        values.append(1 if last[sort] is None else 0)
+    if sort != "id":
+        values.append(last[sort])
+    values.append(last["id"])
+    return values
+
+
+async def _match_packed_rows(db: AsyncSession, rows: list, criteria: list) -> list:
+    """Řádky s komprimovaným data_json rozbal a ověř v Pythonu; ostatní už prošly SQL filtrem."""
+    packed_ids = [row.id for row in rows if row.doc_packed]
+    if not packed_ids:
+        return rows
+    docs = dict((await db.execute(select(Revision.id, Revision.data_json).where(Revision.id.in_(packed_ids)))).all())
+    return [row for row in rows if not row.doc_packed or revision_query.matches(docs.get(row.id), criteria)]
+
+
+@router.get("", response_model=RevisionPage)
+async def list_revisions(
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
     project_id: Optional[int] = Query(None),
     status_filter: Optional[str] = Query(None, alias="status"),
+    type_filter: Optional[str] = Query(None, alias="type"),
+    year: Optional[int] = Query(None, ge=1900, le=9999),
+    valid_until_from: Optional[date] = Query(None),
+    valid_until_to: Optional[date] = Query(None),
+    safety: Optional[str] = Query(None),
+    client: Optional[str] = Query(None),
+    has_defects: Optional[bool] = Query(None),
+    min_components: Optional[int] = Query(None, ge=0),
+    next_revision_from: Optional[date] = Query(None),
+    next_revision_to: Optional[date] = Query(None),
+    board_manufacturer: Optional[str] = Query(None),
+    component: Optional[str] = Query(None),
+    component_type: Optional[str] = Query(None),
+    defect_standard: Optional[str] = Query(None),
+    norm: Optional[str] = Query(None),
+    revision_type: Optional[str] = Query(None),
+    sort: str = Query("id"),
+    order: str = Query("desc"),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
 ):
     """
-    VraĹĄ revize, ke kterĂ˝m mĂˇ uĹľivatel pĹ™Ă­stup (vlastnĂ­ projekty + sdĂ­lenĂ©).
-    Podporuje filtrovĂˇnĂ­ `?project_id=` a `?status=`.
+    Stránkovaný seznam revizí, ke kterým má uživatel přístup (vlastní projekty + sdílené).
+    Vrací jen souhrnné sloupce bez `data_json`; stránkuje se kurzorem (`next_cursor`).
+    Filtry: `?project_id=`, `?status=`, `?type=`, `?year=`, `?valid_until_from=`, `?valid_until_to=`.
+    Souhrn z data_json: `?safety=`, `?client=` (obsahuje), `?has_defects=`, `?min_components=`,
+    `?next_revision_from=`, `?next_revision_to=`.
+    Obsah data_json (utils/revision_query.py): `?board_manufacturer=`, `?component=`, `?component_type=`,
+    `?revision_type=` (přesná shoda), `?norm=`, `?defect_standard=` (začíná na).
+    Řazení: `?sort=id|number|status|type|date_done|valid_until|board_count|component_count|
+    defect_count|client_name|next_revision_date&order=asc|desc`.
     """
-    q = (
-        db.query(Revision)
+    if sort not in _LIST_SORT_KEYS:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unsupported sort: {sort}")
+    if order not in {"asc", "desc"}:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail="order must be asc or desc")
+
+    keys = _list_order_keys(sort, order == "desc")
+    stmt = (
+        select(
+            Revision.id,
+            Revision.project_id,
+            Revision.uuid,
+            Revision.number,
+            Revision.type,
+            Revision.status,
+            Revision.date_done,
+            Revision.valid_until,
+            Project.number.label("project_number"),
+            Project.address.label("project_address"),
+            Project.client.label("project_client"),
+            RevisionSummary.board_count,
+            RevisionSummary.component_count,
+            RevisionSummary.defect_count,
+            RevisionSummary.conclusion_safety,
+            RevisionSummary.client_name,
+            RevisionSummary.next_revision_date,
+        )
         .join(Project, Revision.project_id == Project.id)
-        .outerjoin(Project.shared_with_users)  # pokud existuje many-to-many
-        .options(joinedload(Revision.project))
-        .filter(or_(Project.owner_id == user.id, UserModel.id == user.id))
-        .distinct()
-        .order_by(Revision.id.desc())
+        .outerjoin(RevisionSummary, RevisionSummary.revision_id == Revision.id)
+        .filter(project_access_clause(user.id))
     )
 
     if project_id is not None:
-        q = q.filter(Revision.project_id == project_id)
+        stmt = stmt.filter(Revision.project_id == project_id)
     if status_filter:
-        q = q.filter(Revision.status == status_filter)
-
-    rows = q.all()
-    return [_to_schema(r) for r in rows]
+        stmt = stmt.filter(Revision.status == status_filter)
+    if type_filter:
+        stmt = stmt.filter(Revision.type == type_filter)
+    if year is not None:
+        stmt = stmt.filter(Revision.date_done >= date(year, 1, 1), Revision.date_done < date(year + 1, 1, 1))
+    if valid_until_from is not None:
+        stmt = stmt.filter(Revision.valid_until >= valid_until_from)
+    if valid_until_to is not None:
+        stmt = stmt.filter(Revision.valid_until <= valid_until_to)
+    if safety:
+        stmt = stmt.filter(RevisionSummary.conclusion_safety == safety)
+    if client:
+        stmt = stmt.filter(RevisionSummary.client_name.ilike(f"%{client.strip()}%"))
+    if has_defects is not None:
+        stmt = stmt.filter(RevisionSummary.defect_count > 0 if has_defects else RevisionSummary.defect_count == 0)
+    if min_components is not None:
+        stmt = stmt.filter(RevisionSummary.component_count >= min_components)
+    if next_revision_from is not None:
+        stmt = stmt.filter(RevisionSummary.next_revision_date >= next_revision_from)
+    if next_revision_to is not None:
+        stmt = stmt.filter(RevisionSummary.next_revision_date <= next_revision_to)
+
+    criteria = revision_query.criteria_from_params(
+        board_manufacturer=board_manufacturer,
+        component=component,
+        component_type=component_type,
+        defect_standard=defect_standard,
+        norm=norm,
+        revision_type=revision_type,
+    )
+    if criteria:
+        doc = Revision.__table__.c.data_json
+        packed = compressed_json.envelope_clause(doc, postgres=IS_POSTGRES)
+        matched = and_(*[revision_query.sql_predicate(doc, field, value, IS_POSTGRES) for field, value in criteria])
+        # komprimované dokumenty jsou jen kandidáti – dofiltrují se v Pythonu
+        stmt = stmt.add_columns(packed.label("doc_packed")).filter(or_(matched, packed))
+
+    stmt = stmt.order_by(*[expr.desc() if descending else expr.asc() for expr, descending in keys])
+    after_values = _decode_cursor(cursor, sort, order) if cursor else None
+    rows: list = []
+    while len(rows) <= limit:
+        page = stmt
+        after = _keyset_after(keys, after_values) if after_values is not None else None
+        if after is not None:
+            page = page.filter(after)
+        batch = (await db.execute(page.limit(limit + 1))).all()
+        rows.extend(await _match_packed_rows(db, batch, criteria) if criteria else batch)
+        if len(batch) <= limit:
+            break
+        after_values = _list_cursor_values(batch[-1], sort)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(sort, order, _list_cursor_values(rows[-1], sort))
+
+    return RevisionPage(
+        items=[RevisionSummaryRead.model_validate(dict(row._mapping)) for row in rows],
+        next_cursor=next_cursor,
+    )
 
 
 # ---------- Create ----------
@@ -485,7 +875,7 @@ def create_revision(
     prj = db.get(Project, payload.project_id)
     if not prj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Project not found")
-    if not _can_access_project(user, prj):
+    if not can_access_project(db, user, prj.id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     # datumy (date_done vÄ›tĹˇinou vyĹľadujeme)
@@ -496,7 +886,7 @@ def create_revision(
 
     # Evidence number (generated per user/year)
     prefix_val = "LPS" if (getattr(payload, "type", "").upper() == "LPS") else "RZ"
-    number = _generate_revision_number(
+    number = generate_revision_number(
         db,
         prj.id,
         getattr(prj, "number", None),
@@ -527,6 +917,7 @@ def create_revision(
             conclusion_valid_until=_ensure_date(getattr(payload, "conclusion_valid_until", None)),
 
         )
+        _touch_revision(rev)
         db.add(rev)
         db.flush()     # vyĹľĂˇdĂˇ INSERT, zĂ­skĂˇ ID (kdyby nÄ›co chybÄ›lo, hodĂ­ to error tady)
         db.commit()
@@ -544,162 +935,835 @@ def create_revision(
 # ---------- Read one ----------
 
 @router.get("/{rev_id}", response_model=RevisionRead)
-def get_revision(
+async def get_revision(
     rev_id: int,
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
 ):
-    rev = (
-        db.query(Revision)
-        .options(joinedload(Revision.project), defer(Revision.data_json))
-        .filter(Revision.id == rev_id)
-        .first()
+    stmt = (
+        select(Revision, _raw_data_json_column())
+        .options(defer(Revision.data_json))
+        .where(Revision.id == rev_id)
     )
+    if_none_match = request.headers.get("if-none-match")
+    raw_data_json = None
+    if if_none_match:
+        # nejdřív jen verze – při shodě ETagu se dokument vůbec nenačítá
+        rev = await db.get(Revision, rev_id, options=[defer(Revision.data_json)])
+    else:
+        row = (await db.execute(stmt)).first()
+        rev, raw_data_json = row if row else (None, None)
     if not rev:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
     # Admin mĹŻĹľe pĹ™istupovat ke vĹˇem revizĂ­m
-    if not bool(getattr(user, "is_admin", False)) and not _can_access_project(user, rev.project):
+    if not bool(getattr(user, "is_admin", False)) and not await acan_access_project(db, user, rev.project_id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    # bezpeÄŤnĂ© naÄŤtenĂ­ data_json zvlĂˇĹˇĹĄ (mĹŻĹľe bĂ˝t uloĹľen jako string)
-    try:
-        raw_value = db.execute(
-            select(Revision.__table__.c.data_json).where(Revision.id == rev_id)
-        ).scalar_one_or_none()
-        from json import loads as _loads
-        if isinstance(raw_value, str):
-            try:
-                rev.data_json = _loads(raw_value)
-            except Exception:
-                rev.data_json = {}
-        elif raw_value is None:
-            rev.data_json = {}
-        else:
-            rev.data_json = raw_value if isinstance(raw_value, dict) else {}
-    except Exception:
-        rev.data_json = {}
-    return _to_schema(rev)
+
+    headers = {"ETag": _revision_etag(rev), "Cache-Control": "private, no-cache"}
+    if if_none_match:
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        row = (await db.execute(stmt.execution_options(populate_existing=True))).first()
+        if not row:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
+        rev, raw_data_json = row
+        headers["ETag"] = _revision_etag(rev)
+
+    # data_json se neparsuje – uložený text se vloží přímo do odpovědi
+    response = _raw_revision_response(rev, raw_data_json)
+    response.headers.update(headers)
+    return response
 
 
 # ---------- Revision photos ----------
 
 @router.get("/{rev_id}/photos", response_model=List[RevisionPhotoRead])
-def list_revision_photos(
+async def list_revision_photos(
     rev_id: int,
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
 ):
-    _get_revision_or_403(db, rev_id, user)
+    await _aget_revision_or_403(db, rev_id, user)
     rows = (
-        db.query(RevisionPhoto)
-        .filter(RevisionPhoto.revision_id == rev_id)
-        .order_by(RevisionPhoto.created_at.desc(), RevisionPhoto.id.desc())
-        .all()
-    )
+        await db.execute(
+            select(RevisionPhoto)
+            .filter(RevisionPhoto.revision_id == rev_id, RevisionPhoto.status == PHOTO_ACTIVE)
+            .order_by(RevisionPhoto.created_at.desc(), RevisionPhoto.id.desc())
+        )
+    ).scalars().all()
     return [_revision_photo_to_schema(row) for row in rows]
 
 
-@router.post("/{rev_id}/photos", response_model=RevisionPhotoRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{rev_id}/photos",
+    response_model=RevisionPhotoRead,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=_multipart_body(
+        {
+            "file": {"type": "string", "format": "binary"},
+            "caption": {"type": "string"},
+            "defect_uid": {"type": "string"},
+        },
+        ["file"],
+    ),
+)
 async def upload_revision_photo(
     rev_id: int,
-    file: UploadFile = File(...),
-    caption: str = Form(""),
-    defect_uid: str = Form(""),
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
 ):
-    _get_revision_or_403(db, rev_id, user)
+    """
+    Multipart `file` (+ `caption`, `defect_uid`). Tělo se čte jednou, rovnou do
+    spool souboru (utils/upload_limits.spool_multipart) – hash i limit velikosti
+    se řeší při čtení.
+    """
+    await _aget_revision_or_403(db, rev_id, user)
+    # spojení zpět do poolu, než se dočte (pomalé) tělo
+    await db.commit()
 
-    source_ext = _safe_photo_extension(file)
-    payload = await file.read()
-    if not payload:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
-    if len(payload) > MAX_PHOTO_UPLOAD_SIZE:
-        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Photo is too large")
+    form = await spool_multipart(request, MAX_PHOTO_UPLOAD_SIZE, max_files=1)
+    try:
+        uploads = form_files(form, "file")
+        if not uploads:
+            raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing file")
+        file = uploads[0]
+        caption = form.get("caption") or ""
+        defect_uid = form.get("defect_uid") or ""
+        spool_path, source_ext, source_hash = _spooled_photo(file)
+        known = (await _blobs_by_source(db, [source_hash])).get(source_hash)
+        processed, storage_value = await _ingest_photo(spool_path, source_ext, file.content_type, known)
+    finally:
+        await form.close()
+
+    (file_path,) = await db.run_sync(_link_photo_blobs, [(processed, storage_value, source_hash)])
+    photo = RevisionPhoto(
+        revision_id=rev_id,
+        caption=str(caption or "").strip(),
+        defect_uid=str(defect_uid or "").strip() or None,
+        original_name=file.filename or Path(storage_value).name,
+        mime_type=processed.mime_type,
+        file_size=processed.size,
+        file_path=file_path,
+        content_hash=processed.content_hash,
+        micro_thumb=processed.micro,
+    )
+    db.add(photo)
+    await db.commit()
+    MANIFESTS.invalidate(rev_id)
+    await db.refresh(photo)
+    if file_path != storage_value:
+        stray = await db.run_sync(photo_blobs.orphaned, [storage_value])
+        await asyncio.to_thread(_delete_stored_photos, rev_id, stray)
+    return _revision_photo_to_schema(photo)
+
+
+async def _ingest_batch_photo(
+    upload: UploadFile, spooled: tuple[Path, str, str], known: PhotoBlob | None, slots: asyncio.Semaphore
+) -> tuple[ProcessedPhoto, str, str]:
+    spool_path, source_ext, source_hash = spooled
+    try:
+        processed, storage_value = await _ingest_photo(spool_path, source_ext, upload.content_type, known, slots)
+    finally:
+        spool_path.unlink(missing_ok=True)
+    return processed, storage_value, source_hash
+
+
+def _delete_stored_photos(rev_id: int, storage_values: List[str]) -> None:
+    for value in storage_values:
+        for variant in _photo_variant_values(value, rev_id=rev_id):
+            _delete_file_if_exists(variant, rev_id=rev_id)
+        _delete_file_if_exists(value, rev_id=rev_id)
+
+
+@router.post(
+    "/{rev_id}/photos/batch",
+    response_model=RevisionPhotoBatchRead,
+    openapi_extra=_multipart_body(
+        {
+            "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+            "captions": {"type": "array", "items": {"type": "string"}},
+            "defect_uids": {"type": "array", "items": {"type": "string"}},
+        },
+        ["files"],
+    ),
+)
+async def upload_revision_photos_batch(
+    rev_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
+):
+    """
+    Více fotek v jednom multipart požadavku. `captions` a `defect_uids` se párují
+    s `files` podle pořadí (chybějící = prázdné). Soubory se zpracují paralelně,
+    úspěšné se uloží v jedné transakci; chyby se vrací po souborech (`status`, `error`).
+    Víc než PHOTO_BATCH_MAX_FILES souborů = 413 už při čtení těla.
+    """
+    await _aget_revision_or_403(db, rev_id, user)
+    await db.commit()
 
-    payload, ext, mime_type = _compress_upload_image(payload, source_ext, file.content_type)
+    form = await spool_multipart(request, MAX_PHOTO_UPLOAD_SIZE, max_files=PHOTO_BATCH_MAX_FILES)
+    try:
+        return await _store_photo_batch(rev_id, form, db)
+    finally:
+        await form.close()
 
-    filename = f"{uuid4().hex}{ext}"
-    storage_value = _photo_storage_value(rev_id, filename)
 
-    if _use_gcs_photos():
-        _upload_photo_object(storage_value, payload, mime_type)
-        thumb_payload = _generate_thumbnail_bytes(payload)
-        thumb_storage = _thumb_storage_value(storage_value, rev_id=rev_id)
-        if thumb_payload and thumb_storage:
-            _upload_photo_object(thumb_storage, thumb_payload, "image/jpeg")
-    else:
-        upload_dir = _revision_upload_dir(rev_id)
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        target_path = upload_dir / filename
-        target_path.write_bytes(payload)
-        _generate_thumbnail(target_path)
+async def _store_photo_batch(rev_id: int, form: FormData, db: AsyncSession) -> RevisionPhotoBatchRead:
+    files = form_files(form, "files")
+    if not files:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing files")
+    captions = [value for value in form.getlist("captions") if isinstance(value, str)]
+    defect_uids = [value for value in form.getlist("defect_uids") if isinstance(value, str)]
+
+    spooled = []
+    for upload in files:
+        try:
+            spooled.append(_spooled_photo(upload))
+        except HTTPException as exc:
+            spooled.append(exc)
+    # už nahrané originály (opakované revize) jedním dotazem – přeskočí zpracování i uložení
+    known = await _blobs_by_source(db, [item[2] for item in spooled if not isinstance(item, BaseException)])
+
+    # dávka si nechá část fronty volnou pro ostatní uploady
+    slots = asyncio.Semaphore(max(1, IMAGE_POOL.max_pending // 2))
+
+    async def ingest(upload: UploadFile, item):
+        if isinstance(item, BaseException):
+            raise item
+        return await _ingest_batch_photo(upload, item, known.get(item[2]), slots)
+
+    outcomes = await asyncio.gather(
+        *[ingest(upload, item) for upload, item in zip(files, spooled)],
+        return_exceptions=True,
+    )
+
+    stored = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    file_paths = iter(await db.run_sync(_link_photo_blobs, stored) if stored else [])
+    written = [storage_value for _, storage_value, _ in stored]
+
+    items: List[RevisionPhotoBatchItem] = []
+    created: List[tuple[int, RevisionPhoto]] = []
+    for index, (upload, outcome) in enumerate(zip(files, outcomes)):
+        if isinstance(outcome, HTTPException):
+            items.append(RevisionPhotoBatchItem(index=index, filename=upload.filename, status=outcome.status_code, error=str(outcome.detail)))
+            continue
+        if isinstance(outcome, BaseException):
+            items.append(RevisionPhotoBatchItem(index=index, filename=upload.filename, status=500, error=type(outcome).__name__))
+            continue
+        processed, storage_value, _ = outcome
+        caption = captions[index] if index < len(captions) else ""
+        defect_uid = defect_uids[index] if index < len(defect_uids) else ""
+        photo = RevisionPhoto(
+            revision_id=rev_id,
+            caption=str(caption or "").strip(),
+            defect_uid=str(defect_uid or "").strip() or None,
+            original_name=upload.filename or Path(storage_value).name,
+            mime_type=processed.mime_type,
+            file_size=processed.size,
+            file_path=next(file_paths),
+            content_hash=processed.content_hash,
+            micro_thumb=processed.micro,
+        )
+        created.append((index, photo))
+        items.append(RevisionPhotoBatchItem(index=index, filename=upload.filename, status=status.HTTP_201_CREATED))
+
+    if created:
+        db.add_all([photo for _, photo in created])
+        try:
+            await db.flush()
+            for index, photo in created:
+                items[index].photo = _revision_photo_to_schema(photo)
+            await db.commit()
+            MANIFESTS.invalidate(rev_id)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            # jen soubory, které nesdílí žádný jiný blob
+            stray = await db.run_sync(photo_blobs.orphaned, written)
+            await asyncio.to_thread(_delete_stored_photos, rev_id, stray)
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to save photos: {type(e).__name__}: {str(e)}",
+            )
+        stray = await db.run_sync(photo_blobs.orphaned, written)
+        if stray:
+            await asyncio.to_thread(_delete_stored_photos, rev_id, stray)
+
+    return RevisionPhotoBatchRead(
+        uploaded=len(created),
+        failed=len(items) - len(created),
+        items=items,
+    )
+
+
+# ---------- Přímý upload do bucketu (GCS) ----------
+
+@router.post(
+    "/{rev_id}/photos/uploads",
+    response_model=RevisionPhotoUploadTicket,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_revision_photo_upload(
+    rev_id: int,
+    payload: RevisionPhotoUploadCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
+):
+    """
+    Fáze 1: pending řádek + podepsaná URL, na kterou klient nahraje soubor přímo do
+    bucketu (data přes API nejdou). Fáze 2: POST .../photos/{id}/finalize, případně
+    notifikace bucketu (/photo-notifications/gcs). Nefinalizované řádky se nevypisují.
+    """
+    if not _use_gcs_photos():
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Direct uploads require GCS photo storage")
+    await _aget_revision_or_403(db, rev_id, user)
+    if payload.size is not None and payload.size > MAX_PHOTO_UPLOAD_SIZE:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Photo is too large")
+    source_ext = _photo_extension_for(payload.content_type, payload.filename)
+    content_type = (payload.content_type or "").lower().strip() or "application/octet-stream"
 
+    storage_value = _photo_storage_value(rev_id, f"{uuid4().hex}{source_ext}")
     photo = RevisionPhoto(
         revision_id=rev_id,
-        caption=str(caption or "").strip(),
-        defect_uid=str(defect_uid or "").strip() or None,
-        original_name=file.filename or filename,
-        mime_type=mime_type,
-        file_size=len(payload),
+        caption=str(payload.caption or "").strip(),
+        defect_uid=str(payload.defect_uid or "").strip() or None,
+        original_name=payload.filename or Path(storage_value).name,
+        mime_type=content_type,
+        file_size=0,
         file_path=storage_value,
+        status=PHOTO_PENDING,
     )
     db.add(photo)
+    await db.commit()
+    await db.refresh(photo)
+
+    ticket = await asyncio.to_thread(
+        PHOTO_URLS.upload_ticket, _get_photo_bucket().blob(storage_value), content_type, MAX_PHOTO_UPLOAD_SIZE
+    )
+    return RevisionPhotoUploadTicket(
+        photo=_revision_photo_to_schema(photo),
+        upload_url=ticket.url,
+        method=ticket.method,
+        headers=ticket.headers,
+        expires_at=ticket.expires_at,
+    )
+
+
+def _finalize_pending_photo(db: Session, photo: RevisionPhoto) -> Optional[bool]:
+    """
+    Ověří nahraný objekt (velikost, hlavička formátu – jen prvních pár bajtů) a aktivuje
+    řádek. None = objekt ještě v bucketu není, False = finalizoval už někdo jiný.
+    Neplatný upload se smaže (objekt i řádek) a skončí 400 / 413.
+    """
+    blob = _get_photo_blob(photo.file_path)
+    if blob is None:
+        return None
+    size = int(blob.size or 0)
+    head = blob.download_as_bytes(start=0, end=image_pipeline.SNIFF_BYTES - 1) if size else b""
+    sniffed = image_pipeline.sniff_image_type(head)
+    if size == 0 or size > MAX_PHOTO_UPLOAD_SIZE or sniffed is None:
+        _delete_photo_object(photo.file_path)
+        db.delete(photo)
+        db.commit()
+        if size > MAX_PHOTO_UPLOAD_SIZE:
+            raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Photo is too large")
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Only image uploads are supported")
+
+    # podmíněný UPDATE: finalize a notifikace bucketu se můžou potkat
+    claimed = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.id == photo.id, RevisionPhoto.status == PHOTO_PENDING)
+        .update({"status": PHOTO_ACTIVE, "file_size": size, "mime_type": sniffed}, synchronize_session=False)
+    )
     db.commit()
+    MANIFESTS.invalidate(photo.revision_id)
     db.refresh(photo)
+    return claimed == 1
+
+
+async def _derive_direct_upload(photo_id: int, object_name: str, mime_type: str) -> None:
+    """
+    Na pozadí po finalize: content_hash a náhledy. Objekt se stáhne jednou mimo
+    request; selhání jen zaloguje – náhledy pak dogeneruje první GET .../thumb.
+    Obsah, který už v úložišti je (blob), fotka sdílí a nahraný objekt se smaže;
+    jinak se objekt stane blobem na svém místě.
+    """
+    source_ext = Path(object_name).suffix.lower() or ".jpg"
+    fd, name = tempfile.mkstemp(prefix="derive-", suffix=source_ext, dir=SPOOL_DIR)
+    os.close(fd)
+    try:
+        await asyncio.to_thread(_get_photo_bucket().blob(object_name).download_to_filename, name)
+        for _ in range(3):
+            try:
+                processed = await IMAGE_POOL.submit(image_pipeline.describe_stored_photo, name, source_ext, mime_type)
+                break
+            except ImagePoolBusy:
+                await asyncio.sleep(IMAGE_POOL.retry_after_s)
+        else:
+            logger.warning("Photo %s: image pool busy, variants deferred", photo_id)
+            return
+        file_path = object_name
+        if AsyncSessionLocal is not None:
+            async with AsyncSessionLocal() as db:
+                photo = await db.get(RevisionPhoto, photo_id)
+                if photo is None or photo.file_path != object_name:
+                    return
+                (file_path,) = await db.run_sync(
+                    _link_photo_blobs,
+                    [(replace(processed, mime_type=photo.mime_type, size=photo.file_size), object_name, None)],
+                )
+                photo.content_hash = processed.content_hash
+                photo.micro_thumb = processed.micro
+                photo.file_path = file_path
+                await db.commit()
+        if file_path != object_name:
+            await asyncio.to_thread(_delete_photo_object, object_name)
+            return
+        await asyncio.to_thread(_upload_photo_variants, object_name, processed.variants)
+    except Exception as exc:
+        logger.warning("Photo %s: deriving direct upload failed: %s", photo_id, exc)
+    finally:
+        Path(name).unlink(missing_ok=True)
+
+
+@router.post("/{rev_id}/photos/{photo_id}/finalize", response_model=RevisionPhotoRead)
+def finalize_revision_photo_upload(
+    rev_id: int,
+    photo_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: UserModel = Depends(get_current_user),
+):
+    """Fáze 2 přímého uploadu; idempotentní (už aktivní fotka se jen vrátí)."""
+    if not _use_gcs_photos():
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Direct uploads require GCS photo storage")
+    _get_revision_or_403(db, rev_id, user)
+    photo = _get_revision_photo_or_404(db, rev_id, photo_id, include_pending=True)
+    if photo.status == PHOTO_PENDING:
+        claimed = _finalize_pending_photo(db, photo)
+        if claimed is None:
+            raise HTTPException(status.HTTP_409_CONFLICT, detail="Photo has not been uploaded yet")
+        if claimed:
+            background_tasks.add_task(_derive_direct_upload, photo.id, photo.file_path, photo.mime_type)
     return _revision_photo_to_schema(photo)
 
 
+@notifications_router.post("/photo-notifications/gcs", status_code=status.HTTP_204_NO_CONTENT)
+def gcs_photo_notification(
+    request_body: Dict[str, Any],
+    background_tasks: BackgroundTasks,
+    token: str = Query(""),
+    db: Session = Depends(get_db),
+):
+    """
+    Pub/Sub push z notifikací bucketu (OBJECT_FINALIZE) – finalizuje přímý upload i bez
+    klientského finalize. Vždy 204 (zpráva se potvrdí), neznámé objekty se ignorují.
+    """
+    # porovnání v konstantním čase – token se nedá hádat po znacích podle latence
+    if not PHOTO_NOTIFY_TOKEN or not hmac.compare_digest(token.encode("utf-8"), PHOTO_NOTIFY_TOKEN.encode("utf-8")):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Not found")
+    attributes = (request_body.get("message") or {}).get("attributes") or {}
+    if attributes.get("eventType") != "OBJECT_FINALIZE" or attributes.get("bucketId") != PHOTO_BUCKET:
+        return None
+    photo = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.file_path == attributes.get("objectId"), RevisionPhoto.status == PHOTO_PENDING)
+        .first()
+    )
+    if photo is None:
+        return None
+    try:
+        claimed = _finalize_pending_photo(db, photo)
+    except HTTPException as exc:
+        logger.info("Rejected direct upload %s: %s", attributes.get("objectId"), exc.detail)
+        return None
+    if claimed:
+        background_tasks.add_task(_derive_direct_upload, photo.id, photo.file_path, photo.mime_type)
+    return None
+
+
+def _photo_etag(photo: RevisionPhoto, *suffix: str) -> str:
+    """
+    Silný ETag z content_hash. Starší fotky bez hashe (dopočte je
+    scripts/normalize_photo_storage.py) mají slabý ETag z řádku – GET nic nehashuje ani nezapisuje.
+    """
+    if photo.content_hash:
+        return strong_etag(photo.content_hash, *suffix)
+    path_digest = hashlib.sha1(str(photo.file_path).encode("utf-8")).hexdigest()[:16]
+    return weak_etag(f"p{photo.id}", path_digest, str(photo.file_size or 0), *suffix)
+
+
+def _gcs_photo_response(request: Request, photo: RevisionPhoto, etag: str, headers: Dict[str, str]) -> Response:
+    """Celý soubor streamovaně (ne do paměti), Range jako 206 se staženým výsekem."""
+    blob = _get_photo_blob(photo.file_path)
+    if blob is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
+    size = int(blob.size or 0)
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    try:
+        byte_range = parse_range(request, size, etag)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        return Response(
+            content=blob.download_as_bytes(start=start, end=end),
+            status_code=206,
+            media_type=photo.mime_type,
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"},
+        )
+    return StreamingResponse(
+        _iter_photo_blob(blob),
+        media_type=photo.mime_type,
+        headers={**headers, "Content-Length": str(size)},
+    )
+
+
 @router.get("/{rev_id}/photos/{photo_id}/file")
 def get_revision_photo_file(
     rev_id: int,
     photo_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     user: UserModel = Depends(get_current_user),
 ):
+    """Uložená fotka: silný ETag z content_hash, 304 bez přístupu k úložišti, Range (206)."""
     _get_revision_or_403(db, rev_id, user)
     photo = _get_revision_photo_or_404(db, rev_id, photo_id)
+    if _use_gcs_photos() and gcs_urls.redirect_enabled():
+        return _photo_redirect(photo.file_path, photo.mime_type, photo.original_name)
+    etag = _photo_etag(photo)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+
     if _use_gcs_photos():
-        payload = _download_photo_object(photo.file_path)
-        if payload is None:
-            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
-        headers = {}
         if photo.original_name:
             headers["Content-Disposition"] = f'inline; filename="{photo.original_name}"'
-        return Response(content=payload, media_type=photo.mime_type, headers=headers)
+        return _gcs_photo_response(request, photo, etag, headers)
 
     path = _resolve_photo_path(photo.file_path, rev_id=rev_id)
     if not path or not path.is_file():
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
-    return FileResponse(path, media_type=photo.mime_type, filename=photo.original_name or path.name)
+    # RangeFileResponse řeší Range / If-Range sám (s naším ETagem, silně)
+    return RangeFileResponse(path, media_type=photo.mime_type, filename=photo.original_name or path.name, headers=headers)
+
+
+def _gcs_variant_redirect(photo: RevisionPhoto, key: str | None, fmt: str) -> RedirectResponse:
+    if key is None:
+        return _photo_redirect(photo.file_path, photo.mime_type, photo.original_name)
+    variant_name = _variant_storage_value(photo.file_path, key)
+    media_type = image_pipeline.FORMAT_MIME[fmt]
+    # podepsaná URL v cache = objekt už byl ověřen; jinak metadata (bez stažení obsahu)
+    known = PHOTO_URLS.is_cached(PHOTO_BUCKET, variant_name, response_type=media_type)
+    if not known and _get_photo_blob(variant_name) is None and _ensure_gcs_variant(photo.file_path, key) is None:
+        return _photo_redirect(photo.file_path, photo.mime_type, photo.original_name)
+    return _photo_redirect(variant_name, media_type)
+
+
+@router.get("/{rev_id}/photos/urls", response_model=List[RevisionPhotoUrlRead])
+async def list_revision_photo_urls(
+    rev_id: int,
+    size: Optional[str] = Query(None, description="Varianta pro thumb_url (jako u GET .../thumb)"),
+    fmt: str = Query("jpg", alias="format", pattern="^(jpg|webp)$"),
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
+):
+    """
+    URL fotek a náhledů celé galerie jedním požadavkem. V režimu PHOTO_URL_MODE=redirect
+    (GCS) jsou to krátkodobé podepsané URL přímo do bucketu, jinak cesty na API.
+    Náhledy, které v bucketu ještě nejsou, vedou na API (dogeneruje je a přesměruje).
+    """
+    try:
+        spec = image_pipeline.pick_variant(size)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await _aget_revision_or_403(db, rev_id, user)
+    rows = (
+        await db.execute(
+            select(RevisionPhoto)
+            .filter(RevisionPhoto.revision_id == rev_id, RevisionPhoto.status == PHOTO_ACTIVE)
+            .order_by(RevisionPhoto.created_at.desc(), RevisionPhoto.id.desc())
+        )
+    ).scalars().all()
+    if fmt == "webp" and "webp" not in image_pipeline.THUMB_FORMATS:
+        fmt = "jpg"
+    key = image_pipeline.variant_key(spec.name, fmt) if spec else None
+    thumb_query = f"?size={spec.name}" if spec else "?size=print"
+
+    def api_urls(photo: RevisionPhoto) -> RevisionPhotoUrlRead:
+        base = f"/revisions/{rev_id}/photos/{photo.id}"
+        return RevisionPhotoUrlRead(id=photo.id, url=f"{base}/file", thumb_url=f"{base}/thumb{thumb_query}")
+
+    if not (_use_gcs_photos() and gcs_urls.redirect_enabled()):
+        return [api_urls(photo) for photo in rows]
+    return await asyncio.to_thread(_signed_gallery_urls, rows, key, fmt, api_urls)
+
+
+def _signed_gallery_urls(rows: List[RevisionPhoto], key: str | None, fmt: str, api_urls) -> List[RevisionPhotoUrlRead]:
+    # existující varianty jedním výpisem prefixu místo dotazu na každý objekt
+    bucket = _get_photo_bucket()
+    prefixes = {str(Path(photo.file_path).parent).replace("\\", "/") + "/" for photo in rows}
+    existing = {blob.name for prefix in prefixes for blob in bucket.list_blobs(prefix=prefix.lstrip("/"))}
+    out = []
+    for photo in rows:
+        item = api_urls(photo)
+        item.url, item.expires_at = _signed_photo_url(photo.file_path, photo.mime_type, photo.original_name)
+        variant_name = _variant_storage_value(photo.file_path, key) if key else photo.file_path
+        if variant_name in existing:
+            media_type = image_pipeline.FORMAT_MIME[fmt] if key else photo.mime_type
+            item.thumb_url, _ = _signed_photo_url(variant_name, media_type)
+        out.append(item)
+    return out
+
+
+def _photo_fingerprint(db: Session, rev_id: int) -> tuple:
+    """Otisk aktivních fotek revize – mění se s každým uploadem, úpravou i smazáním."""
+    row = db.execute(
+        select(func.count(RevisionPhoto.id), func.max(RevisionPhoto.id), func.max(RevisionPhoto.updated_at))
+        .where(RevisionPhoto.revision_id == rev_id, RevisionPhoto.status == PHOTO_ACTIVE)
+    ).one()
+    return row[0], row[1], str(row[2])
+
+
+def _micro_source(file_path: str, rev_id: int) -> bytes | str | None:
+    """Zdroj mikronáhledu: varianta grid (malé dekódování), jinak originál; None = soubor chybí."""
+    key = image_pipeline.variant_key("grid", "jpg")
+    if _use_gcs_photos():
+        return _download_photo_object(_variant_storage_value(file_path, key)) or _download_photo_object(file_path)
+    path = _resolve_photo_path(file_path, rev_id=rev_id)
+    if not path or not path.is_file():
+        return None
+    variant = _variant_path_for(path, key)
+    return str(variant if variant.is_file() else path)
+
+
+async def _backfill_micro_thumbs(rev_id: int, photos: List[tuple[int, str]]) -> None:
+    """
+    Na pozadí po GET manifestu: mikronáhledy po jednom v IMAGE_POOL (uploady mají
+    přednost). Uložení mění updated_at, takže otisk manifestu vidí i ostatní instance.
+    """
+    done: Dict[int, bytes] = {}
+    try:
+        for photo_id, file_path in photos:
+            try:
+                source = await asyncio.to_thread(_micro_source, file_path, rev_id)
+                if source is None:
+                    micro = b""
+                else:
+                    micro = (await IMAGE_POOL.submit(image_pipeline.describe_micro, source)).micro
+            except ImagePoolBusy:
+                break  # zbytek dopočte další GET
+            except Exception as exc:
+                logger.warning("Photo %s: micro thumbnail failed: %s", photo_id, exc)
+                continue
+            done[photo_id] = micro
+        if done and AsyncSessionLocal is not None:
+            async with AsyncSessionLocal() as db:
+                for photo_id, micro in done.items():
+                    await db.execute(
+                        update(RevisionPhoto)
+                        .where(RevisionPhoto.id == photo_id, RevisionPhoto.micro_thumb.is_(None))
+                        .values(micro_thumb=micro)
+                    )
+                await db.commit()
+            MANIFESTS.invalidate(rev_id)
+    finally:
+        _MICRO_BACKFILL.difference_update(photo_id for photo_id, _ in photos)
+
+
+def _build_photo_manifest(db: Session, rev_id: int) -> tuple[RevisionPhotoManifest, List[tuple[int, str]]]:
+    """Manifest + fotky bez mikronáhledu (v manifestu mají micro=null)."""
+    photos = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.revision_id == rev_id, RevisionPhoto.status == PHOTO_ACTIVE)
+        .order_by(RevisionPhoto.created_at.desc(), RevisionPhoto.id.desc())
+        .all()
+    )
+    items = []
+    for photo in photos:
+        base = f"/revisions/{rev_id}/photos/{photo.id}"
+        micro = photo.micro_thumb
+        items.append(
+            RevisionPhotoManifestItem(
+                **_revision_photo_to_schema(photo).model_dump(),
+                url=f"{base}/file",
+                thumb_url=f"{base}/thumb?size=grid",
+                micro=f"data:image/jpeg;base64,{base64.b64encode(micro).decode()}" if micro else None,
+            )
+        )
+    missing = [(photo.id, photo.file_path) for photo in photos if photo.micro_thumb is None]
+    return RevisionPhotoManifest(revision_id=rev_id, count=len(items), photos=items), missing
+
+
+@router.get("/{rev_id}/photos/manifest", response_model=RevisionPhotoManifest)
+def get_revision_photo_manifest(
+    rev_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: UserModel = Depends(get_current_user),
+):
+    """
+    Galerie revize jedním požadavkem: metadata všech fotek, URL a inline mikronáhledy
+    (base64 JPEG ~96 px) místo volání .../thumb pro každou fotku. Odpověď je v cache
+    (utils/photo_manifest.py) a má ETag – opakované otevření je 304. Chybějící
+    mikronáhledy (starší fotky) jsou null a dopočítají se na pozadí; manifest s nimi
+    se necachuje.
+    """
+    _get_revision_or_403(db, rev_id, user)
+    fingerprint = _photo_fingerprint(db, rev_id)
+    cached = MANIFESTS.get(rev_id, fingerprint)
+    if cached is None:
+        manifest, missing = _build_photo_manifest(db, rev_id)
+        body = manifest.model_dump_json().encode()
+        etag = strong_etag(hashlib.sha256(body).hexdigest()[:32])
+        if missing:
+            queued = [item for item in missing if item[0] not in _MICRO_BACKFILL][:PHOTO_MICRO_BACKFILL_BATCH]
+            if queued:
+                _MICRO_BACKFILL.update(photo_id for photo_id, _ in queued)
+                background_tasks.add_task(_backfill_micro_thumbs, rev_id, queued)
+        else:
+            MANIFESTS.put(rev_id, fingerprint, body, etag)
+        cached = body, etag
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _iter_local_file(path: Path, chunk_size: int = photo_zip.CHUNK_SIZE):
+    with path.open("rb") as fh:
+        while chunk := fh.read(chunk_size):
+            yield chunk
+
+
+def _photo_zip_opener(file_path: str, rev_id: int, size: int):
+    if not _use_gcs_photos():
+        def read_file():
+            path = _resolve_photo_path(file_path, rev_id=rev_id)
+            return _iter_local_file(path) if path and path.is_file() else None
+        return read_file
+    if size <= PHOTO_ZIP_PREFETCH_MAX_BYTES:
+        def download():
+            payload = _download_photo_object(file_path)
+            return None if payload is None else [payload]
+        return download
+
+    def stream_object():
+        blob = _get_photo_blob(file_path)
+        return None if blob is None else _iter_photo_blob(blob)
+    return stream_object
+
+
+def stream_photo_zip(photos: List[RevisionPhoto], filename: str, folders: Dict[int, str] | None = None) -> StreamingResponse:
+    """
+    ZIP fotek skládaný za běhu (utils/photo_zip.py): položky pojmenované podle popisků
+    v pořadí pořízení, u projektu složka na revizi. Chybějící soubory se vynechají.
+    Řádky se převezmou hned – stream už session nepotřebuje.
+    """
+    taken: set = set()
+    counters: Dict[int, int] = {}
+    entries: List[photo_zip.ZipEntry] = []
+    for photo in photos:
+        index = counters[photo.revision_id] = counters.get(photo.revision_id, 0) + 1
+        label = photo.caption or Path(photo.original_name or "").stem or f"foto {photo.id}"
+        size = int(photo.file_size or 0)
+        entries.append(
+            photo_zip.ZipEntry(
+                name=photo_zip.entry_name(
+                    f"{index:03d} {label}",
+                    Path(photo.file_path).suffix.lower() or ".jpg",
+                    taken,
+                    folder=(folders or {}).get(photo.revision_id, ""),
+                ),
+                size=size,
+                modified=photo.created_at,
+                open=_photo_zip_opener(photo.file_path, photo.revision_id, size),
+            )
+        )
+    if _use_gcs_photos():
+        entries = photo_zip.prefetch(entries, PHOTO_ZIP_CONCURRENCY, PHOTO_ZIP_PREFETCH_MAX_BYTES)
+    return StreamingResponse(
+        photo_zip.stream_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{photo_zip.folder_name(filename)}.zip"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@router.get("/{rev_id}/photos.zip")
+def download_revision_photos_zip(
+    rev_id: int,
+    db: Session = Depends(get_db),
+    user: UserModel = Depends(get_current_user),
+):
+    """Všechny fotky revize jako ZIP; archiv se nikde celý nedrží (ani u GB projektů)."""
+    rev = _get_revision_or_403(db, rev_id, user)
+    photos = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.revision_id == rev_id, RevisionPhoto.status == PHOTO_ACTIVE)
+        .order_by(RevisionPhoto.created_at, RevisionPhoto.id)
+        .all()
+    )
+    return stream_photo_zip(photos, f"fotky-{rev.number or rev.id}")
 
 
 @router.get("/{rev_id}/photos/{photo_id}/thumb")
 def get_revision_photo_thumb(
     rev_id: int,
     photo_id: int,
+    request: Request,
+    size: Optional[str] = Query(
+        None,
+        description="grid | thumb | lightbox | print, nebo delší hrana v px (nejbližší větší varianta)",
+    ),
     db: Session = Depends(get_db),
     user: UserModel = Depends(get_current_user),
 ):
+    """
+    Předgenerovaná varianta náhledu (viz image_pipeline.THUMB_SPECS). WebP, pokud ho
+    klient uvádí v Accept; nad největší variantou (nebo size=print) se vrací fotka samotná.
+    Nečitelné obrázky nemají varianty – vrací se původní soubor.
+    """
+    try:
+        spec = image_pipeline.pick_variant(size)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
     _get_revision_or_403(db, rev_id, user)
     photo = _get_revision_photo_or_404(db, rev_id, photo_id)
+    fmt = "webp" if _wants_webp(request) else "jpg"
+    key = image_pipeline.variant_key(spec.name, fmt) if spec else None
+    if _use_gcs_photos() and gcs_urls.redirect_enabled():
+        return _gcs_variant_redirect(photo, key, fmt)
+    etag = _photo_etag(photo, key) if key else _photo_etag(photo)
+    if is_not_modified(request, etag):
+        return not_modified(etag, {"Vary": "Accept"})
+    headers = cache_headers(etag, Vary="Accept")
+
     if _use_gcs_photos():
-        thumb_storage = _thumb_storage_value(photo.file_path, rev_id=rev_id)
-        payload = _download_photo_object(thumb_storage)
-        if payload is None:
-            original = _download_photo_object(photo.file_path)
-            if original is None:
-                raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
-            payload = _generate_thumbnail_bytes(original) or original
-            if payload is not original and thumb_storage:
-                _upload_photo_object(thumb_storage, payload, "image/jpeg")
-        return Response(content=payload, media_type="image/jpeg")
+        payload = _ensure_gcs_variant(photo.file_path, key) if key else None
+        if payload is not None:
+            return Response(content=payload, media_type=image_pipeline.FORMAT_MIME[fmt], headers=headers)
+        return _gcs_photo_response(request, photo, etag, headers)
 
     path = _resolve_photo_path(photo.file_path, rev_id=rev_id)
     if not path or not path.is_file():
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Stored photo file not found")
-    thumb_path = _generate_thumbnail(path)
-    media_type = "image/jpeg" if thumb_path.suffix.lower() == ".jpg" else photo.mime_type
-    return FileResponse(thumb_path, media_type=media_type, filename=thumb_path.name)
+    variant_path = _ensure_local_variant(path, key) if key else None
+    if variant_path is None:
+        return RangeFileResponse(path, media_type=photo.mime_type, filename=path.name, headers=headers)
+    return RangeFileResponse(
+        variant_path,
+        media_type=image_pipeline.FORMAT_MIME[fmt],
+        filename=variant_path.name,
+        headers=headers,
+    )
 
 
 @router.patch("/{rev_id}/photos/{photo_id}", response_model=RevisionPhotoRead)
@@ -720,6 +1784,7 @@ def patch_revision_photo(
         photo.defect_uid = str(data["defect_uid"] or "").strip() or None
 
     db.commit()
+    MANIFESTS.invalidate(rev_id)
     db.refresh(photo)
     return _revision_photo_to_schema(photo)
 
@@ -732,29 +1797,36 @@ def delete_revision_photo(
     user: UserModel = Depends(get_current_user),
 ):
     _get_revision_or_403(db, rev_id, user)
-    photo = _get_revision_photo_or_404(db, rev_id, photo_id)
-    file_path = photo.file_path
-    thumb_path = _thumb_storage_value(file_path, rev_id=rev_id)
+    # i pending (zrušený přímý upload)
+    photo = _get_revision_photo_or_404(db, rev_id, photo_id, include_pending=True)
+    removed = [(photo.content_hash, photo.file_path)]
+    managed = photo_blobs.managed(db, [photo])
     db.delete(photo)
     db.commit()
-    _delete_file_if_exists(file_path, rev_id=rev_id)
-    _delete_file_if_exists(thumb_path, rev_id=rev_id)
+    MANIFESTS.invalidate(rev_id)
+    _delete_stored_photos(rev_id, _unused_photo_files(db, removed, managed))
 
 
 # ---------- Update ----------
 
 @router.patch("/{rev_id}", response_model=RevisionRead)
-def patch_revision(
+async def patch_revision(
     rev_id: int,
     payload: RevisionUpdate,
-    db: Session = Depends(get_db),
-    user: UserModel = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
 ):
-    rev = db.get(Revision, rev_id)
+    rev = await db.get(Revision, rev_id)
     if not rev:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
-    if not _can_access_project(user, rev.project):
+    if not await acan_access_project(db, user, rev.project_id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    # If-Match je volitelný; když přijde, musí odpovídat aktuální verzi
+    if_match = request.headers.get("if-match")
+    if if_match and not _etag_matches(if_match, _revision_etag(rev), weak=False):
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail="Revision was modified in the meantime")
 
     data = payload.model_dump(exclude_unset=True)
 
@@ -779,19 +1851,171 @@ def patch_revision(
         if "data_json" in data:
             setattr(rev, "data_json", _ensure_dict(data["data_json"]))
 
-        db.flush()
-        db.commit()
-        db.refresh(rev)
+        _touch_revision(rev, content="data_json" in data)
+        await db.flush()
+        await db.commit()
+        await db.refresh(rev)
+        response.headers["ETag"] = _revision_etag(rev)
         return _to_schema(rev)
 
+    except StaleDataError:
+        # souběžný zápis mezi načtením a UPDATE (WHERE version = ...)
+        await db.rollback()
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail="Revision was modified in the meantime")
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to update revision: {type(e).__name__}: {str(e)}",
         )
 
 
+_MERGE_PATCH_TYPE = "application/merge-patch+json"
+_JSON_PATCH_TYPE = "application/json-patch+json"
+
+
+def _jsonb_path(path: List[str]):
+    return literal(path, PG_ARRAY(Text))
+
+
+async def _jsonb_patch_update(db: AsyncSession, rev: Revision, plan: PushdownPlan) -> Optional[tuple[int, str]]:
+    """
+    Provede plán v Postgresu jedním UPDATE (jsonb_set / jsonb_insert / #-).
+    Vrací (novou verzi, content_hash), nebo None, když neprošel guard (pak se
+    patch aplikuje v Pythonu). Hash se počítá z dokumentu vráceného RETURNING
+    (kanonické kódování jako _touch_revision, jsonb::text by se lišil) a zapíše
+    se ve stejné transakci.
+    """
+    table = Revision.__table__
+    doc = table.c.data_json
+
+    def at(node, path):
+        return node.op("#>", return_type=JSONB)(_jsonb_path(path))
+
+    # komprimovaný dokument (obálka __z__) se patchuje jen v Pythonu
+    guards = [~compressed_json.envelope_clause(doc, postgres=True)]
+    for kind, path, arg in plan.guards:
+        if kind == "exists":
+            guards.append(at(doc, path).isnot(None))
+        elif kind == "type":
+            guards.append(func.jsonb_typeof(at(doc, path)) == arg)
+        elif kind == "longer_than":
+            length = case((func.jsonb_typeof(at(doc, path)) == "array", func.jsonb_array_length(at(doc, path))), else_=-1)
+            guards.append(length > arg)
+        elif kind == "equals":
+            guards.append(at(doc, path) == literal(arg, JSONB))
+
+    expr = doc
+    for kind, path, value in plan.steps:
+        if kind == "remove":
+            expr = expr.op("#-", return_type=JSONB)(_jsonb_path(path))
+        elif kind == "append":
+            # jsonb_insert za poslední prvek; prázdné pole řeší Python cesta
+            length = case((func.jsonb_typeof(at(doc, path)) == "array", func.jsonb_array_length(at(doc, path))), else_=0)
+            guards.append(length > 0)
+            expr = func.jsonb_insert(expr, _jsonb_path(path + ["-1"]), literal(value, JSONB), True, type_=JSONB)
+        elif kind == "insert":
+            expr = func.jsonb_insert(expr, _jsonb_path(path), literal(value, JSONB), type_=JSONB)
+        else:  # set / replace
+            expr = func.jsonb_set(expr, _jsonb_path(path), literal(value, JSONB), kind == "set", type_=JSONB)
+
+    stmt = (
+        update(table)
+        .where(table.c.id == rev.id, table.c.version == rev.version, *guards)
+        .values(data_json=expr, version=table.c.version + 1)
+        .returning(table.c.version, table.c.data_json, *revision_summary.summary_returning(table.c.data_json))
+    )
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        return None
+    content_hash = raw_json.content_hash(row.data_json or {})
+    await db.execute(
+        update(table).where(table.c.id == rev.id, table.c.version == row.version).values(content_hash=content_hash)
+    )
+    # ORM události se u Core UPDATE nespustí – souhrn z hodnot spočtených v DB
+    await db.execute(revision_summary.upsert_statement("postgresql", rev.id, revision_summary.summary_from_returning(row)))
+    return row.version, content_hash
+
+
+@router.patch("/{rev_id}/data", response_model=RevisionVersionRead)
+async def patch_revision_data(
+    rev_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserModel = Depends(get_current_user_async),
+):
+    """
+    Částečná změna data_json bez posílání celého dokumentu.
+    - application/merge-patch+json: RFC 7396 (null = smazat klíč)
+    - application/json-patch+json: RFC 6902 (add/remove/replace/move/copy/test)
+    - application/json: objekt = merge patch, pole = JSON Patch
+    """
+    rev = await db.get(Revision, rev_id, options=[defer(Revision.data_json)])
+    if not rev:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
+    if not await acan_access_project(db, user, rev.project_id):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    if_match = request.headers.get("if-match")
+    if if_match and not _etag_matches(if_match, _revision_etag(rev), weak=False):
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail="Revision was modified in the meantime")
+
+    try:
+        body = raw_json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Request body is not valid JSON")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    is_json_patch = content_type == _JSON_PATCH_TYPE or (content_type != _MERGE_PATCH_TYPE and isinstance(body, list))
+
+    try:
+        if is_json_patch:
+            validate_operations(body)
+        elif not isinstance(body, dict):
+            raise JsonPatchError("Merge patch must be a JSON object")
+
+        if IS_POSTGRES:
+            plan = json_patch_plan(body) if is_json_patch else merge_patch_plan(body)
+            pushed = await _jsonb_patch_update(db, rev, plan) if plan is not None else None
+            if pushed is not None:
+                await db.commit()
+                new_version, content_hash = pushed
+                set_committed_value(rev, "version", new_version)
+                set_committed_value(rev, "content_hash", content_hash)
+                response.headers["ETag"] = _revision_etag(rev)
+                return RevisionVersionRead(id=rev.id, version=new_version, content_hash=content_hash)
+
+        # aktuální stav dokumentu (mohl se mezitím změnit) a aplikace v Pythonu
+        await db.refresh(rev, attribute_names=["data_json", "version", "content_hash"])
+        if if_match and not _etag_matches(if_match, _revision_etag(rev), weak=False):
+            raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail="Revision was modified in the meantime")
+        current = dict(rev.data_json or {})
+        patched = apply_json_patch(current, body) if is_json_patch else merge_patch(current, body)
+        if not isinstance(patched, dict):
+            raise JsonPatchError("Patched document must stay a JSON object")
+
+        rev.data_json = patched
+        _touch_revision(rev)
+        await db.commit()
+        response.headers["ETag"] = _revision_etag(rev)
+        return RevisionVersionRead(id=rev.id, version=rev.version, content_hash=rev.content_hash)
+
+    except JsonPatchConflict as e:
+        await db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=str(e))
+    except JsonPatchError as e:
+        await db.rollback()
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail="Revision was modified in the meantime")
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to patch revision data: {type(e).__name__}: {str(e)}",
+        )
+
+
 # ---------- Delete ----------
 
 @router.delete("/{rev_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -813,15 +2037,14 @@ def delete_revision(
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="User has no password set")
     if not verify_password(payload.password, pwd_hash):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
-    photo_paths = [
-        row.file_path
-        for row in db.query(RevisionPhoto).filter(RevisionPhoto.revision_id == rev_id).all()
-    ]
+    photos = db.query(RevisionPhoto).filter(RevisionPhoto.revision_id == rev_id).all()
+    removed = [(row.content_hash, row.file_path) for row in photos]
+    managed = photo_blobs.managed(db, photos)
     db.delete(rev)
     db.commit()
-    for path in photo_paths:
-        _delete_file_if_exists(path)
-        _delete_file_if_exists(_thumb_storage_value(path))
+    MANIFESTS.invalidate(rev_id)
+    # sdílené soubory (kopie revize) zůstávají, dokud na ně ukazuje jiná fotka
+    _delete_stored_photos(rev_id, _unused_photo_files(db, removed, managed))
     # 204 No Content# ---------- Stav: dokonÄŤit / odemknout ----------
 
 class PasswordBody(BaseModel):
@@ -830,6 +2053,7 @@ class PasswordBody(BaseModel):
 
 class CopyRevisionBody(BaseModel):
     target_project_id: int
+    include_photos: bool = False  # fotky se nasdílí (nové řádky nad stejnými soubory), nic se nekopíruje
 
 
 class RevisionJsonImportBody(BaseModel):
@@ -917,7 +2141,7 @@ def import_revision_json(
     prefix_val = "LPS" if rev_type.upper() == "LPS" else "RZ"
 
     project = Project(
-        number=_generate_project_number(db, user.id),
+        number=generate_project_number(db, user.id),
         address=address,
         client=client,
         owner_id=user.id,
@@ -931,7 +2155,7 @@ def import_revision_json(
     if payload.preserve_identifiers and _identifier_available(db, "number", imported_number):
         number = imported_number
     else:
-        number = _generate_revision_number(db, project.id, getattr(project, "number", None), date_done.year, prefix_val)
+        number = generate_revision_number(db, project.id, getattr(project, "number", None), date_done.year, prefix_val)
 
     if payload.preserve_identifiers and _identifier_available(db, "uuid", imported_uuid):
         rev_uuid = imported_uuid
@@ -960,6 +2184,7 @@ def import_revision_json(
             if isinstance(data_json_val.get("defects"), list)
             else _first_text(data_json_val.get("defects")),
         )
+        _touch_revision(rev)
         db.add(rev)
         db.commit()
         db.refresh(rev)
@@ -984,19 +2209,19 @@ def copy_revision(
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Revision not found")
 
     src_project = db.get(Project, src.project_id)
-    if not src_project or not _can_access_project(user, src_project):
+    if not src_project or not can_access_project(db, user, src_project.id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     target_project = db.get(Project, payload.target_project_id)
     if not target_project:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Target project not found")
-    if not _can_access_project(user, target_project):
+    if not can_access_project(db, user, target_project.id):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     src_date_done = _ensure_date(src.date_done) or date.today()
     src_valid_until = _ensure_date(src.valid_until)
     prefix_val = "LPS" if (str(src.type or "").upper() == "LPS") else "RZ"
-    number = _generate_revision_number(
+    number = generate_revision_number(
         db,
         target_project.id,
         getattr(target_project, "number", None),
@@ -1024,17 +2249,93 @@ def copy_revision(
             conclusion_valid_until=_ensure_date(src.conclusion_valid_until),
             defects=src.defects,
         )
+        _touch_revision(copied)
         db.add(copied)
         db.flush()
+        superseded: List[str] = []
+        if payload.include_photos:
+            superseded = _share_revision_photos(db, src.id, copied.id)
         db.commit()
         db.refresh(copied)
-        return _to_schema(copied)
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to copy revision: {type(e).__name__}: {str(e)}",
         )
+    _delete_stored_photos(src.id, superseded)
+    return _to_schema(copied)
+
+
+def _share_revision_photos(db: Session, src_id: int, dst_id: int) -> List[str]:
+    """
+    Aktivní fotky zdrojové revize jako nové řádky kopie nad stejnými bloby – bez
+    kopírování souborů (ref_count zvednou mapper eventy). Starší fotku bez blobu
+    blob převezme: na místě, nebo (lokální nekanonická cesta) hardlinkem do CAS.
+    Vrací soubory, které převzetím ztratily odkaz (smazat po commitu).
+    """
+    photos = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.revision_id == src_id, RevisionPhoto.status == PHOTO_ACTIVE)
+        .order_by(RevisionPhoto.created_at, RevisionPhoto.id)
+        .all()
+    )
+    managed = photo_blobs.managed(db, photos)
+    superseded: List[str] = []
+    for photo in photos:
+        if (photo.content_hash, photo.file_path) not in managed:
+            content_hash = photo.content_hash or _stored_photo_hash(photo, src_id)
+            if content_hash is None:
+                logger.warning("Photo %s: stored file not found, not copied", photo.id)
+                continue
+            blob = db.get(PhotoBlob, content_hash)
+            if blob is None:
+                storage_key = photo.file_path
+                if not _use_gcs_photos() and not photo_storage.is_canonical_key(storage_key):
+                    storage_key = _link_into_blob_store(photo, content_hash, src_id)
+                blob = photo_blobs.ensure_blob(
+                    db,
+                    content_hash=content_hash,
+                    storage_key=storage_key,
+                    mime_type=photo.mime_type,
+                    file_size=photo.file_size,
+                )
+            if blob.storage_key != photo.file_path:
+                superseded.append(photo.file_path)
+            photo.content_hash = content_hash
+            photo.file_path = blob.storage_key
+        db.add(
+            RevisionPhoto(
+                revision_id=dst_id,
+                defect_uid=photo.defect_uid,
+                caption=photo.caption,
+                original_name=photo.original_name,
+                mime_type=photo.mime_type,
+                file_size=photo.file_size,
+                file_path=photo.file_path,
+                content_hash=photo.content_hash,
+                created_at=photo.created_at,
+            )
+        )
+    db.flush()
+    return superseded
+
+
+def _link_into_blob_store(photo: RevisionPhoto, content_hash: str, rev_id: int) -> str:
+    """Starší soubor (absolutní / Windows cesta) do CAS klíče hardlinkem i s náhledy; původní smaže volající."""
+    source = _resolve_photo_path(photo.file_path, rev_id=rev_id)
+    storage_key = _photo_blob_key(content_hash, source.suffix.lower() or ".jpg")
+    target = photo_storage.UPLOAD_ROOT / storage_key
+    target.parent.mkdir(parents=True, exist_ok=True)
+    pairs = [(_variant_path_for(source, key), _variant_path_for(target, key)) for key in image_pipeline.variant_keys()]
+    for src_path, dst_path in [*pairs, (source, target)]:
+        if not src_path.is_file() or dst_path.exists():
+            continue
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            shutil.copyfile(src_path, dst_path)  # jiný svazek
+    return storage_key
 
 
 @router.post("/{rev_id}/complete", response_model=RevisionRead)
@@ -1050,6 +2351,7 @@ def mark_completed(
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only owner can complete")
 
     rev.status = "Dokončená"
+    _touch_revision(rev, content=False)
     db.commit()
     db.refresh(rev)
     return _to_schema(rev)
@@ -1095,6 +2397,7 @@ def unlock_revision(
     if hasattr(rev, "locked"):
         rev.locked = False
     rev.status = "Rozpracovaná"
+    _touch_revision(rev, content=False)
 
     db.commit()
     db.refresh(rev)
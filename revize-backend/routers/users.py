@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from database import get_db
 from routers.auth import get_current_user
+from routers.deps import invalidate_user_cache
 from models import User, CompanyProfile
 from schemas import (
     UserProfileRead, UserProfileUpdate,
@@ -39,6 +40,7 @@ def patch_me(payload: UserProfileUpdate, db: Session = Depends(get_db), user: Us
     for k, v in data.items():
         setattr(user, k, v)
     db.commit()
+    invalidate_user_cache(user_id=user.id)
     db.refresh(user)
     return _user_to_schema(user)
 
@@ -53,6 +55,7 @@ def update_my_profile(payload: UserProfileUpdate, db: Session = Depends(get_db),
     for k, v in data.items():
         setattr(user, k, v)
     db.commit()
+    invalidate_user_cache(user_id=user.id)
     db.refresh(user)
     return _user_to_schema(user)
 
@@ -77,6 +80,7 @@ def create_company(payload: CompanyProfileCreate, db: Session = Depends(get_db),
     if not getattr(user, "active_company_id", None):
         user.active_company_id = row.id
         db.commit()
+        invalidate_user_cache(user_id=user.id)
     return _company_to_schema(row)
 
 @router.patch("/companies/{cid}", response_model=CompanyProfileRead)
@@ -107,6 +111,7 @@ def delete_company(cid: int, db: Session = Depends(get_db), user: User = Depends
         )
         user.active_company_id = other.id if other else None
         db.commit()
+        invalidate_user_cache(user_id=user.id)
     # 204 No Content
 
 
@@ -117,6 +122,7 @@ def activate_company(cid: int, db: Session = Depends(get_db), user: User = Depen
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Company not found")
     user.active_company_id = row.id
     db.commit()
+    invalidate_user_cache(user_id=user.id)
     db.refresh(user)
     return _user_to_schema(user)
 
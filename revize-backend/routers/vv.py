@@ -10,9 +10,11 @@ from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
 from database import get_db
+from routers.access import ensure_project_access_or_404
 from routers.auth import get_current_user
 from models import Project, User as UserModel, VvDoc as VvDocModel
 from schemas import VvDocCreate, VvDocUpdate, VvDocRead
+from utils.numbering import generate_vv_number
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/vv", tags=["vv"])
@@ -31,56 +33,6 @@ def _get_user_password_hash(user: UserModel) -> Optional[str]:
     return getattr(user, "password_hash", None) or getattr(user, "hashed_password", None)
 
 
-def _ensure_project_access_or_404(db: Session, pid: int, user: UserModel) -> Project:
-    prj = db.get(Project, pid)
-    if not prj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-    shared_ids = {u.id for u in getattr(prj, "shared_with_users", [])}
-    if prj.owner_id != user.id and user.id not in shared_ids:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return prj
-
-
-def _normalize_project_number(project_number: str | None, project_id: int) -> str:
-    raw = str(project_number or "").strip()
-    if raw:
-        try:
-            return str(int(raw))
-        except ValueError:
-            return raw
-    return str(project_id)
-
-
-def _generate_vv_number(db: Session, project_id: int, project_number: str | None) -> str:
-    """
-    Format: VV-<projectNumber>-<seq>-<year>
-    seq is per-project and per-year.
-    """
-    year = datetime.now().year
-    normalized_project_number = _normalize_project_number(project_number, project_id)
-    prefix = f"VV-{normalized_project_number}-"
-    suffix = f"-{year}"
-
-    rows = (
-        db.query(VvDocModel.number)
-        .filter(VvDocModel.project_id == project_id)
-        .filter(VvDocModel.number.like(f"{prefix}%{suffix}"))
-        .all()
-    )
-
-    max_seq = 0
-    for (num,) in rows:
-        parts = (num or "").split("-")
-        if len(parts) >= 4 and parts[0] == "VV" and parts[-1] == str(year):
-            try:
-                max_seq = max(max_seq, int(parts[2]))
-            except Exception:
-                pass
-
-    next_seq = max_seq + 1
-    return f"{prefix}{next_seq}{suffix}"
-
-
 def _default_protocol_data(project: Project) -> dict:
     """Výchozí struktura, kterou editor očekává."""
     today = datetime.now().date().isoformat()
@@ -111,12 +63,12 @@ def create_vv(
     db: Session = Depends(get_db),
     user: UserModel = Depends(get_current_user),
 ):
-    prj = _ensure_project_access_or_404(db, payload.project_id, user)
+    prj = ensure_project_access_or_404(db, payload.project_id, user)
 
     if db.get(VvDocModel, payload.id):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Document with this ID already exists")
 
-    number = _generate_vv_number(db, prj.id, getattr(prj, "number", None))
+    number = generate_vv_number(db, prj.id, getattr(prj, "number", None))
 
     row = VvDocModel(
         id=payload.id,
@@ -139,7 +91,7 @@ def get_vv(
     row = db.get(VvDocModel, doc_id)
     if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    _ensure_project_access_or_404(db, row.project_id, user)
+    ensure_project_access_or_404(db, row.project_id, user)
     return row
 
 
@@ -153,7 +105,7 @@ def put_vv(
     row = db.get(VvDocModel, doc_id)
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    _ensure_project_access_or_404(db, row.project_id, user)
+    ensure_project_access_or_404(db, row.project_id, user)
 
     if payload.project_id is not None and payload.project_id != row.project_id:
         raise HTTPException(status_code=400, detail="Changing project_id is not allowed. Create a new VV in the target project.")
@@ -173,7 +125,7 @@ def list_vv_for_project(
     db: Session = Depends(get_db),
     user: UserModel = Depends(get_current_user),
 ):
-    _ensure_project_access_or_404(db, project_id, user)
+    ensure_project_access_or_404(db, project_id, user)
     rows = (
         db.query(VvDocModel)
         .filter(VvDocModel.project_id == project_id)
@@ -193,7 +145,7 @@ def delete_vv(
     row = db.get(VvDocModel, doc_id)
     if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    prj = _ensure_project_access_or_404(db, row.project_id, user)
+    prj = ensure_project_access_or_404(db, row.project_id, user)
     if prj.owner_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only owner can delete")
 
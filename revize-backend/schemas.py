@@ -57,6 +57,9 @@ class RevisionRead(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+    version: Optional[int] = None
+    content_hash: Optional[str] = None
+
     # prázdný string -> None
     @field_validator("date_done", "valid_until", "conclusion_valid_until", mode="before")
     @classmethod
@@ -66,6 +69,49 @@ class RevisionRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RevisionVersionRead(BaseModel):
+    """Odpověď PATCH /revisions/{id}/data – jen nová verze, bez dokumentu."""
+    id: int
+    version: int
+    content_hash: Optional[str] = None
+
+
+class RevisionSummaryRead(BaseModel):
+    """Řádek seznamu revizí – bez data_json (celý dokument vrací jen GET /revisions/{id})."""
+    id: int
+    project_id: int
+    uuid: str | None = None
+    number: Optional[str] = None
+    type: Optional[str] = None
+    status: Optional[str] = None
+    date_done: Optional[date] = None
+    valid_until: Optional[date] = None
+
+    project_number: Optional[str] = None
+    project_address: Optional[str] = None
+    project_client: Optional[str] = None
+
+    # souhrn z data_json (revision_summaries)
+    board_count: Optional[int] = None
+    component_count: Optional[int] = None
+    defect_count: Optional[int] = None
+    conclusion_safety: Optional[str] = None
+    client_name: Optional[str] = None
+    next_revision_date: Optional[date] = None
+
+    @field_validator("date_done", "valid_until", mode="before")
+    @classmethod
+    def _empty_str_to_none(cls, v):
+        return None if v == "" else v
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RevisionPage(BaseModel):
+    items: List[RevisionSummaryRead] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
 # ==========================
 # PROJECT
 # ==========================
@@ -109,6 +155,27 @@ class ProjectRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProjectIndexItem(BaseModel):
+    """Řádek přehledu projektů – agregace revizí místo vložených dokumentů."""
+    id: int
+    number: Optional[str] = None
+    address: Optional[str] = None
+    client: Optional[str] = None
+    owner_id: Optional[int] = None
+    is_owner: bool = False
+    shared_user_count: int = 0
+
+    revision_count: int = 0
+    revision_counts: Dict[str, int] = Field(default_factory=dict)  # status -> počet
+    latest_date_done: Optional[date] = None
+    nearest_valid_until: Optional[date] = None
+
+
+class ProjectIndexPage(BaseModel):
+    items: List[ProjectIndexItem] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
 # ==========================
 # USER
 # ==========================
@@ -265,11 +332,67 @@ class RevisionPhotoRead(BaseModel):
     original_name: Optional[str] = None
     mime_type: str
     file_size: int
+    content_hash: Optional[str] = None
+    status: str = "active"
     created_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class RevisionPhotoUploadCreate(BaseModel):
+    """Žádost o přímý upload do bucketu (fáze 1)."""
+    filename: Optional[str] = None
+    content_type: str
+    size: Optional[int] = None
+    caption: str = ""
+    defect_uid: Optional[str] = None
+
+
+class RevisionPhotoUploadTicket(BaseModel):
+    """Kam a jak nahrát soubor; po nahrání POST .../photos/{photo.id}/finalize."""
+    photo: RevisionPhotoRead
+    upload_url: str
+    method: str
+    headers: Dict[str, str] = {}
+    expires_at: Optional[datetime] = None
+
+
+class RevisionPhotoUrlRead(BaseModel):
+    """URL fotky a náhledu pro galerii; expires_at je vyplněné u podepsaných URL (GCS)."""
+    id: int
+    url: str
+    thumb_url: str
+    expires_at: Optional[datetime] = None
+
+
+class RevisionPhotoManifestItem(RevisionPhotoRead):
+    url: str
+    thumb_url: str
+    micro: Optional[str] = None  # data URI (JPEG ~96 px) pro okamžité vykreslení mřížky
+
+
+class RevisionPhotoManifest(BaseModel):
+    """Celá galerie revize jedním požadavkem (metadata + inline mikronáhledy)."""
+    revision_id: int
+    count: int
+    photos: List[RevisionPhotoManifestItem] = Field(default_factory=list)
+
+
+class RevisionPhotoBatchItem(BaseModel):
+    """Výsledek jednoho souboru z dávkového uploadu (pořadí odpovídá `files`)."""
+    index: int
+    filename: Optional[str] = None
+    status: int
+    photo: Optional[RevisionPhotoRead] = None
+    error: Optional[str] = None
+
+
+class RevisionPhotoBatchRead(BaseModel):
+    uploaded: int = 0
+    failed: int = 0
+    items: List[RevisionPhotoBatchItem] = Field(default_factory=list)
+
+
 class ComponentTypeCreate(BaseModel):
     name: str = Field(..., min_length=1)
 
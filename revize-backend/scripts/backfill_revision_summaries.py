@@ -0,0 +1,54 @@
+"""
+Doplní / přepočte tabulku revision_summaries (utils/revision_summary.py) z data_json.
+
+    python scripts/backfill_revision_summaries.py                 # jen revize bez souhrnu
+    python scripts/backfill_revision_summaries.py --all           # přepočti všechny
+    python scripts/backfill_revision_summaries.py --batch-size 200
+
+Po migraci `revision_summaries` stačí spustit jednou; další zápisy souhrn udržují samy.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Revision, RevisionSummary
+from utils.revision_summary import summarize, upsert_statement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="přepočti i revize, které souhrn už mají")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    pending = select(Revision.id, Revision.data_json).order_by(Revision.id).limit(args.batch_size)
+    if not args.all:
+        pending = pending.where(~select(RevisionSummary.revision_id).where(RevisionSummary.revision_id == Revision.id).exists())
+
+    t0 = time.perf_counter()
+    last_id, done = 0, 0
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(pending.where(Revision.id > last_id)).all()
+            if not rows:
+                break
+            dialect = db.get_bind().dialect.name
+            for rev_id, data_json in rows:
+                db.execute(upsert_statement(dialect, rev_id, summarize(data_json)))
+            db.commit()
+        last_id = rows[-1].id
+        done += len(rows)
+        print(f"{done} revisions summarized (last id {last_id})")
+    print(f"done in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
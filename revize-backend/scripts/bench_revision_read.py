@@ -0,0 +1,118 @@
+"""
+Benchmark čtení revize: původní cesta (dekódování data_json + Pydantic) vs.
+vložení uloženého JSON textu do odpovědi (GET /revisions/{id}).
+
+Příklady:
+    python scripts/bench_revision_read.py --rev-id 4 --repeat 50
+    python scripts/bench_revision_read.py --synthetic-mb 8 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+from sqlalchemy.orm import defer
+
+from database import SessionLocal
+from models import Revision
+from routers.revisions import _raw_data_json_column, _raw_revision_response
+from schemas import RevisionRead
+from utils import raw_json
+
+SAMPLE = Path(__file__).resolve().parents[1] / "sample_revisions" / "revision_1.json"
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> Tuple[List[float], int, int]:
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    size = len(fn())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak, size
+
+
+def report(label: str, result: Tuple[List[float], int, int]) -> None:
+    timings, peak, size = result
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    print(
+        f"{label:<8} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms   "
+        f"peak {peak / 1024 / 1024:8.2f} MiB   body {size / 1024:9.1f} KiB"
+    )
+
+
+def bench_db(rev_id: int, repeat: int) -> None:
+    def legacy() -> bytes:
+        with SessionLocal() as db:
+            rev = db.get(Revision, rev_id)
+            return RevisionRead.model_validate(rev, from_attributes=True).model_dump_json().encode("utf-8")
+
+    def raw() -> bytes:
+        with SessionLocal() as db:
+            rev, raw_value = db.execute(
+                select(Revision, _raw_data_json_column())
+                .options(defer(Revision.data_json))
+                .where(Revision.id == rev_id)
+            ).one()
+            return bytes(_raw_revision_response(rev, raw_value).body)
+
+    print(f"revision {rev_id} ({repeat}x)")
+    report("legacy", measure(legacy, repeat))
+    report("raw", measure(raw, repeat))
+
+
+def bench_synthetic(target_mb: float, repeat: int) -> None:
+    doc = json.loads(SAMPLE.read_text(encoding="utf-8"))
+    board = {
+        "name": "RH1",
+        "vyrobce": "OEZ",
+        "komponenty": [{"nazev": f"FA{i}", "popis": "Jistič B16/1", "typ": "jistič"} for i in range(40)],
+    }
+    doc["boards"] = [board]
+    while len(json.dumps(doc)) < target_mb * 1024 * 1024:
+        doc["boards"] = doc["boards"] * 2
+    stored = json.dumps(doc)
+    envelope = {"id": 1, "project_id": 1, "number": "RZ-0000-0-001", "type": "RZ", "status": "Rozpracovaná"}
+
+    def legacy() -> bytes:
+        return RevisionRead.model_validate({**envelope, "data_json": json.loads(stored)}).model_dump_json().encode("utf-8")
+
+    def raw() -> bytes:
+        head = RevisionRead.model_validate(envelope).model_dump_json(exclude={"data_json"}).encode("utf-8")
+        return raw_json.splice_field(head, "data_json", raw_json.object_bytes(stored))
+
+    print(f"synthetic {len(stored) / 1024 / 1024:.1f} MiB document ({repeat}x)")
+    report("legacy", measure(legacy, repeat))
+    report("raw", measure(raw, repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rev-id", type=int, action="append", default=[], help="revize z DATABASE_URL (lze opakovat)")
+    parser.add_argument("--synthetic-mb", type=float, default=0, help="velikost syntetického dokumentu v MiB")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.rev_id and not args.synthetic_mb:
+        parser.error("zadej --rev-id nebo --synthetic-mb")
+    for rev_id in args.rev_id:
+        bench_db(rev_id, args.repeat)
+    if args.synthetic_mb:
+        bench_synthetic(args.synthetic_mb, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Komprese data_json v klidu (utils/compressed_json.py) – nástroje pro správu.
+
+    # slovník z ukázkových revizí (+ N posledních revizí z DB)
+    python scripts/compress_documents.py train --from-db 200
+
+    # velikost DB a latence čtení
+    python scripts/compress_documents.py report
+
+    # převod existujících řádků po dávkách (report před a po)
+    python scripts/compress_documents.py convert --codec zlib --min-bytes 65536 --dict-id <id>
+
+    # návrat k nekomprimovanému uložení
+    python scripts/compress_documents.py convert --codec off
+
+Převod jen přepíše data_json – verze revize (ETag) se nemění, obsah je stejný.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Text, cast, func, select, text
+from sqlalchemy.orm.attributes import flag_modified
+
+from database import IS_POSTGRES, IS_SQLITE, SessionLocal, engine
+from models import Revision, VvDoc
+from utils import compressed_json, raw_json
+
+BACKEND = Path(__file__).resolve().parents[1]
+MODELS = {"revisions": Revision, "vv_docs": VvDoc}
+ZLIB_DICT_LIMIT = 32 * 1024  # zlib používá jen posledních 32 KiB slovníku
+
+
+def _tables(name: str) -> List[str]:
+    return list(MODELS) if name == "all" else [name]
+
+
+def _stored_text(model):
+    return cast(model.__table__.c.data_json, Text)
+
+
+def _envelope_filter(model):
+    return compressed_json.envelope_clause(model.__table__.c.data_json, postgres=IS_POSTGRES)
+
+
+# ---------- report ----------
+
+def database_size() -> dict:
+    with engine.connect() as conn:
+        if IS_SQLITE:
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            pages = conn.execute(text("PRAGMA page_count")).scalar()
+            free = conn.execute(text("PRAGMA freelist_count")).scalar()
+            path = engine.url.database
+            return {
+                "file_bytes": os.path.getsize(path) if path and os.path.exists(path) else None,
+                "used_bytes": (pages - free) * page_size,
+            }
+        if IS_POSTGRES:
+            return {
+                table: conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table}).scalar()
+                for table in MODELS
+            }
+    return {}
+
+
+def read_latency(model, sample: int) -> dict:
+    with SessionLocal() as db:
+        ids = [row[0] for row in db.execute(select(model.id).order_by(model.id.desc()).limit(sample))]
+    timings = []
+    for pk in ids:
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            db.execute(select(model.data_json).where(model.id == pk)).scalar_one()
+            timings.append((time.perf_counter() - t0) * 1000)
+    if not timings:
+        return {"samples": 0}
+    return {
+        "samples": len(timings),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def report(tables: Iterable[str], sample: int) -> None:
+    print(f"database: {database_size()}")
+    with SessionLocal() as db:
+        for table in tables:
+            model = MODELS[table]
+            total, stored = db.execute(
+                select(func.count(), func.coalesce(func.sum(func.length(_stored_text(model))), 0))
+            ).one()
+            packed = db.execute(select(func.count()).where(_envelope_filter(model))).scalar()
+            print(
+                f"{table:<10} rows {total:>6}  compressed {packed:>6}  stored {stored / 1024:10.1f} KiB  "
+                f"read {read_latency(model, sample)}"
+            )
+
+
+# ---------- convert ----------
+
+def convert(tables: Iterable[str], batch_size: int, dry_run: bool) -> None:
+    settings = compressed_json.SETTINGS
+    for table in tables:
+        model = MODELS[table]
+        if settings.enabled:
+            # jen nekomprimované řádky nad prahem (délka textu je dolní odhad velikosti)
+            pending = ~_envelope_filter(model) & (func.length(_stored_text(model)) >= settings.min_bytes)
+        else:
+            pending = _envelope_filter(model)
+
+        last_id, converted = None, 0
+        while True:
+            with SessionLocal() as db:
+                stmt = select(model).where(pending).order_by(model.id).limit(batch_size)
+                if last_id is not None:
+                    stmt = stmt.where(model.id > last_id)
+                rows = db.execute(stmt).scalars().all()
+                if not rows:
+                    break
+                for row in rows:
+                    flag_modified(row, "data_json")  # zápis projde CompressedJSON.process_bind_param
+                last_id = rows[-1].id
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+                converted += len(rows)
+            print(f"{table}: {converted} rows {'checked' if dry_run else 'rewritten'} (last id {last_id})")
+
+
+# ---------- train ----------
+
+def _samples(paths: List[str], from_db: int) -> List[bytes]:
+    docs = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)):
+            docs.append(Path(path).read_bytes())
+    if from_db:
+        with SessionLocal() as db:
+            for value in db.execute(select(Revision.data_json).order_by(Revision.id.desc()).limit(from_db)).scalars():
+                docs.append(raw_json.dumps(value or {}))
+    return docs
+
+
+def _raw_content_dictionary(docs: List[bytes], size: int) -> bytes:
+    """Nejčastější klíče a hodnoty; nejčastější na konci (zlib je tam nejlevněji odkazuje)."""
+    fragments: Counter = Counter()
+
+    def walk(node) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                fragments[json.dumps(key, ensure_ascii=False) + ":"] += 1
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, str) and len(node) <= 64:
+            fragments[json.dumps(node, ensure_ascii=False)] += 1
+
+    for doc in docs:
+        walk(raw_json.loads(doc))
+    chosen, used = [], 0
+    for fragment, _ in fragments.most_common():
+        encoded = fragment.encode("utf-8")
+        if used + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        used += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+def train(paths: List[str], from_db: int, codec: str, size: int) -> None:
+    docs = _samples(paths, from_db)
+    if not docs:
+        raise SystemExit("no samples")
+    if codec == "zstd" and compressed_json.zstandard is not None and len(docs) >= 8:
+        data = compressed_json.zstandard.train_dictionary(size, docs).as_bytes()
+    else:
+        data = _raw_content_dictionary(docs, min(size, ZLIB_DICT_LIMIT) if codec == "zlib" else size)
+
+    dict_id = hashlib.sha256(data).hexdigest()[:12]
+    out_dir = compressed_json.SETTINGS.dict_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f"{dict_id}.dict").write_bytes(data)
+
+    plain = sum(len(doc) for doc in docs)
+    compressed_json.configure(codec=codec)
+    without = sum(len(compressed_json._compress(doc, codec, None)) for doc in docs)
+    with_dict = sum(len(compressed_json._compress(doc, codec, dict_id)) for doc in docs)
+    print(f"dictionary {dict_id}: {len(data)} B from {len(docs)} samples -> {out_dir}")
+    print(f"samples {plain} B, {codec} {without} B, {codec}+dict {with_dict} B")
+    print(f"enable with DATA_JSON_DICT_ID={dict_id}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_report = sub.add_parser("report")
+    p_report.add_argument("--table", choices=[*MODELS, "all"], default="all")
+    p_report.add_argument("--sample", type=int, default=50, help="počet dokumentů pro měření čtení")
+
+    p_convert = sub.add_parser("convert")
+    p_convert.add_argument("--table", choices=[*MODELS, "all"], default="all")
+    p_convert.add_argument("--codec", choices=["off", *compressed_json.CODECS])
+    p_convert.add_argument("--min-bytes", type=int)
+    p_convert.add_argument("--level", type=int)
+    p_convert.add_argument("--dict-id")
+    p_convert.add_argument("--batch-size", type=int, default=50)
+    p_convert.add_argument("--sample", type=int, default=50)
+    p_convert.add_argument("--dry-run", action="store_true")
+    p_convert.add_argument("--vacuum", action="store_true", help="SQLite: VACUUM po převodu (uvolní místo v souboru)")
+
+    p_train = sub.add_parser("train")
+    p_train.add_argument("--samples", nargs="*", default=[str(BACKEND / "sample_revisions" / "*.json")])
+    p_train.add_argument("--from-db", type=int, default=0, help="přidej N posledních revizí z DB")
+    p_train.add_argument("--codec", choices=compressed_json.CODECS, default="zlib")
+    p_train.add_argument("--size", type=int, default=ZLIB_DICT_LIMIT)
+
+    args = parser.parse_args()
+    if args.command == "report":
+        report(_tables(args.table), args.sample)
+    elif args.command == "convert":
+        compressed_json.configure(codec=args.codec, min_bytes=args.min_bytes, level=args.level, dict_id=args.dict_id)
+        tables = _tables(args.table)
+        print("== before")
+        report(tables, args.sample)
+        convert(tables, args.batch_size, args.dry_run)
+        if args.vacuum and IS_SQLITE and not args.dry_run:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+        print("== after")
+        report(tables, args.sample)
+        print(f"compression: {compressed_json.compression_stats()}")
+    else:
+        train(args.samples, args.from_db, args.codec, args.size)
+
+
+if __name__ == "__main__":
+    main()
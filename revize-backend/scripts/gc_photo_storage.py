@@ -0,0 +1,271 @@
+"""
+Úklid souborů fotek a náhledů, na které neukazuje žádný řádek – plánovaná údržba.
+
+    python scripts/gc_photo_storage.py --dry-run              # jen report, nic nemaže
+    python scripts/gc_photo_storage.py                        # smaž osiřelé soubory starší než 24 h
+    python scripts/gc_photo_storage.py --grace-hours 6 --workers 8 --json
+
+Plánované spouštění: cron (30 3 * * * cd /srv/revize-backend && python
+scripts/gc_photo_storage.py --json >> logs/photo_gc.log) nebo Cloud Run job
+se stejným příkazem, spouštěný Cloud Schedulerem. Běh je idempotentní.
+
+Jmenný prostor úložiště (lokálně UPLOAD_ROOT, v GCS prefix revision_photos/) se
+porovná s odkazy v DB:
+- revision_photos.file_path (i pending) a varianty náhledů vedle nich
+- photo_blobs.storage_key (utils/photo_blobs.py); bloby bez odkazu (např. po
+  smazání projektu) starší než grace period se nejdřív uvolní
+- pending přímé uploady starší než grace period se zruší (řádek i objekt)
+
+Soubory mladší než grace period se nemažou nikdy (upload zapisuje soubor před
+commitem řádku). Úložiště se vypisuje před čtením DB, takže soubor, jehož řádek
+mezitím vznikl, je vždy odkazovaný. Mazání běží paralelně po dávkách (v GCS
+jeden batch request na dávku, max. 100 objektů).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path, PurePosixPath
+from typing import Iterator, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import and_, delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import PhotoBlob, RevisionPhoto
+from utils import image_pipeline, photo_blobs, photo_storage
+
+GCS_BATCH_LIMIT = 100
+
+
+@dataclass
+class StoredObject:
+    key: str  # relativní cesta pod UPLOAD_ROOT / jméno objektu v bucketu
+    size: int
+    mtime: float
+
+
+# ---------- Úložiště ----------
+
+class LocalStore:
+    name = "local"
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def list(self) -> Iterator[StoredObject]:
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(path.relative_to(self.root).as_posix(), st.st_size, st.st_mtime)
+
+    def key_for(self, file_path: str, rev_id: Optional[int]) -> Optional[str]:
+        path = photo_storage.resolve_local_path(file_path, rev_id=rev_id)
+        if path is None:
+            return None
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return None  # mimo UPLOAD_ROOT – GC se toho nedotkne
+
+    def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            (self.root / key).unlink(missing_ok=True)
+
+
+class GcsStore:
+    name = "gcs"
+
+    def __init__(self, bucket_name: str) -> None:
+        from google.cloud import storage as gcs_storage  # type: ignore
+
+        self.client = gcs_storage.Client()
+        self.bucket = self.client.bucket(bucket_name)
+
+    def list(self) -> Iterator[StoredObject]:
+        for blob in self.client.list_blobs(self.bucket, prefix=f"{photo_blobs.GCS_PREFIX}/"):
+            updated = blob.updated.timestamp() if blob.updated else time.time()
+            yield StoredObject(blob.name, int(blob.size or 0), updated)
+
+    def key_for(self, file_path: str, rev_id: Optional[int]) -> Optional[str]:
+        return str(file_path).strip().lstrip("/") or None
+
+    def delete(self, keys: List[str]) -> None:
+        # jeden multipart požadavek na dávku
+        with self.client.batch():
+            for key in keys:
+                self.bucket.blob(key).delete()
+
+
+def _variant_keys(key: str) -> List[str]:
+    path = PurePosixPath(key)
+    return [str(path.with_name(f"{path.stem}_{variant}")) for variant in image_pipeline.variant_keys()]
+
+
+# ---------- Databáze ----------
+
+def _unreferenced_blob_clause(cutoff: datetime):
+    return and_(
+        PhotoBlob.ref_count <= 0,
+        PhotoBlob.created_at < cutoff,
+        ~exists().where(
+            RevisionPhoto.content_hash == PhotoBlob.content_hash,
+            RevisionPhoto.file_path == PhotoBlob.storage_key,
+        ),
+    )
+
+
+def _release_stale(db: Session, cutoff: datetime, dry_run: bool, stats: Counter) -> Set[str]:
+    """Bloby bez odkazu a opuštěné pending uploady; vrací jejich klíče (v dry-run se jen spočtou)."""
+    stale_blobs = db.execute(select(PhotoBlob.storage_key).where(_unreferenced_blob_clause(cutoff))).scalars().all()
+    pending = (
+        db.query(RevisionPhoto)
+        .filter(RevisionPhoto.status == "pending", RevisionPhoto.created_at < cutoff)
+        .all()
+    )
+    stats["blobs_released"] += len(stale_blobs)
+    stats["pending_expired"] += len(pending)
+    if not dry_run:
+        # podmínka znovu v DELETE – souběžné nasdílení blobu vyhraje
+        db.execute(delete(PhotoBlob).where(_unreferenced_blob_clause(cutoff)))
+        for photo in pending:
+            db.delete(photo)
+        db.commit()
+    return set(stale_blobs) | {photo.file_path for photo in pending}
+
+
+def _recount_refs(db: Session, stats: Counter) -> None:
+    """Jen pro opravu po zápisech mimo ORM – jinak ref_count drží mapper eventy."""
+    count = (
+        select(func.count(RevisionPhoto.id))
+        .where(RevisionPhoto.content_hash == PhotoBlob.content_hash, RevisionPhoto.file_path == PhotoBlob.storage_key)
+        .correlate(PhotoBlob)
+        .scalar_subquery()
+    )
+    stats["refs_fixed"] += db.execute(update(PhotoBlob).where(PhotoBlob.ref_count != count).values(ref_count=count)).rowcount
+    db.commit()
+
+
+def _referenced_keys(db: Session, store, released: Set[str], dry_run: bool) -> Set[str]:
+    referenced: Set[str] = set()
+
+    def add(file_path: Optional[str], rev_id: Optional[int]) -> None:
+        if not file_path or (dry_run and file_path in released):
+            return
+        key = store.key_for(file_path, rev_id)
+        if key:
+            referenced.add(key)
+            referenced.update(_variant_keys(key))
+
+    for file_path, rev_id in db.execute(
+        select(RevisionPhoto.file_path, RevisionPhoto.revision_id).execution_options(yield_per=1000)
+    ):
+        add(file_path, rev_id)
+    for (storage_key,) in db.execute(select(PhotoBlob.storage_key).execution_options(yield_per=1000)):
+        add(storage_key, None)
+    return referenced
+
+
+# ---------- Běh ----------
+
+def _chunks(items: List[StoredObject], size: int) -> Iterator[List[StoredObject]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run(store, grace: timedelta, dry_run: bool, recount: bool, workers: int, batch_size: int) -> Counter:
+    stats: Counter = Counter()
+    cutoff = datetime.utcnow() - grace
+    cutoff_ts = time.time() - grace.total_seconds()
+
+    # nejdřív úložiště, pak DB (viz docstring)
+    objects = list(store.list())
+    stats["scanned"] = len(objects)
+    stats["scanned_bytes"] = sum(obj.size for obj in objects)
+
+    with SessionLocal() as db:
+        if recount and not dry_run:
+            _recount_refs(db, stats)
+        released = _release_stale(db, cutoff, dry_run, stats)
+        referenced = _referenced_keys(db, store, released, dry_run)
+
+    orphans: List[StoredObject] = []
+    for obj in objects:
+        if obj.key in referenced:
+            stats["referenced"] += 1
+        elif obj.mtime > cutoff_ts:
+            stats["skipped_young"] += 1
+        else:
+            orphans.append(obj)
+    stats["orphaned"] = len(orphans)
+    stats["orphaned_bytes"] = sum(obj.size for obj in orphans)
+    if dry_run or not orphans:
+        return stats
+
+    def sweep(chunk: List[StoredObject]) -> tuple[int, int]:
+        try:
+            store.delete([obj.key for obj in chunk])
+        except Exception as exc:
+            print(f"  batch of {len(chunk)} failed ({chunk[0].key} …): {exc}", file=sys.stderr)
+            return 0, 0
+        return len(chunk), sum(obj.size for obj in chunk)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for deleted, reclaimed in pool.map(sweep, _chunks(orphans, batch_size)):
+            stats["deleted"] += deleted
+            stats["bytes_reclaimed"] += reclaimed
+    stats["failed"] = stats["orphaned"] - stats["deleted"]
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="jen report, nic nemaže")
+    parser.add_argument("--grace-hours", type=float, default=24.0, help="mladší soubory a řádky se nemažou")
+    parser.add_argument("--storage", choices=("auto", "local", "gcs"), default="auto")
+    parser.add_argument("--recount-refs", action="store_true", help="přepočti photo_blobs.ref_count z revision_photos")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=GCS_BATCH_LIMIT)
+    parser.add_argument("--json", action="store_true", help="výsledek jako jeden řádek JSON (pro logy)")
+    args = parser.parse_args()
+
+    bucket = (os.getenv("PHOTO_BUCKET") or os.getenv("GCS_PHOTO_BUCKET") or "").strip()
+    kind = args.storage if args.storage != "auto" else ("gcs" if bucket else "local")
+    if kind == "gcs" and not bucket:
+        sys.exit("PHOTO_BUCKET is not set.")
+    store = GcsStore(bucket) if kind == "gcs" else LocalStore(photo_storage.UPLOAD_ROOT)
+    batch_size = max(1, min(args.batch_size, GCS_BATCH_LIMIT) if kind == "gcs" else args.batch_size)
+
+    t0 = time.perf_counter()
+    stats = run(store, timedelta(hours=args.grace_hours), args.dry_run, args.recount_refs, max(1, args.workers), batch_size)
+    report = {
+        "storage": store.name,
+        "dry_run": args.dry_run,
+        "grace_hours": args.grace_hours,
+        **dict(stats),
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(json.dumps(report, indent=2))
+    verb = "would reclaim" if args.dry_run else "reclaimed"
+    reclaimed = stats["orphaned_bytes"] if args.dry_run else stats["bytes_reclaimed"]
+    print(f"{verb} {reclaimed / (1024 * 1024):.1f} MB in {stats['orphaned']} orphaned files")
+
+
+if __name__ == "__main__":
+    main()
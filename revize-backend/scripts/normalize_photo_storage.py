@@ -0,0 +1,235 @@
+"""
+Normalizace uložení fotek revizí na lokálním disku – jednorázová údržba.
+
+    python scripts/normalize_photo_storage.py --dry-run        # jen report, nic nemění
+    python scripts/normalize_photo_storage.py                  # kanonické klíče + chybějící náhledy
+    python scripts/normalize_photo_storage.py --recompress     # + přepočet uploadů z doby před zmenšováním
+    python scripts/normalize_photo_storage.py --resume         # pokračuj za posledním dokončeným id
+    python scripts/normalize_photo_storage.py --workers 4 --batch-size 200
+
+- file_path se přepíše na kanonický klíč "<revision_id>/<soubor>" (utils/photo_storage.py);
+  soubor mimo uploads/revision_photos/<revision_id>/ se tam přesune i s náhledy
+- chybějící varianty náhledů (image_pipeline.THUMB_SPECS) se dogenerují v process poolu
+- chybějící content_hash (silný ETag fotky) se dopočte ze souboru; GET ho nepočítá
+- --recompress: ne-JPEG nebo delší hrana nad MAX_LONG_EDGE projde stejnou pipeline
+  jako nový upload (nový soubor, starý se smaže); soubory sdílené přes photo_blobs
+  (utils/photo_blobs.py) se nepřepočítávají
+
+Stav (poslední dokončené id) se ukládá po každé dávce do --state. Po doběhu se
+všechny řádky resolvují jedním přímým lookupem. GCS úložiště se nenormalizuje –
+klíče tam jsou kanonické od začátku a náhledy dogeneruje GET .../thumb.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import RevisionPhoto
+from utils import image_pipeline, photo_blobs, photo_storage
+from utils.image_pipeline import ProcessedPhoto
+
+BACKEND = Path(__file__).resolve().parents[1]
+DEFAULT_STATE = BACKEND / "data" / "normalize_photo_storage.json"
+
+# (photo id, cesta, přípona, mime, chybí varianty, přepočítat, chybí hash)
+Job = Tuple[int, str, str, str, bool, bool, bool]
+
+
+def _variant_path(path: Path, key: str) -> Path:
+    return path.with_name(f"{path.stem}_{key}")
+
+
+def _missing_variants(path: Path) -> bool:
+    return any(not _variant_path(path, key).is_file() for key in image_pipeline.variant_keys())
+
+
+def _derive(job: Job) -> Tuple[int, Optional[ProcessedPhoto]]:
+    """Worker: přepočet celé fotky, nebo jen náhledy + hash, nebo jen hash (soubor beze změny)."""
+    photo_id, path, ext, mime_type, missing, recompress, unhashed = job
+    if recompress:
+        processed = image_pipeline.process_photo(
+            path, ext, mime_type, image_pipeline.MAX_LONG_EDGE, image_pipeline.JPEG_QUALITY
+        )
+        if processed.payload is not None:
+            return photo_id, processed
+    if missing:
+        return photo_id, image_pipeline.describe_stored_photo(path, ext, mime_type)
+    if unhashed:
+        size = os.path.getsize(path)
+        return photo_id, ProcessedPhoto(None, ext, mime_type, size, content_hash=image_pipeline.sha256_file(path))
+    return photo_id, None
+
+
+def _canonical_target(photo: RevisionPhoto, path: Path) -> Path:
+    target = photo_storage.revision_dir(photo.revision_id) / path.name
+    if target != path and target.exists():
+        # kolize jmen (starší uploady do UPLOAD_ROOT/<jméno>) – nové jméno
+        target = target.with_name(f"{uuid4().hex}{path.suffix.lower()}")
+    return target
+
+
+def _move_with_variants(path: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    for key in image_pipeline.variant_keys():
+        variant = _variant_path(path, key)
+        if variant.is_file():
+            shutil.move(str(variant), str(_variant_path(target, key)))
+    shutil.move(str(path), str(target))
+
+
+def _remove_with_variants(path: Path) -> None:
+    for key in image_pipeline.variant_keys():
+        _variant_path(path, key).unlink(missing_ok=True)
+    path.unlink(missing_ok=True)
+
+
+def _apply(photo: RevisionPhoto, path: Path, processed: Optional[ProcessedPhoto], stats: Counter) -> None:
+    if processed is not None and processed.payload is not None:
+        target_dir = photo_storage.revision_dir(photo.revision_id)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / f"{uuid4().hex}{processed.ext}"
+        target.write_bytes(processed.payload)
+        for key, data in processed.variants.items():
+            _variant_path(target, key).write_bytes(data)
+        stats["bytes_before"] += path.stat().st_size
+        stats["bytes_after"] += processed.size
+        _remove_with_variants(path)
+        photo.mime_type = processed.mime_type
+        photo.file_size = processed.size
+        photo.content_hash = processed.content_hash
+        photo.file_path = photo_storage.local_key(photo.revision_id, target.name)
+        stats["recompressed"] += 1
+        return
+
+    target = _canonical_target(photo, path)
+    if target != path:
+        _move_with_variants(path, target)
+        stats["moved"] += 1
+    if processed is not None:
+        for key, data in processed.variants.items():
+            _variant_path(target, key).write_bytes(data)
+        if processed.variants:
+            stats["variants_generated"] += 1
+        if not photo.content_hash and processed.content_hash:
+            photo.content_hash = processed.content_hash
+            stats["hashed"] += 1
+    photo.file_size = target.stat().st_size
+    key = photo_storage.local_key(photo.revision_id, target.name)
+    if photo.file_path != key:
+        photo.file_path = key
+        stats["rewritten"] += 1
+
+
+def _plan(photo: RevisionPhoto, recompress: bool, stats: Counter) -> Optional[Tuple[Path, Job]]:
+    path = photo_storage.resolve_local_path(photo.file_path, rev_id=photo.revision_id)
+    if path is None or not path.is_file():
+        stats["missing"] += 1
+        print(f"  missing: photo {photo.id} ({photo.file_path})")
+        return None
+    canonical = photo_storage.is_canonical_key(photo.file_path)
+    missing = _missing_variants(path)
+    redo = recompress and image_pipeline.needs_recompress(str(path))
+    unhashed = not photo.content_hash
+    if canonical and not missing and not redo and not unhashed:
+        stats["ok"] += 1
+        return None
+    stats["needs_key"] += int(not canonical)
+    stats["needs_variants"] += int(missing)
+    stats["needs_recompress"] += int(redo)
+    stats["needs_hash"] += int(unhashed)
+    ext = path.suffix.lower() or ".jpg"
+    return path, (photo.id, str(path), ext, photo.mime_type or "application/octet-stream", missing, redo, unhashed)
+
+
+def _load_state(path: Path) -> int:
+    try:
+        return int(json.loads(path.read_text(encoding="utf-8")).get("last_id", 0))
+    except (OSError, ValueError):
+        return 0
+
+
+def _save_state(path: Path, last_id: int, stats: Counter) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"last_id": last_id, "stats": dict(stats)}, indent=2), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="jen report, nic nezapisuje")
+    parser.add_argument("--recompress", action="store_true", help="přepočti nezmenšené / ne-JPEG uploady")
+    parser.add_argument("--resume", action="store_true", help="začni za last_id ze --state")
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    if (os.getenv("PHOTO_BUCKET") or os.getenv("GCS_PHOTO_BUCKET") or "").strip():
+        sys.exit("Photos are stored in GCS – nothing to normalize on local disk.")
+
+    last_id = _load_state(args.state) if args.resume else 0
+    if last_id:
+        print(f"resuming after photo id {last_id}")
+    stats: Counter = Counter()
+    t0 = time.perf_counter()
+    executor = None
+    if not args.dry_run:
+        executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    try:
+        while True:
+            with SessionLocal() as db:
+                photos = db.execute(
+                    select(RevisionPhoto)
+                    .where(RevisionPhoto.id > last_id, RevisionPhoto.status == "active")
+                    .order_by(RevisionPhoto.id)
+                    .limit(args.batch_size)
+                ).scalars().all()
+                if not photos:
+                    break
+                plans: Dict[int, Tuple[Path, Job]] = {}
+                shared = photo_blobs.managed(db, photos)
+                for photo in photos:
+                    stats["total"] += 1
+                    recompress = args.recompress and (photo.content_hash, photo.file_path) not in shared
+                    plan = _plan(photo, recompress, stats)
+                    if plan is not None:
+                        plans[photo.id] = plan
+                last_id = photos[-1].id
+
+                if args.dry_run:
+                    continue
+                jobs = [job for _, job in plans.values() if job[4] or job[5] or job[6]]
+                results = dict(executor.map(_derive, jobs)) if jobs else {}
+                for photo in photos:
+                    if photo.id in plans:
+                        _apply(photo, plans[photo.id][0], results.get(photo.id), stats)
+                db.commit()
+            _save_state(args.state, last_id, stats)
+            print(f"{stats['total']} photos checked (last id {last_id})")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print(json.dumps(dict(stats), indent=2))
+    if args.dry_run:
+        print("dry run – nothing was changed")
+    print(f"done in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# tests/conftest.py
+"""
+Společné fixtures: aplikace nad dočasnou SQLite databází (schéma z modelů),
+revize s vlastníkem a jeho Bearer hlavičkou, fotky na lokálním disku v tmp.
+
+    cd revize-backend && python -m pytest -q
+
+- testy proti fake-gcs-server běží jen s dosažitelným STORAGE_EMULATOR_HOST
+  (docker run -p 4443:4443 fsouza/fake-gcs-server -scheme http -public-host localhost:4443),
+  jinak se přeskočí
+- Postgres varianty běží jen s TEST_POSTGRES_URL (prázdná databáze, vytvoří si tabulky)
+"""
+from __future__ import annotations
+
+import io
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+BACKEND = Path(__file__).resolve().parents[1]
+TEST_TABLES = (
+    "company_profiles",
+    "users",
+    "projects",
+    "project_user_link",
+    "revisions",
+    "revision_summaries",
+    "revision_photos",
+    "photo_blobs",
+    "number_sequences",
+)
+
+# před importem aplikace – database.py a routery čtou env při importu
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='revize-tests-')).as_posix()}/test.db"
+os.environ["IMAGE_POOL_WORKERS"] = "0"
+os.environ.pop("PHOTO_BUCKET", None)
+os.environ.pop("GCS_PHOTO_BUCKET", None)
+sys.path.insert(0, str(BACKEND))
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    from database import Base, engine
+
+    # jen tabulky, které testy používají (user_instruments má Postgres ARRAY)
+    Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[name] for name in TEST_TABLES])
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+def _forget_photo_blobs() -> None:
+    # bloby z jiných testů ukazují do jejich tmp / bucketu – stejný obsah by se nezapsal
+    from database import SessionLocal
+    from models import PhotoBlob
+
+    with SessionLocal() as db:
+        db.query(PhotoBlob).delete()
+        db.commit()
+
+
+@pytest.fixture
+def photo_root(app, tmp_path, monkeypatch):
+    from utils import photo_storage
+
+    _forget_photo_blobs()
+    root = tmp_path / "revision_photos"
+    monkeypatch.setattr(photo_storage, "UPLOAD_ROOT", root)
+    return root
+
+
+@pytest.fixture
+def revision(app):
+    """Nový uživatel s projektem a revizí; .id, .headers (Bearer token vlastníka)."""
+    from database import SessionLocal
+    from models import Project, Revision, User
+    from utils.security import create_access_token
+
+    with SessionLocal() as db:
+        user = User(name="Test", email=f"{uuid4().hex}@example.com", password_hash="-", is_verified=True)
+        db.add(user)
+        db.flush()
+        project = Project(number="1", address="Testovací 1", client="Test", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        rev = Revision(number=f"T-{uuid4().hex[:12]}", type="Test", date_done=date.today(), project_id=project.id)
+        db.add(rev)
+        db.commit()
+        token = create_access_token({"sub": user.email})
+        return SimpleNamespace(id=rev.id, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.fixture
+def jpeg():
+    def make(width: int = 800, height: int = 600) -> bytes:
+        buf = io.BytesIO()
+        Image.new("RGB", (width, height), (200, 120, 40)).save(buf, "JPEG")
+        return buf.getvalue()
+
+    return make
+
+
+def _emulator_host() -> str | None:
+    host = (os.getenv("STORAGE_EMULATOR_HOST") or "").strip().rstrip("/")
+    if not host:
+        return None
+    try:
+        httpx.get(f"{host}/storage/v1/b", params={"project": "test"}, timeout=2)
+    except httpx.HTTPError:
+        return None
+    return host
+
+
+@pytest.fixture
+def gcs_bucket(app, monkeypatch):
+    """Prázdný bucket ve fake-gcs-server; fotky aplikace jdou do něj."""
+    host = _emulator_host()
+    if host is None:
+        pytest.skip("fake-gcs-server is not available (STORAGE_EMULATOR_HOST)")
+    from google.cloud import storage
+
+    import routers.revisions as revisions
+    from utils import gcs_urls
+
+    _forget_photo_blobs()
+    gcs = storage.Client(project="test")
+    bucket = gcs.create_bucket(f"revize-test-{uuid4().hex[:12]}")
+    monkeypatch.setattr(revisions, "PHOTO_BUCKET", bucket.name)
+    monkeypatch.setattr(revisions, "_gcs_client", gcs)
+    monkeypatch.setattr(gcs_urls, "EMULATOR_HOST", host)
+    yield bucket
+    for blob in gcs.list_blobs(bucket.name):
+        blob.delete()
+    bucket.delete()
@@ -0,0 +1,126 @@
+# tests/test_direct_upload.py
+"""Přímý upload do bucketu: ticket -> nahrání do fake-gcs-server -> finalize / notifikace -> aktivní fotka."""
+from __future__ import annotations
+
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+import routers.revisions as revisions
+
+NOTIFY_TOKEN = "notify-secret"
+
+
+@pytest.fixture
+def notify_token(monkeypatch):
+    monkeypatch.setattr(revisions, "PHOTO_NOTIFY_TOKEN", NOTIFY_TOKEN)
+    return NOTIFY_TOKEN
+
+
+def _notification(bucket: str, object_id: str) -> dict:
+    return {"message": {"attributes": {"eventType": "OBJECT_FINALIZE", "bucketId": bucket, "objectId": object_id}}}
+
+
+@pytest.mark.parametrize("token", ["", "notify-secreT", "notify-secret-", "x"])
+def test_notification_rejects_wrong_token(client, notify_token, token):
+    resp = client.post("/photo-notifications/gcs", params={"token": token}, json=_notification("b", "o"))
+    assert resp.status_code == 404
+
+
+def test_notification_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(revisions, "PHOTO_NOTIFY_TOKEN", "")
+    resp = client.post("/photo-notifications/gcs", params={"token": ""}, json=_notification("b", "o"))
+    assert resp.status_code == 404
+
+
+def test_notification_ignores_other_buckets(client, notify_token):
+    resp = client.post("/photo-notifications/gcs", params={"token": notify_token}, json=_notification("other", "o"))
+    assert resp.status_code == 204
+
+
+# ---------- fake-gcs-server ----------
+
+def _ticket(client, revision, size: int) -> dict:
+    resp = client.post(
+        f"/revisions/{revision.id}/photos/uploads",
+        headers=revision.headers,
+        json={"filename": "site.jpg", "content_type": "image/jpeg", "size": size, "caption": "rozvaděč"},
+    )
+    assert resp.status_code == 201, resp.text
+    ticket = resp.json()
+    assert ticket["photo"]["status"] == "pending"
+    return ticket
+
+
+def _put(ticket: dict, data: bytes) -> None:
+    resp = httpx.request(ticket["method"], ticket["upload_url"], headers=ticket["headers"], content=data)
+    assert resp.status_code in (200, 201), resp.text
+
+
+def _listed(client, revision) -> list:
+    resp = client.get(f"/revisions/{revision.id}/photos", headers=revision.headers)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_direct_upload_finalize_activates_photo(client, revision, gcs_bucket, jpeg):
+    data = jpeg()
+    ticket = _ticket(client, revision, len(data))
+    photo_id = ticket["photo"]["id"]
+    finalize = f"/revisions/{revision.id}/photos/{photo_id}/finalize"
+
+    assert client.post(finalize, headers=revision.headers).status_code == 409
+    assert _listed(client, revision) == []
+
+    _put(ticket, data)
+    resp = client.post(finalize, headers=revision.headers)
+
+    assert resp.status_code == 200, resp.text
+    photo = resp.json()
+    assert photo["status"] == "active"
+    assert photo["file_size"] == len(data)
+    assert photo["mime_type"] == "image/jpeg"
+    # hash a náhledy dopočítá úloha na pozadí (TestClient ji spustí před návratem)
+    (listed,) = _listed(client, revision)
+    assert listed["id"] == photo_id
+    assert listed["caption"] == "rozvaděč"
+    assert listed["content_hash"]
+    thumb = client.get(f"/revisions/{revision.id}/photos/{photo_id}/thumb", headers=revision.headers)
+    assert thumb.status_code == 200
+
+    # idempotentní
+    again = client.post(finalize, headers=revision.headers)
+    assert again.status_code == 200
+    assert again.json()["status"] == "active"
+
+
+def test_direct_upload_rejects_non_image(client, revision, gcs_bucket):
+    ticket = _ticket(client, revision, 100)
+    _put(ticket, b"not an image" * 8)
+
+    resp = client.post(f"/revisions/{revision.id}/photos/{ticket['photo']['id']}/finalize", headers=revision.headers)
+
+    assert resp.status_code == 400
+    assert _listed(client, revision) == []
+    assert list(gcs_bucket.client.list_blobs(gcs_bucket.name)) == []
+
+
+def test_bucket_notification_activates_photo(client, revision, gcs_bucket, notify_token, jpeg):
+    data = jpeg()
+    ticket = _ticket(client, revision, len(data))
+    _put(ticket, data)
+    # emulátor: ?uploadType=media&name=<objekt>
+    (object_id,) = parse_qs(urlsplit(ticket["upload_url"]).query)["name"]
+
+    resp = client.post(
+        "/photo-notifications/gcs",
+        params={"token": notify_token},
+        json=_notification(gcs_bucket.name, object_id),
+    )
+
+    assert resp.status_code == 204
+    (listed,) = _listed(client, revision)
+    assert listed["id"] == ticket["photo"]["id"]
+    assert listed["status"] == "active"
+    assert listed["content_hash"]
@@ -0,0 +1,77 @@
+# tests/test_http_cache.py
+"""Podmíněné GET a Range fotek (utils/http_cache.py): If-Range se slabým ETagem nikdy nevrací 206."""
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import update
+from starlette.requests import Request
+
+from utils.http_cache import parse_range, strong_etag, weak_etag
+
+STRONG = strong_etag("abc")
+WEAK = weak_etag("p1", "abc")
+
+
+def _request(**headers: str) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.mark.parametrize(
+    "if_range, etag, expected",
+    [
+        (None, STRONG, (0, 9)),
+        (STRONG, STRONG, (0, 9)),
+        (strong_etag("other"), STRONG, None),
+        (WEAK, WEAK, None),
+        (f"W/{STRONG}", STRONG, None),
+        (STRONG, WEAK, None),
+    ],
+)
+def test_if_range_uses_strong_comparison(if_range, etag, expected):
+    headers = {"range": "bytes=0-9"}
+    if if_range is not None:
+        headers["if_range"] = if_range
+    assert parse_range(_request(**headers), 100, etag) == expected
+
+
+def _photo(client, revision, jpeg) -> dict:
+    resp = client.post(
+        f"/revisions/{revision.id}/photos",
+        headers=revision.headers,
+        files={"file": ("a.jpg", jpeg(), "image/jpeg")},
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()
+
+
+def test_local_photo_range_with_strong_etag(client, revision, photo_root, jpeg):
+    photo = _photo(client, revision, jpeg)
+    url = f"/revisions/{revision.id}/photos/{photo['id']}/file"
+    etag = client.get(url, headers=revision.headers).headers["etag"]
+    assert not etag.startswith("W/")
+
+    resp = client.get(url, headers={**revision.headers, "Range": "bytes=0-9", "If-Range": etag})
+
+    assert resp.status_code == 206
+    assert len(resp.content) == 10
+
+
+def test_local_photo_ignores_range_for_weak_etag(client, revision, photo_root, jpeg):
+    from database import SessionLocal
+    from models import RevisionPhoto
+
+    photo = _photo(client, revision, jpeg)
+    with SessionLocal() as db:
+        db.execute(update(RevisionPhoto).where(RevisionPhoto.id == photo["id"]).values(content_hash=None))
+        db.commit()
+    url = f"/revisions/{revision.id}/photos/{photo['id']}/file"
+    etag = client.get(url, headers=revision.headers).headers["etag"]
+    assert etag.startswith("W/")
+
+    resp = client.get(url, headers={**revision.headers, "Range": "bytes=0-9", "If-Range": etag})
+
+    assert resp.status_code == 200
+    assert len(resp.content) == photo["file_size"]
+    # bez If-Range se rozsah obslouží i pro slabý ETag
+    assert client.get(url, headers={**revision.headers, "Range": "bytes=0-9"}).status_code == 206
@@ -0,0 +1,97 @@
+# tests/test_numbering.py
+"""
+Souběžné přidělování evidenčních čísel (utils/numbering.next_sequence_value).
+
+Vlákna začnou naráz nad čítačem, který ještě neexistuje (závod o INSERT ... ON
+CONFLICT), a část transakcí se vrací. Potvrzená čísla musí být unikátní,
+souvislá od 1 a čítač musí skončit na posledním z nich. Postgres jen s
+TEST_POSTGRES_URL.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import NumberSequence
+from utils.numbering import next_sequence_value
+
+SCOPE = "test"
+THREADS = 8
+PER_THREAD = 25
+ROLLBACK_EVERY = 5  # každá pátá transakce vlákna se vrací
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def session_factory(request, app):
+    if request.param == "sqlite":
+        from database import SessionLocal
+
+        return SessionLocal
+    url = (os.getenv("TEST_POSTGRES_URL") or "").strip()
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url, pool_size=THREADS)
+    NumberSequence.__table__.create(engine, checkfirst=True)
+    request.addfinalizer(engine.dispose)
+    return sessionmaker(bind=engine)
+
+
+def _allocate(session_factory, owner_key: int, start: threading.Barrier, committed: list, errors: list) -> None:
+    start.wait()
+    for i in range(PER_THREAD):
+        db = session_factory()
+        try:
+            value = next_sequence_value(db, SCOPE, owner_key, "T", 0)
+            if i % ROLLBACK_EVERY == ROLLBACK_EVERY - 1:
+                db.rollback()
+            else:
+                db.commit()
+                committed.append(value)
+        except Exception as exc:
+            db.rollback()
+            errors.append(exc)
+        finally:
+            db.close()
+
+
+def test_concurrent_numbers_are_unique_and_contiguous(session_factory):
+    owner_key = uuid4().int % 2**31  # vlastní čítač pro každý běh
+    committed: list = []
+    errors: list = []
+    start = threading.Barrier(THREADS)
+    threads = [
+        threading.Thread(target=_allocate, args=(session_factory, owner_key, start, committed, errors))
+        for _ in range(THREADS)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with session_factory() as db:
+        row = db.get(NumberSequence, (SCOPE, owner_key, "T", 0))
+        counter = row.last_value
+        db.delete(row)
+        db.commit()
+
+    assert errors == []
+    expected = THREADS * (PER_THREAD - PER_THREAD // ROLLBACK_EVERY)
+    assert [value for value, n in Counter(committed).items() if n > 1] == []
+    assert sorted(committed) == list(range(1, expected + 1))
+    assert counter == expected
+
+
+def test_seed_continues_existing_numbers(session_factory):
+    owner_key = uuid4().int % 2**31
+    with session_factory() as db:
+        first = next_sequence_value(db, SCOPE, owner_key, "T", 0, seed=lambda: 41)
+        second = next_sequence_value(db, SCOPE, owner_key, "T", 0, seed=lambda: 0)
+        db.rollback()
+
+    assert (first, second) == (42, 43)
@@ -0,0 +1,147 @@
+# tests/test_photo_urls.py
+"""Podepsané URL fotek (utils/gcs_urls.py), 302 na bucket a JSON galerie (GET .../photos/urls)."""
+from __future__ import annotations
+
+import io
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from PIL import Image
+
+from utils import gcs_urls
+
+
+@pytest.fixture
+def signing_cache(monkeypatch):
+    """SignedUrlCache s lokálním klíčem service accountu – podpis bez sítě i bez emulátoru."""
+    from google.oauth2 import service_account
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode("ascii")
+    credentials = service_account.Credentials.from_service_account_info(
+        {
+            "client_email": "photos@revize-test.iam.gserviceaccount.com",
+            "private_key": pem,
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }
+    )
+    credentials.token = "test"  # platné -> žádný refresh
+    monkeypatch.setattr(gcs_urls, "EMULATOR_HOST", "")
+    cache = gcs_urls.SignedUrlCache(ttl_s=600)
+    cache._credentials = credentials
+    return cache
+
+
+@pytest.fixture
+def blob():
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import storage
+
+    gcs = storage.Client(project="test", credentials=AnonymousCredentials())
+    return gcs.bucket("revize-photos").blob("cas/ab/abcdef.jpg")
+
+
+def test_signed_url_is_v4_and_cached(signing_cache, blob):
+    url, expires_at = signing_cache.url_for(blob, response_type="image/jpeg")
+
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    assert parts.netloc == "storage.googleapis.com"
+    assert parts.path == "/revize-photos/cas/ab/abcdef.jpg"
+    assert query["X-Goog-Algorithm"] == ["GOOG4-RSA-SHA256"]
+    assert query["X-Goog-Expires"] == ["600"]
+    assert query["response-content-type"] == ["image/jpeg"]
+    assert query["X-Goog-Signature"][0]
+    assert expires_at is not None
+
+    again, _ = signing_cache.url_for(blob, response_type="image/jpeg")
+    assert again == url
+    assert signing_cache.stats()["signed"] == 1
+    assert signing_cache.stats()["hits"] == 1
+    assert signing_cache.is_cached("revize-photos", "cas/ab/abcdef.jpg", response_type="image/jpeg")
+
+
+def test_upload_ticket_signs_size_range(signing_cache, blob):
+    ticket = signing_cache.upload_ticket(blob, "image/jpeg", 1024)
+
+    query = parse_qs(urlsplit(ticket.url).query)
+    assert ticket.method == "PUT"
+    assert ticket.headers == {"Content-Type": "image/jpeg", "x-goog-content-length-range": "0,1024"}
+    assert "x-goog-content-length-range" in query["X-Goog-SignedHeaders"][0].split(";")
+    assert query["X-Goog-Signature"][0]
+
+
+def test_photo_urls_point_to_api_in_proxy_mode(client, revision, photo_root, jpeg):
+    uploaded = client.post(
+        f"/revisions/{revision.id}/photos",
+        headers=revision.headers,
+        files={"file": ("a.jpg", jpeg(), "image/jpeg")},
+    )
+    assert uploaded.status_code == 201
+    photo_id = uploaded.json()["id"]
+
+    resp = client.get(f"/revisions/{revision.id}/photos/urls", params={"size": "grid"}, headers=revision.headers)
+
+    assert resp.status_code == 200
+    base = f"/revisions/{revision.id}/photos/{photo_id}"
+    assert resp.json() == [{"id": photo_id, "url": f"{base}/file", "thumb_url": f"{base}/thumb?size=grid", "expires_at": None}]
+
+
+# ---------- fake-gcs-server ----------
+
+@pytest.fixture
+def redirect_mode(gcs_bucket, monkeypatch):
+    monkeypatch.setattr(gcs_urls, "PHOTO_URL_MODE", "redirect")
+    return gcs_bucket
+
+
+def _upload(client, revision, data: bytes) -> int:
+    resp = client.post(
+        f"/revisions/{revision.id}/photos",
+        headers=revision.headers,
+        files={"file": ("a.jpg", data, "image/jpeg")},
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()["id"]
+
+
+def test_photo_file_redirects_to_bucket(client, revision, redirect_mode, jpeg):
+    photo_id = _upload(client, revision, jpeg())
+
+    resp = client.get(f"/revisions/{revision.id}/photos/{photo_id}/file", headers=revision.headers, follow_redirects=False)
+
+    assert resp.status_code == 302
+    assert resp.headers["cache-control"] == f"private, max-age={gcs_urls.PHOTO_URLS.redirect_max_age()}"
+    location = resp.headers["location"]
+    assert location.startswith(f"{gcs_urls.EMULATOR_HOST}/storage/v1/b/{redirect_mode.name}/o/")
+    stored = httpx.get(location)
+    assert stored.status_code == 200
+    assert stored.content[:2] == b"\xff\xd8"
+
+
+def test_photo_urls_list_bucket_objects(client, revision, redirect_mode, jpeg):
+    first = _upload(client, revision, jpeg(800, 600))
+    second = _upload(client, revision, jpeg(600, 800))
+
+    resp = client.get(f"/revisions/{revision.id}/photos/urls", params={"size": "grid"}, headers=revision.headers)
+
+    assert resp.status_code == 200
+    items = resp.json()
+    assert [item["id"] for item in items] == [second, first]
+    for item in items:
+        assert item["url"].startswith(gcs_urls.EMULATOR_HOST)
+        # varianty vznikly při uploadu -> i náhled vede přímo do bucketu
+        assert item["thumb_url"].startswith(gcs_urls.EMULATOR_HOST)
+        thumb = httpx.get(item["thumb_url"])
+        assert thumb.status_code == 200
+        assert max(_jpeg_size(thumb.content)) <= 240
+
+
+def _jpeg_size(data: bytes) -> tuple[int, int]:
+    with Image.open(io.BytesIO(data)) as img:
+        return img.size
@@ -0,0 +1,219 @@
+# utils/compressed_json.py
+# -----------------------------------------------------------------------------
+# Optional compression at rest for large JSON documents (Revision / VvDoc
+# data_json). Documents above a size threshold are stored as a JSON envelope
+#
+#   {"__z__": "zlib" | "zstd", "__zd__": <dictionary id> | null, "__zp__": "<base64>"}
+#
+# so the column stays JSON / JSONB and no schema change is needed. The payload
+# is the document's JSON text, so the raw read path (GET /revisions/{id}) can
+# decompress and splice it without parsing. Compression is off by default.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import base64
+import os
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Boolean, Text, cast, literal
+from sqlalchemy.types import JSON, TypeDecorator
+
+from utils import raw_json
+
+try:  # volitelná závislost – bez ní je k dispozici jen zlib
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+ENVELOPE_KEY = "__z__"
+DICT_KEY = "__zd__"
+PAYLOAD_KEY = "__zp__"
+# SQLite i Postgres (jsonb řadí klíče podle délky) začínají text obálky tímto klíčem
+_ENVELOPE_PREFIX = b'{"' + ENVELOPE_KEY.encode("ascii") + b'"'
+
+CODECS = ("zlib", "zstd")
+DEFAULT_DICT_DIR = Path(__file__).resolve().parents[1] / "data" / "json_dicts"
+
+
+class CompressionSettings:
+    def __init__(self) -> None:
+        self.codec = (os.getenv("DATA_JSON_COMPRESSION") or "off").strip().lower()  # off | zlib | zstd
+        self.min_bytes = int(os.getenv("DATA_JSON_COMPRESS_MIN_BYTES", "65536"))
+        self.level = int(os.getenv("DATA_JSON_COMPRESS_LEVEL", "6"))
+        self.dict_dir = Path(os.getenv("DATA_JSON_DICT_DIR") or DEFAULT_DICT_DIR)
+        self.dict_id = (os.getenv("DATA_JSON_DICT_ID") or "").strip() or None
+
+    @property
+    def enabled(self) -> bool:
+        return self.codec in CODECS
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "codec": self.codec,
+            "min_bytes": self.min_bytes,
+            "level": self.level,
+            "dict_id": self.dict_id,
+            "zstd_available": zstandard is not None,
+        }
+
+
+SETTINGS = CompressionSettings()
+
+
+def configure(**overrides: Any) -> None:
+    """Přepiš nastavení za běhu (CLI skripty)."""
+    for key, value in overrides.items():
+        if value is not None:
+            setattr(SETTINGS, key, value)
+
+
+# ---------- statistiky ----------
+
+_stats_lock = threading.Lock()
+_stats = {"packed": 0, "unpacked": 0, "raw_bytes": 0, "stored_bytes": 0, "unpack_ms": 0.0}
+
+
+def compression_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out = dict(_stats)
+    out["unpack_ms"] = round(out["unpack_ms"], 3)
+    out["ratio"] = round(out["stored_bytes"] / out["raw_bytes"], 4) if out["raw_bytes"] else None
+    out["settings"] = SETTINGS.as_dict()
+    return out
+
+
+def _count(**deltas: float) -> None:
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+# ---------- slovníky ----------
+
+@lru_cache(maxsize=8)
+def load_dictionary(dict_id: str) -> bytes:
+    path = SETTINGS.dict_dir / f"{dict_id}.dict"
+    if not path.is_file():
+        raise LookupError(f"Compression dictionary {dict_id!r} not found in {SETTINGS.dict_dir}")
+    return path.read_bytes()
+
+
+def _active_dictionary() -> Optional[str]:
+    if SETTINGS.dict_id and (SETTINGS.dict_dir / f"{SETTINGS.dict_id}.dict").is_file():
+        return SETTINGS.dict_id
+    return None
+
+
+# ---------- kodeky ----------
+
+def _compress(data: bytes, codec: str, dict_id: Optional[str]) -> bytes:
+    zdict = load_dictionary(dict_id) if dict_id else None
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        cdict = zstandard.ZstdCompressionDict(zdict) if zdict else None
+        return zstandard.ZstdCompressor(level=SETTINGS.level, dict_data=cdict).compress(data)
+    compressor = zlib.compressobj(SETTINGS.level, zlib.DEFLATED, zlib.MAX_WBITS, zdict=zdict) if zdict else zlib.compressobj(SETTINGS.level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(payload: bytes, codec: str, dict_id: Optional[str]) -> bytes:
+    zdict = load_dictionary(dict_id) if dict_id else None
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed; cannot read zstd-compressed document")
+        ddict = zstandard.ZstdCompressionDict(zdict) if zdict else None
+        return zstandard.ZstdDecompressor(dict_data=ddict).decompress(payload)
+    if codec != "zlib":
+        raise ValueError(f"Unknown compression codec: {codec!r}")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict=zdict) if zdict else zlib.decompressobj()
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+# ---------- obálka ----------
+
+def is_envelope(value: Any) -> bool:
+    return isinstance(value, dict) and ENVELOPE_KEY in value
+
+
+def is_envelope_text(raw: Any) -> bool:
+    if isinstance(raw, str):
+        raw = raw[:16].encode("utf-8")
+    return isinstance(raw, (bytes, bytearray)) and bytes(raw[:16]).lstrip().startswith(_ENVELOPE_PREFIX)
+
+
+def pack(raw: bytes, codec: Optional[str] = None, dict_id: Optional[str] = None) -> Dict[str, Any]:
+    codec = codec or SETTINGS.codec
+    payload = _compress(raw, codec, dict_id)
+    _count(packed=1, raw_bytes=len(raw), stored_bytes=len(payload))
+    return {ENVELOPE_KEY: codec, DICT_KEY: dict_id, PAYLOAD_KEY: base64.b64encode(payload).decode("ascii")}
+
+
+def unpack_bytes(envelope: Dict[str, Any]) -> bytes:
+    """Obálka -> JSON text dokumentu (bez parsování)."""
+    t0 = time.perf_counter()
+    data = _decompress(base64.b64decode(envelope[PAYLOAD_KEY]), envelope[ENVELOPE_KEY], envelope.get(DICT_KEY))
+    _count(unpacked=1, unpack_ms=(time.perf_counter() - t0) * 1000)
+    return data
+
+
+def maybe_pack(value: Any) -> Any:
+    """Dokument -> obálka, pokud je komprese zapnutá a dokument je nad prahem."""
+    if not SETTINGS.enabled or not isinstance(value, dict) or is_envelope(value):
+        return value
+    raw = raw_json.dumps(value)
+    if len(raw) < SETTINGS.min_bytes:
+        return value
+    return pack(raw, SETTINGS.codec, _active_dictionary())
+
+
+def unpack(value: Any) -> Any:
+    if is_envelope(value):
+        return raw_json.loads(unpack_bytes(value))
+    return value
+
+
+def expand_raw(raw: Any) -> Any:
+    """Pro raw čtení (text z DB): obálku nahraď JSON textem dokumentu, jinak vrať beze změny."""
+    if is_envelope(raw):
+        return unpack_bytes(raw)
+    if is_envelope_text(raw):
+        return unpack_bytes(raw_json.loads(raw))
+    return raw
+
+
+def envelope_clause(column, postgres: bool):
+    """SQL predikát „uložený dokument je komprimovaná obálka“."""
+    if postgres:
+        return column.op("?", return_type=Boolean)(literal(ENVELOPE_KEY, Text))
+    return cast(column, Text).like('{"' + ENVELOPE_KEY + '"%')
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON / JSONB sloupec s transparentní kompresí velkých dokumentů.
+    Zápis balí přes maybe_pack(), čtení rozbalí obálku; nekomprimované řádky
+    se čtou beze změny, takže zapnutí i vypnutí komprese je zpětně kompatibilní.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, base_type: Any = None) -> None:
+        super().__init__()
+        self.base_type = base_type() if isinstance(base_type, type) else base_type
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(self.base_type if self.base_type is not None else JSON())
+
+    def process_bind_param(self, value, dialect):
+        return maybe_pack(value)
+
+    def process_result_value(self, value, dialect):
+        return unpack(value)
@@ -0,0 +1,163 @@
+# utils/gcs_urls.py
+# -----------------------------------------------------------------------------
+# Short-lived V4 signed URLs for GCS-hosted revision photos, so the API can
+# authorize a request and answer 302 instead of proxying the bytes.
+#
+# - signing credentials come from google.auth.default() once and are refreshed
+#   only when expired; on Cloud Run (no private key) the URL is signed through
+#   IAM signBlob with the service account e-mail + access token
+# - generated URLs are cached until half of their lifetime is left, so a
+#   gallery reload does not sign (or call IAM) again
+# - upload_ticket(): signed PUT URL for direct-to-bucket uploads, with the size
+#   cap enforced by GCS (x-goog-content-length-range)
+# - STORAGE_EMULATOR_HOST (fake-gcs-server): plain emulator media/upload URLs,
+#   no signing – the emulator does not check signatures
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+try:
+    import google.auth  # type: ignore
+    from google.auth import credentials as google_credentials  # type: ignore
+    from google.auth.transport.requests import Request as GoogleAuthRequest  # type: ignore
+except Exception:  # pragma: no cover
+    google = None
+    google_credentials = None
+    GoogleAuthRequest = None
+
+PHOTO_URL_MODE = (os.getenv("PHOTO_URL_MODE") or "proxy").strip().lower()  # proxy | redirect
+SIGNED_URL_TTL_S = int(os.getenv("PHOTO_SIGNED_URL_TTL_S", "900"))
+SIGNED_URL_CACHE_SIZE = int(os.getenv("PHOTO_SIGNED_URL_CACHE_SIZE", "4096"))
+UPLOAD_URL_TTL_S = int(os.getenv("PHOTO_UPLOAD_URL_TTL_S", "900"))
+EMULATOR_HOST = (os.getenv("STORAGE_EMULATOR_HOST") or "").strip().rstrip("/")
+
+# cloud-platform: pokrývá i IAM signBlob (podpis bez privátního klíče)
+_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+def redirect_enabled() -> bool:
+    return PHOTO_URL_MODE == "redirect"
+
+
+def emulator_url(bucket_name: str, object_name: str) -> str:
+    return f"{EMULATOR_HOST}/storage/v1/b/{quote(bucket_name, safe='')}/o/{quote(object_name, safe='')}?alt=media"
+
+
+@dataclass
+class UploadTicket:
+    url: str
+    method: str
+    headers: Dict[str, str]  # klient je musí poslat beze změny (jsou součástí podpisu)
+    expires_at: Optional[datetime]
+
+
+class SignedUrlCache:
+    def __init__(self, ttl_s: int = SIGNED_URL_TTL_S, max_entries: int = SIGNED_URL_CACHE_SIZE) -> None:
+        self.ttl_s = max(60, ttl_s)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._urls: "OrderedDict[Tuple[Any, ...], Tuple[str, float]]" = OrderedDict()
+        self._counters = {"hits": 0, "signed": 0, "upload_tickets": 0, "credential_refreshes": 0}
+
+    def _signing_credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                if GoogleAuthRequest is None:
+                    raise RuntimeError("google-auth is not installed")
+                self._credentials, _ = google.auth.default(scopes=_SCOPES)
+            if not self._credentials.valid:
+                self._credentials.refresh(GoogleAuthRequest())
+                self._counters["credential_refreshes"] += 1
+            return self._credentials
+
+    def _sign(self, blob, params: Dict[str, Any], method: str = "GET", ttl_s: Optional[int] = None) -> str:
+        credentials = self._signing_credentials()
+        kwargs: Dict[str, Any] = {
+            "version": "v4",
+            "expiration": timedelta(seconds=ttl_s or self.ttl_s),
+            "method": method,
+            **params,
+        }
+        if isinstance(credentials, google_credentials.Signing):
+            kwargs["credentials"] = credentials
+        else:
+            # Cloud Run / GCE: bez privátního klíče -> podpis přes IAM signBlob
+            kwargs["service_account_email"] = credentials.service_account_email
+            kwargs["access_token"] = credentials.token
+        return blob.generate_signed_url(**kwargs)
+
+    def url_for(self, blob, **params: str) -> Tuple[str, Optional[datetime]]:
+        """(URL, expirace) pro GET objektu; params = response_type / response_disposition."""
+        if EMULATOR_HOST:
+            return emulator_url(blob.bucket.name, blob.name), None
+        key = (blob.bucket.name, blob.name, tuple(sorted(params.items())))
+        now = time.time()
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached and cached[1] - now > self.ttl_s / 2:
+                self._urls.move_to_end(key)
+                self._counters["hits"] += 1
+                return cached[0], datetime.fromtimestamp(cached[1], timezone.utc)
+        url = self._sign(blob, params)
+        expires = now + self.ttl_s
+        with self._lock:
+            self._urls[key] = (url, expires)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+            self._counters["signed"] += 1
+        return url, datetime.fromtimestamp(expires, timezone.utc)
+
+    def upload_ticket(self, blob, content_type: str, max_bytes: int) -> UploadTicket:
+        """Podepsaný PUT pro jeden objekt (necachuje se – každý upload má vlastní objekt)."""
+        if EMULATOR_HOST:
+            url = (
+                f"{EMULATOR_HOST}/upload/storage/v1/b/{quote(blob.bucket.name, safe='')}/o"
+                f"?uploadType=media&name={quote(blob.name, safe='')}"
+            )
+            return UploadTicket(url, "POST", {"Content-Type": content_type}, None)
+        headers = {"Content-Type": content_type, "x-goog-content-length-range": f"0,{max_bytes}"}
+        url = self._sign(
+            blob,
+            {"content_type": content_type, "headers": {"x-goog-content-length-range": headers["x-goog-content-length-range"]}},
+            method="PUT",
+            ttl_s=UPLOAD_URL_TTL_S,
+        )
+        with self._lock:
+            self._counters["upload_tickets"] += 1
+        return UploadTicket(url, "PUT", headers, datetime.now(timezone.utc) + timedelta(seconds=UPLOAD_URL_TTL_S))
+
+    def is_cached(self, bucket_name: str, object_name: str, **params: str) -> bool:
+        with self._lock:
+            return (bucket_name, object_name, tuple(sorted(params.items()))) in self._urls
+
+    def redirect_max_age(self) -> int:
+        # prohlížeč smí 302 chvíli držet, ale nikdy déle než platí podpis
+        return self.ttl_s // 4
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": PHOTO_URL_MODE,
+                "emulator": bool(EMULATOR_HOST),
+                "ttl_s": self.ttl_s,
+                "cached": len(self._urls),
+                **self._counters,
+            }
+
+
+PHOTO_URLS = SignedUrlCache()
+
+
+def signed_url_stats() -> Dict[str, Any]:
+    return PHOTO_URLS.stats()
@@ -0,0 +1,113 @@
+# utils/http_cache.py
+# -----------------------------------------------------------------------------
+# Conditional GET and byte ranges for immutable stored files (revision photos).
+#
+# - strong ETags come from the stored content hash, so 304 is decided before
+#   touching disk / GCS; rows without a hash yet get a weak ETag from the row
+#   (stored files are immutable, so id + key + size identify the content)
+# - parse_range() handles a single "bytes=" range (enough for image viewers and
+#   resumable downloads); anything else is answered with the full body
+# - If-Range uses the strong comparison (RFC 9110 §13.1.5): a weak ETag never
+#   matches, the client gets the full body instead of a 206
+# Local files use RangeFileResponse (Starlette's FileResponse serves Range
+# itself, but compares If-Range as plain strings).
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+# uložené fotky se nemění (nový upload = nový soubor), prohlížeč je nemusí revalidovat
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def strong_etag(*parts: str) -> str:
+    return '"' + "-".join(parts) + '"'
+
+
+def weak_etag(*parts: str) -> str:
+    return "W/" + strong_etag(*parts)
+
+
+def cache_headers(etag: Optional[str], **extra: str) -> Dict[str, str]:
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, **extra}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match používá slabé porovnání
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _is_weak(tag: str) -> bool:
+    return tag.startswith("W/")
+
+
+def if_range_matches(if_range: str, etag: Optional[str]) -> bool:
+    """If-Range s entity-tagem: silné porovnání – slabý tag na kterékoli straně neplatí."""
+    if_range = if_range.strip()
+    if not etag or _is_weak(if_range) or _is_weak(etag):
+        return False
+    return if_range == etag
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse, jejíž If-Range s entity-tagem se porovnává silně (datum beze změny)."""
+
+    def _should_use_range(self, http_if_range: str) -> bool:
+        tag = http_if_range.strip()
+        if tag.startswith(('"', "W/")):
+            return if_range_matches(tag, self.headers.get("etag"))
+        return super()._should_use_range(http_if_range)
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), **cache_headers(etag)})
+
+
+def parse_range(request: Request, size: int, etag: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Range hlavička -> (start, end) včetně, nebo None = celé tělo.
+    Nesplnitelný rozsah vyhodí RangeNotSatisfiable (416).
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and not if_range_matches(if_range, etag):
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_raw, _, end_raw = spec.strip().partition("-")
+    try:
+        if start_raw:
+            start = int(start_raw)
+            end = int(end_raw) if end_raw else size - 1
+        else:  # bytes=-N = posledních N bajtů
+            suffix = int(end_raw)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            start, end = max(0, size - suffix), size - 1
+    except ValueError as e:
+        if isinstance(e, RangeNotSatisfiable):
+            raise
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
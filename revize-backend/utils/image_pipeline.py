@@ -0,0 +1,416 @@
+# utils/image_pipeline.py
+# -----------------------------------------------------------------------------
+# Photo upload pipeline (decode -> EXIF rotate -> resize -> JPEG + thumbnail
+# variants) running in a bounded process pool, so Pillow work never blocks the
+# event loop.
+#
+# - process_photo() is the worker entry point (module level, picklable result)
+# - THUMB_SPECS is the registry of named thumbnail variants; each is stored next
+#   to the photo as <stem>_<name>.jpg (+ .webp when Pillow supports WebP)
+# - IMAGE_POOL.process_photo() submits it; when IMAGE_POOL_MAX_PENDING jobs are already
+#   queued or running it raises ImagePoolBusy (the router answers 503)
+# - image_pool_stats() exposes queue depth and per-stage timings
+#
+# IMAGE_POOL_WORKERS=0 runs the pipeline in a thread instead (tests, tiny hosts).
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    from PIL import Image, ImageOps, features  # type: ignore
+except Exception:  # pragma: no cover
+    Image = None
+    ImageOps = None
+    features = None
+
+MAX_LONG_EDGE = 1600  # delší hrana uložené fotky
+JPEG_QUALITY = 82
+THUMB_QUALITY = 82
+STAGES = ("queue", "decode", "resize", "encode", "thumb")
+
+
+@dataclass(frozen=True)
+class ThumbSpec:
+    name: str
+    box: Tuple[int, int]  # max. šířka × výška, poměr stran se zachová
+    quality: int = THUMB_QUALITY
+
+
+# od největšího: každá varianta se zmenšuje z předchozí, ne z plného obrázku
+THUMB_SPECS: Tuple[ThumbSpec, ...] = (
+    ThumbSpec("lightbox", (1280, 960), 80),
+    ThumbSpec("thumb", (480, 360)),  # původní <stem>_thumb.jpg, výchozí pro GET .../thumb
+    ThumbSpec("grid", (240, 180), 78),
+)
+DEFAULT_THUMB = "thumb"
+# inline (base64) v manifestu galerie, neukládá se jako soubor
+MICRO_SPEC = ThumbSpec("micro", (96, 96), 60)
+ORIGINAL_SIZES = ("print", "original")  # ?size= pro uloženou fotku samotnou
+
+WEBP_ENABLED = (
+    os.getenv("THUMB_WEBP", "1").strip().lower() not in {"0", "false", "no"}
+    and features is not None
+    and bool(features.check("webp"))
+)
+THUMB_FORMATS: Tuple[str, ...] = ("jpg", "webp") if WEBP_ENABLED else ("jpg",)
+FORMAT_MIME = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+
+@dataclass
+class ProcessedPhoto:
+    payload: Optional[bytes]  # None = uložit zdrojový soubor beze změny (nečitelný obrázek)
+    ext: str
+    mime_type: str
+    size: int
+    variants: Dict[str, bytes] = field(default_factory=dict)  # variant_key() -> data
+    content_hash: Optional[str] = None  # sha256 uloženého souboru (ETag)
+    timings: Dict[str, float] = field(default_factory=dict)  # ms po fázích
+    micro: Optional[bytes] = None  # mikronáhled MICRO_SPEC pro manifest galerie (b"" = nečitelný)
+
+
+def _flatten_rgb(img):
+    if img.mode in {"RGBA", "LA"} or (img.mode == "P" and "transparency" in img.info):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        alpha = img.convert("RGBA")
+        background.paste(alpha, mask=alpha.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _encode_jpeg(img, quality: int) -> bytes:
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_webp(img, quality: int) -> bytes:
+    out = BytesIO()
+    img.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def variant_key(name: str, fmt: str = "jpg") -> str:
+    """Přípona uloženého souboru varianty: <stem>_<variant_key>."""
+    return f"{name}.{fmt}"
+
+
+def variant_keys() -> Tuple[str, ...]:
+    return tuple(variant_key(spec.name, fmt) for spec in THUMB_SPECS for fmt in THUMB_FORMATS)
+
+
+def render_variants(img) -> Dict[str, bytes]:
+    """Všechny varianty z THUMB_SPECS z již otočeného RGB obrázku (nezvětšuje)."""
+    out: Dict[str, bytes] = {}
+    current = img
+    for spec in THUMB_SPECS:
+        if current.width > spec.box[0] or current.height > spec.box[1]:
+            current = current.copy()
+            current.thumbnail(spec.box, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        out[variant_key(spec.name, "jpg")] = _encode_jpeg(current, spec.quality)
+        if "webp" in THUMB_FORMATS:
+            out[variant_key(spec.name, "webp")] = _encode_webp(current, spec.quality)
+    return out
+
+
+def pick_variant(size: Optional[str]) -> Optional[ThumbSpec]:
+    """
+    ?size= -> nejbližší předgenerovaná varianta. Název varianty, nebo požadovaná
+    delší hrana v px (nejmenší varianta, která ji pokryje). None = uložená fotka.
+    """
+    raw = (size or DEFAULT_THUMB).strip().lower()
+    if raw in ORIGINAL_SIZES:
+        return None
+    for spec in THUMB_SPECS:
+        if spec.name == raw:
+            return spec
+    if not raw.isdigit():
+        raise ValueError(f"Unknown thumbnail size: {size}")
+    wanted = int(raw)
+    fitting = [spec for spec in THUMB_SPECS if max(spec.box) >= wanted]
+    return min(fitting, key=lambda spec: max(spec.box)) if fitting else None
+
+
+def process_photo(
+    source: Union[bytes, str],
+    source_ext: str,
+    content_type: Optional[str],
+    max_long_edge: int,
+    quality: int,
+) -> ProcessedPhoto:
+    """
+    Zmenšení a převod do JPEG + varianty náhledů. `source` jsou data nebo cesta ke spool
+    souboru (Pillow čte soubor postupně, v paměti je jen dekódovaný obrázek).
+    Nečitelný obrázek se uloží beze změny (bez náhledu).
+    """
+    from_path = isinstance(source, str)
+
+    def fallback() -> ProcessedPhoto:
+        return ProcessedPhoto(
+            None if from_path else source,
+            source_ext,
+            (content_type or "application/octet-stream").lower(),
+            os.path.getsize(source) if from_path else len(source),
+            content_hash=sha256_file(source) if from_path else hashlib.sha256(source).hexdigest(),
+        )
+
+    if Image is None or ImageOps is None:
+        return fallback()
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    try:
+        with Image.open(source if from_path else BytesIO(source)) as img:
+            if max(img.size) > max_long_edge:
+                # JPEG: dekóduj rovnou zmenšené (DCT scaling), výsledek je vždy >= cílové velikosti
+                scale = max_long_edge / float(max(img.size))
+                img.draft("RGB", (max(1, int(img.size[0] * scale)), max(1, int(img.size[1] * scale))))
+            img = ImageOps.exif_transpose(img)
+            img.load()
+            t1 = time.perf_counter()
+            timings["decode"] = (t1 - t0) * 1000
+
+            width, height = img.size
+            longest_edge = max(width, height)
+            if longest_edge > max_long_edge:
+                scale = max_long_edge / float(longest_edge)
+                resized = (
+                    max(1, int(round(width * scale))),
+                    max(1, int(round(height * scale))),
+                )
+                img = img.resize(resized, Image.Resampling.LANCZOS)
+            img = _flatten_rgb(img)
+            t2 = time.perf_counter()
+            timings["resize"] = (t2 - t1) * 1000
+
+            encoded = _encode_jpeg(img, quality)
+            t3 = time.perf_counter()
+            timings["encode"] = (t3 - t2) * 1000
+
+            # náhledy ze zmenšeného obrázku – bez druhého dekódování
+            variants = render_variants(img)
+            micro = _micro_from_variants(variants)
+            timings["thumb"] = (time.perf_counter() - t3) * 1000
+            return ProcessedPhoto(
+                encoded,
+                ".jpg",
+                "image/jpeg",
+                len(encoded),
+                variants,
+                hashlib.sha256(encoded).hexdigest(),
+                timings,
+                micro,
+            )
+    except Exception:
+        return fallback()
+
+
+def micro_thumb(source: Union[bytes, str]) -> Optional[bytes]:
+    """Mikronáhled MICRO_SPEC (nejlépe z malé varianty); None = nečitelný obrázek."""
+    if Image is None or ImageOps is None:
+        return None
+    try:
+        with Image.open(source if isinstance(source, str) else BytesIO(source)) as img:
+            img.draft("RGB", MICRO_SPEC.box)
+            img = _flatten_rgb(ImageOps.exif_transpose(img))
+            img.thumbnail(MICRO_SPEC.box, Image.Resampling.LANCZOS)
+            return _encode_jpeg(img, MICRO_SPEC.quality)
+    except Exception:
+        return None
+
+
+def _micro_from_variants(variants: Dict[str, bytes]) -> Optional[bytes]:
+    grid = variants.get(variant_key("grid", "jpg"))
+    return micro_thumb(grid) if grid else None
+
+
+def describe_micro(source: Union[bytes, str]) -> ProcessedPhoto:
+    """Jen mikronáhled starší fotky (manifest galerie, přes IMAGE_POOL.submit)."""
+    t0 = time.perf_counter()
+    micro = micro_thumb(source) or b""
+    timings = {"thumb": (time.perf_counter() - t0) * 1000}
+    return ProcessedPhoto(None, ".jpg", FORMAT_MIME["jpg"], len(micro), timings=timings, micro=micro)
+
+
+def variants_from_source(source: Union[bytes, str]) -> Dict[str, bytes]:
+    """Varianty z uloženého souboru (data / cesta); {} = nečitelný obrázek."""
+    if Image is None or ImageOps is None:
+        return {}
+    try:
+        with Image.open(source if isinstance(source, str) else BytesIO(source)) as img:
+            # JPEG: dekóduj rovnou zmenšené na největší variantu (DCT scaling)
+            img.draft("RGB", THUMB_SPECS[0].box)
+            img = ImageOps.exif_transpose(img)
+            return render_variants(_flatten_rgb(img))
+    except Exception:
+        return {}
+
+
+def describe_stored_photo(path: str, ext: str, mime_type: str) -> ProcessedPhoto:
+    """
+    Fotka nahraná přímo do bucketu se nemění (payload None): jen varianty náhledů
+    a content_hash ze staženého souboru.
+    """
+    t0 = time.perf_counter()
+    variants = variants_from_source(path)
+    micro = _micro_from_variants(variants)
+    timings = {"thumb": (time.perf_counter() - t0) * 1000} if variants else {}
+    return ProcessedPhoto(None, ext, mime_type, os.path.getsize(path), variants, sha256_file(path), timings, micro)
+
+
+def needs_recompress(path: str, max_long_edge: int = MAX_LONG_EDGE) -> bool:
+    """Upload z doby před zmenšováním: ne-JPEG nebo větší než max_long_edge (čte jen hlavičku)."""
+    if Image is None:
+        return False
+    try:
+        with Image.open(path) as img:
+            return img.format != "JPEG" or max(img.size) > max_long_edge
+    except Exception:
+        return False  # nečitelné obrázky se ukládají beze změny
+
+
+# začátky souborů podporovaných formátů (kontrola přímého uploadu bez stažení celého objektu)
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+SNIFF_BYTES = 32
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in {b"heic", b"heix", b"mif1", b"msf1", b"hevc", b"heim", b"heis"}:
+        return "image/heic"
+    return None
+
+
+# ---------- pool ----------
+
+class ImagePoolBusy(RuntimeError):
+    """Fronta zpracování obrázků je plná – klient má zkusit později (503)."""
+
+
+def _default_workers() -> int:
+    return min(2, os.cpu_count() or 1)
+
+
+class ImagePool:
+    def __init__(self) -> None:
+        self.workers = int(os.getenv("IMAGE_POOL_WORKERS", str(_default_workers())))
+        self.max_pending = max(1, int(os.getenv("IMAGE_POOL_MAX_PENDING", str(max(1, self.workers) * 8))))
+        self.retry_after_s = int(os.getenv("IMAGE_POOL_RETRY_AFTER_S", "5"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._stages = {name: {"count": 0, "total_ms": 0.0, "max_ms": 0.0} for name in STAGES}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: nedědí otevřená DB spojení ani vlákna event loopu
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _record(self, timings: Dict[str, float]) -> None:
+        for name, ms in timings.items():
+            stage = self._stages.get(name)
+            if stage is None:
+                continue
+            stage["count"] += 1
+            stage["total_ms"] += ms
+            stage["max_ms"] = max(stage["max_ms"], ms)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise ImagePoolBusy("Image processing queue is full")
+            self._pending += 1
+            self._counters["submitted"] += 1
+
+    async def process_photo(self, *args: Any) -> ProcessedPhoto:
+        return await self.submit(process_photo, *args)
+
+    async def submit(self, fn: Callable[..., ProcessedPhoto], *args: Any) -> ProcessedPhoto:
+        """Libovolná funkce pipeline (modulová úroveň, vrací ProcessedPhoto) ve sdíleném poolu."""
+        self._acquire()
+        queued = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            if self.workers > 0:
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            else:
+                result = await asyncio.to_thread(fn, *args)
+        except Exception as exc:
+            with self._lock:
+                self._counters["failed"] += 1
+                if isinstance(exc, BrokenProcessPool):
+                    self._executor = None  # worker spadl (např. OOM) – příště nový pool
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+        elapsed = (time.perf_counter() - queued) * 1000
+        with self._lock:
+            self._counters["completed"] += 1
+            # čekání ve frontě = celkový čas minus práce ve workeru
+            self._record({"queue": max(0.0, elapsed - sum(result.timings.values())), **result.timings})
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": s["count"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 2) if s["count"] else None,
+                    "max_ms": round(s["max_ms"], 2),
+                }
+                for name, s in self._stages.items()
+            }
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                **self._counters,
+                "stages": stages,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+IMAGE_POOL = ImagePool()
+
+
+def image_pool_stats() -> Dict[str, Any]:
+    return IMAGE_POOL.stats()
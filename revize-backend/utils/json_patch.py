@@ -0,0 +1,232 @@
+# utils/json_patch.py
+# -----------------------------------------------------------------------------
+# JSON Merge Patch (RFC 7396) and JSON Patch (RFC 6902) for revision data_json.
+# Both functions return a new document; the input is never mutated.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, List, Tuple
+
+
+class JsonPatchError(ValueError):
+    """Patch je syntakticky chybný (neznámá operace, špatný pointer...)."""
+
+
+class JsonPatchConflict(JsonPatchError):
+    """Patch nejde aplikovat na aktuální dokument (chybí cesta, neprošel `test`)."""
+
+
+# ---------- RFC 7396 ----------
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+# ---------- RFC 6901 pointers ----------
+
+def parse_pointer(pointer: Any) -> List[str]:
+    if not isinstance(pointer, str):
+        raise JsonPatchError("JSON pointer must be a string")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(token: str, size: int, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return size
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchConflict(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > size or (index == size and not allow_end):
+        raise JsonPatchConflict(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    node = doc
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchConflict(f"Path not found: /{'/'.join(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_array_index(token, len(node), allow_end=False)]
+        else:
+            raise JsonPatchConflict(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _parent(doc: Any, tokens: List[str]) -> Tuple[Any, str]:
+    if not tokens:
+        raise JsonPatchError("Operation on the document root is not supported")
+    parent = _resolve(doc, tokens[:-1])
+    if not isinstance(parent, (dict, list)):
+        raise JsonPatchConflict(f"Parent of /{'/'.join(tokens)} is not a container")
+    return parent, tokens[-1]
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> None:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        parent[key] = value
+    else:
+        parent.insert(_array_index(key, len(parent), allow_end=True), value)
+
+
+def _remove(doc: Any, tokens: List[str]) -> Any:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchConflict(f"Path not found: /{'/'.join(tokens)}")
+        return parent.pop(key)
+    return parent.pop(_array_index(key, len(parent), allow_end=False))
+
+
+# ---------- RFC 6902 ----------
+
+def validate_operations(operations: Any) -> List[Dict[str, Any]]:
+    """Syntaktická kontrola (bez dokumentu) – pointery jsou převedené na tokeny."""
+    if not isinstance(operations, list):
+        raise JsonPatchError("JSON Patch must be an array of operations")
+    checked = []
+    for op in operations:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise JsonPatchError("Each operation needs 'op' and 'path'")
+        name = op["op"]
+        item: Dict[str, Any] = {"op": name, "path": parse_pointer(op["path"])}
+        if name in ("add", "replace", "test"):
+            if "value" not in op:
+                raise JsonPatchError(f"'{name}' operation needs 'value'")
+            item["value"] = op["value"]
+        elif name in ("move", "copy"):
+            if "from" not in op:
+                raise JsonPatchError(f"'{name}' operation needs 'from'")
+            item["from"] = parse_pointer(op["from"])
+            if name == "move" and item["path"][: len(item["from"])] == item["from"] and item["path"] != item["from"]:
+                raise JsonPatchError("Cannot move a value into one of its children")
+        elif name != "remove":
+            raise JsonPatchError(f"Unknown operation: {name!r}")
+        checked.append(item)
+    return checked
+
+
+def apply_json_patch(doc: Any, operations: Any) -> Any:
+    """Atomicky: při chybě kterékoliv operace se vyhodí výjimka a vstup zůstane beze změny."""
+    result = copy.deepcopy(doc)
+    for op in validate_operations(operations):
+        name, path = op["op"], op["path"]
+        if name == "add":
+            _add(result, path, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            _remove(result, path)
+        elif name == "replace":
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(op["value"]))
+        elif name == "move":
+            if op["from"] != path:
+                _add(result, path, _remove(result, op["from"]))
+        elif name == "copy":
+            _add(result, path, copy.deepcopy(_resolve(result, op["from"])))
+        elif name == "test":
+            if _resolve(result, path) != op["value"]:
+                raise JsonPatchConflict(f"Test failed at /{'/'.join(path)}")
+    return result
+
+
+# ---------- plán pro provedení v DB (Postgres jsonb_set / #-) ----------
+# Kroky se aplikují postupně, guardy se vyhodnocují nad PŮVODNÍM dokumentem.
+# Proto se plán sestaví jen pro operace s nepřekrývajícími se cestami; jinak
+# None a patch se aplikuje v Pythonu. Nesplněný guard = UPDATE nic nezmění
+# a volající spadne na Python cestu, která vrátí přesnou chybu.
+
+class PushdownPlan:
+    def __init__(self) -> None:
+        self.steps: List[Tuple[str, List[str], Any]] = []  # (set|replace|append|insert|remove, path, value)
+        self.guards: List[Tuple[str, List[str], Any]] = []  # (exists|type|longer_than|equals, path, arg)
+
+
+def _overlaps(a: List[str], b: List[str]) -> bool:
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+def _is_index(token: str) -> bool:
+    return token == "-" or token.isdigit()
+
+
+def merge_patch_plan(patch: Any) -> PushdownPlan | None:
+    if not isinstance(patch, dict):
+        return None
+    plan = PushdownPlan()
+
+    def walk(node: Dict[str, Any], prefix: List[str]) -> None:
+        for key, value in node.items():
+            path = prefix + [key]
+            if value is None:
+                plan.steps.append(("remove", path, None))
+            elif isinstance(value, dict):
+                # vnořený merge jen do existujícího objektu
+                plan.guards.append(("type", path, "object"))
+                walk(value, path)
+            else:
+                plan.steps.append(("set", path, value))
+
+    walk(patch, [])
+    return plan
+
+
+def json_patch_plan(operations: Any) -> PushdownPlan | None:
+    ops = validate_operations(operations)
+    plan = PushdownPlan()
+    footprints: List[List[str]] = []
+    modified = False
+    for op in ops:
+        name, path = op["op"], op["path"]
+        if not path or name in ("move", "copy"):
+            return None
+        if name == "test":
+            if modified:
+                return None  # test po změně by se vyhodnotil nad starým dokumentem
+            plan.guards.append(("equals", path, op["value"]))
+            continue
+
+        parent, last = path[:-1], path[-1]
+        array_op = name in ("add", "remove") and _is_index(last)
+        footprint = parent if array_op else path
+        if any(_overlaps(footprint, other) for other in footprints):
+            return None
+        footprints.append(footprint)
+        modified = True
+
+        if name == "replace":
+            plan.guards.append(("exists", path, None))
+            plan.steps.append(("replace", path, op["value"]))
+        elif name == "remove":
+            plan.guards.append(("exists", path, None))
+            if array_op:
+                plan.guards.append(("type", parent, "array"))
+            plan.steps.append(("remove", path, None))
+        elif array_op:
+            plan.guards.append(("type", parent, "array"))
+            if last == "-":
+                plan.steps.append(("append", parent, op["value"]))
+            else:
+                plan.guards.append(("longer_than", parent, int(last)))
+                plan.steps.append(("insert", path, op["value"]))
+        else:
+            plan.guards.append(("type", parent, "object"))
+            plan.steps.append(("set", path, op["value"]))
+    return plan
@@ -0,0 +1,156 @@
+# utils/numbering.py
+# -----------------------------------------------------------------------------
+# Evidence numbers for projects, revisions and VV documents.
+#
+# Each (scope, owner_key, prefix, year) has a row in number_sequences that is
+# advanced with UPDATE ... RETURNING. The UPDATE row-locks the counter until the
+# caller commits, so concurrent creates serialize on it instead of racing on a
+# max+1 scan (and a rollback returns the number). A missing row is seeded once
+# from the numbers that already exist, then INSERT ... ON CONFLICT DO NOTHING.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import NumberSequence, Project, Revision, VvDoc
+
+PROJECT_SCOPE = "project"
+REVISION_SCOPE = "revision"
+VV_SCOPE = "vv"
+
+
+def next_sequence_value(
+    db: Session,
+    scope: str,
+    owner_key: int,
+    prefix: str = "",
+    year: int = 0,
+    seed: Callable[[], int] | None = None,
+) -> int:
+    """Přiděl další hodnotu čítače v transakci `db` (číslo platí až po commitu)."""
+    table = NumberSequence.__table__
+    key = (
+        (table.c.scope == scope)
+        & (table.c.owner_key == owner_key)
+        & (table.c.prefix == prefix)
+        & (table.c.year == year)
+    )
+    bump = update(table).where(key).values(last_value=table.c.last_value + 1).returning(table.c.last_value)
+
+    for _ in range(3):
+        value = db.execute(bump).scalar_one_or_none()
+        if value is not None:
+            return value
+
+        first = (seed() if seed else 0) + 1
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        created = db.execute(
+            insert(table)
+            .values(scope=scope, owner_key=owner_key, prefix=prefix, year=year, last_value=first)
+            .on_conflict_do_nothing()
+        )
+        if created.rowcount:
+            return first
+        # řádek mezitím založil souběžný request -> znovu UPDATE
+    raise RuntimeError(f"Could not allocate {scope} number for {owner_key}/{prefix}/{year}")
+
+
+def normalize_project_number(project_number: Any, project_id: Any) -> str:
+    raw = str(project_number or "").strip()
+    if raw:
+        try:
+            return str(int(raw))
+        except ValueError:
+            return raw
+    try:
+        return str(int(project_id))
+    except Exception:
+        return "0"
+
+
+# ---------- seed z existujících čísel (jen při založení čítače) ----------
+
+def max_project_seq(db: Session, owner_id: int) -> int:
+    max_seq = 0
+    for (number,) in db.query(Project.number).filter(Project.owner_id == owner_id).all():
+        try:
+            max_seq = max(max_seq, int(str(number or "").strip()))
+        except ValueError:
+            continue
+    return max_seq
+
+
+def max_revision_seq(db: Session, project_id: int, prefix_base: str, year: int, head: str) -> int:
+    max_seq = 0
+    rows = db.query(Revision.number).filter(Revision.project_id == project_id, Revision.number.like(f"{head}%")).all()
+    for (num,) in rows:
+        parts = (num or "").split("-")
+        if len(parts) >= 4 and parts[0] == prefix_base and parts[1] == str(year):
+            try:
+                max_seq = max(max_seq, int(parts[3]))
+            except ValueError:
+                pass
+    return max_seq
+
+
+def max_vv_seq(db: Session, project_id: int, head: str, year: int) -> int:
+    max_seq = 0
+    rows = db.query(VvDoc.number).filter(VvDoc.project_id == project_id, VvDoc.number.like(f"{head}%-{year}")).all()
+    for (num,) in rows:
+        parts = (num or "").split("-")
+        if len(parts) >= 4 and parts[0] == "VV" and parts[-1] == str(year):
+            try:
+                max_seq = max(max_seq, int(parts[2]))
+            except ValueError:
+                pass
+    return max_seq
+
+
+# ---------- generátory ----------
+
+def generate_project_number(db: Session, owner_id: int) -> str:
+    """Pořadové číslo projektu v rámci vlastníka: "1", "2", ..."""
+    while True:
+        seq = next_sequence_value(db, PROJECT_SCOPE, owner_id, seed=lambda: max_project_seq(db, owner_id))
+        number = str(seq)
+        if db.query(Project.id).filter(Project.owner_id == owner_id, Project.number == number).first() is None:
+            return number
+
+
+def generate_revision_number(db: Session, project_id: int, project_number: Any, year: int, prefix: str) -> str:
+    """
+    Format: <prefix>-<year>-<projectNumber>-<seq>
+    seq is per-project, per-prefix and per-year.
+    """
+    prefix_base = str(prefix)
+    head = f"{prefix_base}-{year}-{normalize_project_number(project_number, project_id)}-"
+    while True:
+        seq = next_sequence_value(
+            db, REVISION_SCOPE, project_id, prefix_base, year,
+            seed=lambda: max_revision_seq(db, project_id, prefix_base, year, head),
+        )
+        number = f"{head}{seq:03d}"
+        # číslo jde přepsat přes PATCH – obsazené přeskoč
+        if db.query(Revision.id).filter(Revision.number == number).first() is None:
+            return number
+
+
+def generate_vv_number(db: Session, project_id: int, project_number: Any) -> str:
+    """
+    Format: VV-<projectNumber>-<seq>-<year>
+    seq is per-project and per-year.
+    """
+    year = datetime.now().year
+    head = f"VV-{normalize_project_number(project_number, project_id)}-"
+    while True:
+        seq = next_sequence_value(db, VV_SCOPE, project_id, "", year, seed=lambda: max_vv_seq(db, project_id, head, year))
+        number = f"{head}{seq}-{year}"
+        if db.query(VvDoc.id).filter(VvDoc.number == number).first() is None:
+            return number
@@ -0,0 +1,135 @@
+# utils/photo_blobs.py
+# -----------------------------------------------------------------------------
+# Content-addressed photo files shared between revisions.
+#
+# A photo_blobs row owns one stored file (plus its thumbnail variants). New
+# uploads live under "cas/<hh>/<sha256><ext>" (GCS: "revision_photos/cas/...");
+# any number of revision_photos rows point at it with file_path = storage_key
+# and the same content_hash. ref_count is the number of such rows and is kept
+# by the mapper events below, so every ORM insert / delete / file_path change
+# (including cascades from revision and project deletes) adjusts it in the same
+# transaction. Bytes may only be removed by whoever deletes the row at
+# ref_count 0 (release_unreferenced); rows without a blob (per-revision keys
+# from before this table) keep their old one-owner semantics.
+#
+# source_hash = sha256 of the uploaded original, so re-uploading the same photo
+# skips decoding and storing entirely.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import PhotoBlob, RevisionPhoto
+
+GCS_PREFIX = "revision_photos"
+
+
+def cas_key(content_hash: str, ext: str, gcs: bool = False) -> str:
+    key = f"cas/{content_hash[:2]}/{content_hash}{ext}"
+    return f"{GCS_PREFIX}/{key}" if gcs else key
+
+
+def insert_statement(dialect_name: str, values: Dict[str, Any]):
+    """INSERT ... ON CONFLICT DO NOTHING – souběžné uploady stejného obsahu vytvoří jeden řádek."""
+    table = PhotoBlob.__table__
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    row = {"ref_count": 0, "created_at": datetime.utcnow(), **values}
+    return insert(table).values(**row).on_conflict_do_nothing(index_elements=[table.c.content_hash])
+
+
+def ensure_blob(db: Session, **values: Any) -> PhotoBlob:
+    """Řádek blobu pro content_hash (existující má přednost); source_hash se doplní, chybí-li."""
+    db.execute(insert_statement(db.get_bind().dialect.name, values))
+    blob = db.get(PhotoBlob, values["content_hash"], populate_existing=True)
+    if values.get("source_hash") and not blob.source_hash:
+        blob.source_hash = values["source_hash"]
+    return blob
+
+
+# ---------- ref_count z ORM zápisů revision_photos ----------
+
+def _adjust(connection, content_hash: Optional[str], file_path: Optional[str], delta: int) -> None:
+    if not content_hash or not file_path:
+        return
+    table = PhotoBlob.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.content_hash == content_hash, table.c.storage_key == file_path)
+        .values(ref_count=table.c.ref_count + delta)
+    )
+
+
+@event.listens_for(RevisionPhoto, "after_insert")
+def _blob_ref_after_insert(mapper, connection, target) -> None:
+    _adjust(connection, target.content_hash, target.file_path, 1)
+
+
+@event.listens_for(RevisionPhoto, "after_delete")
+def _blob_ref_after_delete(mapper, connection, target) -> None:
+    _adjust(connection, target.content_hash, target.file_path, -1)
+
+
+@event.listens_for(RevisionPhoto, "after_update")
+def _blob_ref_after_update(mapper, connection, target) -> None:
+    state = inspect(target)
+    hash_hist = state.attrs.content_hash.history
+    path_hist = state.attrs.file_path.history
+    if not (hash_hist.has_changes() or path_hist.has_changes()):
+        return
+    old_hash = hash_hist.deleted[0] if hash_hist.deleted else target.content_hash
+    old_path = path_hist.deleted[0] if path_hist.deleted else target.file_path
+    _adjust(connection, old_hash, old_path, -1)
+    _adjust(connection, target.content_hash, target.file_path, 1)
+
+
+# ---------- Mazání ----------
+
+def managed(db: Session, photos: Iterable[RevisionPhoto]) -> Set[Tuple[str, str]]:
+    """(content_hash, file_path) fotek, jejichž soubor patří blobu – ty se mažou jen přes release."""
+    pairs = {(p.content_hash, p.file_path) for p in photos if p.content_hash and p.file_path}
+    if not pairs:
+        return set()
+    rows = db.execute(
+        select(PhotoBlob.content_hash, PhotoBlob.storage_key).where(
+            PhotoBlob.content_hash.in_({content_hash for content_hash, _ in pairs})
+        )
+    ).all()
+    return pairs & {(row.content_hash, row.storage_key) for row in rows}
+
+
+def release_unreferenced(db: Session, content_hashes: Iterable[Optional[str]]) -> List[str]:
+    """
+    Po commitu mazání fotek: smaže bloby bez odkazů (podmíněným DELETE, takže
+    souběžné nasdílení vyhraje) a vrátí jejich storage_key – soubory a varianty
+    smaže volající.
+    """
+    keys: List[str] = []
+    for content_hash in sorted({h for h in content_hashes if h}):
+        storage_key = db.execute(
+            select(PhotoBlob.storage_key).where(PhotoBlob.content_hash == content_hash, PhotoBlob.ref_count <= 0)
+        ).scalar()
+        if storage_key is None:
+            continue
+        deleted = db.execute(
+            delete(PhotoBlob).where(PhotoBlob.content_hash == content_hash, PhotoBlob.ref_count <= 0)
+        ).rowcount
+        if deleted:
+            keys.append(storage_key)
+    db.commit()
+    return keys
+
+
+def orphaned(db: Session, storage_keys: Iterable[str]) -> List[str]:
+    """Klíče CAS souborů, na které neukazuje žádný blob (např. po rollbacku uploadu)."""
+    keys = {key for key in storage_keys if key}
+    if not keys:
+        return []
+    known = set(db.execute(select(PhotoBlob.storage_key).where(PhotoBlob.storage_key.in_(keys))).scalars())
+    return sorted(keys - known)
@@ -0,0 +1,67 @@
+# utils/photo_manifest.py
+# -----------------------------------------------------------------------------
+# Per-revision cache of the serialized photo gallery manifest
+# (GET /revisions/{id}/photos/manifest): all photo metadata plus inline micro
+# thumbnails in one response instead of a list call and one /thumb per photo.
+#
+# Entries are keyed by revision and stored together with a fingerprint of the
+# revision's active photos (count, max id, max updated_at; one indexed
+# aggregate). Upload, patch and delete handlers drop the entry explicitly, and
+# the fingerprint catches changes made by other instances or background tasks,
+# so a stale manifest is never served.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+MANIFEST_CACHE_SIZE = int(os.getenv("PHOTO_MANIFEST_CACHE_SIZE", "256"))
+
+
+class ManifestCache:
+    def __init__(self, max_entries: int = MANIFEST_CACHE_SIZE) -> None:
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        # rev_id -> (otisk, JSON, ETag)
+        self._entries: "OrderedDict[int, Tuple[Hashable, bytes, str]]" = OrderedDict()
+        self._counters = {"hits": 0, "builds": 0, "invalidations": 0}
+
+    def get(self, rev_id: int, fingerprint: Hashable) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(rev_id)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end(rev_id)
+            self._counters["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, rev_id: int, fingerprint: Hashable, body: bytes, etag: str) -> None:
+        with self._lock:
+            self._entries[rev_id] = (fingerprint, body, etag)
+            self._entries.move_to_end(rev_id)
+            self._counters["builds"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, rev_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(rev_id, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached": len(self._entries),
+                "bytes": sum(len(entry[1]) for entry in self._entries.values()),
+                **self._counters,
+            }
+
+
+MANIFESTS = ManifestCache()
+
+
+def manifest_cache_stats() -> Dict[str, Any]:
+    return MANIFESTS.stats()
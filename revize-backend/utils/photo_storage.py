@@ -0,0 +1,78 @@
+# utils/photo_storage.py
+# -----------------------------------------------------------------------------
+# Where revision photos live on local disk and how RevisionPhoto.file_path maps
+# to a file.
+#
+# Canonical key = "<revision_id>/<filename>" relative to UPLOAD_ROOT, or the
+# content-addressed "cas/<hh>/<sha256><ext>" shared between revisions
+# (utils/photo_blobs.py). Such keys resolve with a single direct path join. Older rows
+# can hold absolute paths, Windows paths or bare filenames; those still go
+# through candidate guessing until scripts/normalize_photo_storage.py rewrites
+# them to canonical keys.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import re
+from pathlib import Path, PureWindowsPath
+from typing import List, Optional
+
+UPLOAD_ROOT = Path(__file__).resolve().parents[1] / "uploads" / "revision_photos"
+
+_CANONICAL_KEY = re.compile(r"(\d+|cas/[0-9a-f]{2})/[^/\\]+")
+_CAS_KEY = re.compile(r"(revision_photos/)?cas/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+")
+
+
+def local_key(rev_id: int, filename: str) -> str:
+    return f"{rev_id}/{filename}"
+
+
+def is_canonical_key(file_path: Optional[str]) -> bool:
+    return bool(file_path) and _CANONICAL_KEY.fullmatch(str(file_path).strip()) is not None
+
+
+def is_cas_key(file_path: Optional[str]) -> bool:
+    """Obsahově adresovaný klíč (lokální i GCS) – soubor může sdílet víc fotek."""
+    return bool(file_path) and _CAS_KEY.fullmatch(str(file_path).strip()) is not None
+
+
+def revision_dir(rev_id: int) -> Path:
+    return UPLOAD_ROOT / str(rev_id)
+
+
+def legacy_candidates(file_path: str, rev_id: Optional[int] = None) -> List[Path]:
+    """Možná umístění starší hodnoty file_path, v pořadí priority, bez duplicit."""
+    raw = str(file_path).strip()
+    raw_path = Path(raw)
+    candidates: List[Path] = [raw_path if raw_path.is_absolute() else UPLOAD_ROOT / raw_path]
+
+    basename = PureWindowsPath(raw).name or raw_path.name
+    if rev_id is not None and basename:
+        candidates.append(revision_dir(rev_id) / basename)
+    if basename:
+        candidates.append(UPLOAD_ROOT / basename)
+
+    seen: set[str] = set()
+    ordered: List[Path] = []
+    for candidate in candidates:
+        if str(candidate) not in seen:
+            seen.add(str(candidate))
+            ordered.append(candidate)
+    return ordered
+
+
+def resolve_local_path(file_path: Optional[str], rev_id: Optional[int] = None) -> Optional[Path]:
+    """
+    Kanonický klíč -> přímo cesta (žádný stat navíc). Starší hodnoty -> první
+    existující kandidát, jinak první kandidát (volající hlásí 404).
+    """
+    if not file_path or not str(file_path).strip():
+        return None
+    raw = str(file_path).strip()
+    if is_canonical_key(raw):
+        return UPLOAD_ROOT / raw
+    candidates = legacy_candidates(raw, rev_id)
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    return candidates[0] if candidates else None
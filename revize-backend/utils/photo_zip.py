@@ -0,0 +1,134 @@
+# utils/photo_zip.py
+# -----------------------------------------------------------------------------
+# ZIP archives of revision photos, streamed while they are being built.
+#
+# zipfile writes into a sink that is drained after every chunk, so a response
+# never holds more than about one chunk of the archive. The output is not
+# seekable, so entries carry data descriptors; they are ZIP_STORED (JPEG does
+# not compress) and switch to ZIP64 as needed, so multi-GB projects work.
+#
+# Entry contents come from callables. prefetch() downloads the next few small
+# entries in a thread pool while the current one is written (read-ahead for
+# remote storage). Memory stays bounded at about workers * max_bytes; larger
+# entries are streamed when their turn comes.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Set
+
+CHUNK_SIZE = 256 * 1024
+
+_UNSAFE_NAME = re.compile(r'[\x00-\x1f<>:"/\\|?*]+')
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    name: str
+    size: int  # očekávaná velikost (rozhoduje o ZIP64); skutečná se zapíše do data descriptoru
+    modified: Optional[datetime]
+    # obsah po částech; None = soubor v úložišti chybí, položka se vynechá
+    open: Callable[[], Optional[Iterable[bytes]]]
+
+
+class _Sink:
+    """Nepřevíjitelný výstup pro zipfile; stream si zapsaná data průběžně odebírá."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def entry_name(label: str, ext: str, taken: Set[str], folder: str = "") -> str:
+    """Bezpečné a v archivu jedinečné jméno položky (popisek -> soubor)."""
+    base = _UNSAFE_NAME.sub("_", label).strip(" ._")[:80].rstrip(" ._") or "foto"
+    prefix = f"{folder}/" if folder else ""
+    name, n = f"{prefix}{base}{ext}", 2
+    while name.lower() in taken:
+        name, n = f"{prefix}{base} ({n}){ext}", n + 1
+    taken.add(name.lower())
+    return name
+
+
+def folder_name(label: str) -> str:
+    return _UNSAFE_NAME.sub("_", label).strip(" ._")[:80] or "revize"
+
+
+def stream_zip(entries: Iterable[ZipEntry], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for entry in entries:
+            chunks = entry.open()
+            if chunks is None:
+                continue
+            modified = entry.modified or datetime.now()
+            info = zipfile.ZipInfo(entry.name, date_time=max(modified, datetime(1980, 1, 1)).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = entry.size
+            with archive.open(info, mode="w") as target:
+                for chunk in chunks:
+                    target.write(chunk)
+                    if len(sink) >= chunk_size:
+                        yield sink.drain()
+            if len(sink) >= chunk_size:
+                yield sink.drain()
+    # zbytek + centrální adresář
+    yield sink.drain()
+
+
+def _materialize(entry: ZipEntry) -> Optional[List[bytes]]:
+    chunks = entry.open()
+    return None if chunks is None else list(chunks)
+
+
+def prefetch(entries: List[ZipEntry], workers: int, max_bytes: int) -> Iterator[ZipEntry]:
+    """
+    Položky v původním pořadí; ty do `max_bytes` se stahují dopředu (okno `workers`
+    položek), větší se otevřou až na řadě.
+    """
+    if workers <= 1:
+        yield from entries
+        return
+    pending: Deque = deque()
+    upcoming = iter(entries)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo-zip")
+
+    def refill() -> None:
+        for entry in upcoming:
+            pending.append((entry, pool.submit(_materialize, entry) if entry.size <= max_bytes else None))
+            return
+
+    try:
+        for _ in range(workers):
+            refill()
+        while pending:
+            entry, future = pending.popleft()
+            refill()
+            if future is None:
+                yield entry
+            else:
+                chunks = future.result()
+                yield replace(entry, open=lambda chunks=chunks: chunks)
+    finally:
+        # klient odpojen -> nestahovat zbytek okna
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,94 @@
+# utils/raw_json.py
+# -----------------------------------------------------------------------------
+# Fast JSON helpers for large documents (revision data_json).
+# - dumps()/loads() use orjson when it is installed, stdlib json otherwise
+# - object_bytes() turns a stored JSON value into object bytes, parsing only
+#   when the stored text is not already a JSON object
+# - splice_field() appends a pre-encoded JSON value to an encoded envelope
+# - content_hash() is a sha256 of the canonical (sorted-key) encoding
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Union
+
+try:  # volitelná závislost – bez ní se použije stdlib json
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+_EMPTY_OBJECT = b"{}"
+_WHITESPACE = b" \t\r\n"
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson neumí např. int > 64 bit nebo ne-str klíče -> stdlib
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def canonical_dumps(obj: Any) -> bytes:
+    """Deterministické kódování (seřazené klíče, bez mezer) pro hashování."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def content_hash(obj: Any) -> str:
+    return hashlib.sha256(canonical_dumps(obj)).hexdigest()
+
+
+def loads(raw: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def object_bytes(raw: Any) -> bytes:
+    """
+    Stored data_json -> JSON object bytes.
+
+    Text, který už je JSON objekt, se vrací beze změny (bez parsování).
+    Dvojitě zakódovaný string se rozbalí, cokoliv jiného než objekt je `{}`.
+    """
+    if raw is None:
+        return _EMPTY_OBJECT
+    if isinstance(raw, dict):
+        return dumps(raw)
+    if isinstance(raw, memoryview):
+        raw = raw.tobytes()
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if not isinstance(raw, (bytes, bytearray)):
+        return _EMPTY_OBJECT
+
+    body = bytes(raw).strip(_WHITESPACE)
+    if body.startswith(b"{"):
+        return body
+
+    try:
+        value = loads(body)
+        if isinstance(value, str):
+            value = loads(value)
+    except ValueError:
+        return _EMPTY_OBJECT
+    return dumps(value) if isinstance(value, dict) else _EMPTY_OBJECT
+
+
+def splice_field(envelope: bytes, key: str, raw_value: bytes) -> bytes:
+    """Přidej `"key": <raw_value>` na konec zakódovaného JSON objektu `envelope`."""
+    head = envelope.rstrip(_WHITESPACE)
+    if not head.endswith(b"}"):
+        raise ValueError("envelope must be an encoded JSON object")
+    head = head[:-1].rstrip(_WHITESPACE)
+    sep = b"" if head.endswith(b"{") else b","
+    return b"".join((head, sep, json.dumps(key).encode("utf-8"), b":", raw_value, b"}"))
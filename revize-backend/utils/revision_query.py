@@ -0,0 +1,146 @@
+# utils/revision_query.py
+# -----------------------------------------------------------------------------
+# Structured filters over known paths in revision data_json, pushed into SQL.
+#
+# Postgres: exact matches are jsonb containment (data_json @> {...}) served by
+# the GIN jsonb_path_ops index; prefix matches use jsonb_path_exists().
+# SQLite: json_each() / json_extract(); typRevize has an expression index
+# (same literal path as in the index, so the planner can use it).
+#
+# Compressed documents (utils/compressed_json.py) cannot be inspected in SQL;
+# the caller selects them as candidates and checks them with matches().
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, func, literal, literal_column, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+
+
+@dataclass(frozen=True)
+class DocField:
+    # cesta v data_json; "x[]" = pole objektů/hodnot, poslední prvek je klíč hodnoty (nebo None = prvek pole)
+    path: Tuple[Optional[str], ...]
+    prefix: bool = False  # True = hodnota začíná zadaným textem, jinak přesná shoda
+
+
+# název query parametru -> pole v dokumentu
+DOC_FIELDS: Dict[str, DocField] = {
+    "board_manufacturer": DocField(("boards[]", "vyrobce")),
+    "component": DocField(("boards[]", "komponenty[]", "nazev")),
+    "component_type": DocField(("boards[]", "komponenty[]", "typ")),
+    "defect_standard": DocField(("defects[]", "standard"), prefix=True),
+    "norm": DocField(("norms[]", None), prefix=True),  # normy se ukládají i s názvem („ČSN 33 2000-6 ed.2 – …“)
+    "revision_type": DocField(("typRevize",)),
+    # conclusion.safety se filtruje přes revision_summaries.conclusion_safety (utils/revision_summary.py)
+}
+
+
+def criteria_from_params(**params: Optional[str]) -> List[Tuple[DocField, str]]:
+    out = []
+    for name, value in params.items():
+        if value is not None and value.strip():
+            out.append((DOC_FIELDS[name], value.strip()))
+    return out
+
+
+def _is_array(segment: Optional[str]) -> bool:
+    return segment is not None and segment.endswith("[]")
+
+
+def _key(segment: str) -> str:
+    return segment[:-2] if _is_array(segment) else segment
+
+
+# ---------- Python (komprimované dokumenty) ----------
+
+def _values(node: Any, path: Tuple[Optional[str], ...]) -> List[Any]:
+    if not path:
+        return [node]
+    segment, rest = path[0], path[1:]
+    if segment is None:
+        return [node]
+    if not isinstance(node, dict) or _key(segment) not in node:
+        return []
+    child = node[_key(segment)]
+    if _is_array(segment):
+        return [v for item in (child if isinstance(child, list) else []) for v in _values(item, rest)]
+    return _values(child, rest)
+
+
+def _value_matches(value: Any, field: DocField, expected: str) -> bool:
+    if not isinstance(value, str):
+        return False
+    return value.startswith(expected) if field.prefix else value == expected
+
+
+def matches(doc: Any, criteria: List[Tuple[DocField, str]]) -> bool:
+    return all(
+        any(_value_matches(v, field, expected) for v in _values(doc, field.path))
+        for field, expected in criteria
+    )
+
+
+# ---------- Postgres ----------
+
+def _containment(path: Tuple[Optional[str], ...], value: Any) -> Any:
+    node = value
+    for segment in reversed(path):
+        if segment is None:
+            continue
+        node = {_key(segment): [node] if _is_array(segment) else node}
+    return node
+
+
+def _jsonpath(path: Tuple[Optional[str], ...]) -> str:
+    out = "$"
+    for segment in path:
+        if segment is None:
+            continue
+        out += '."' + _key(segment).replace('"', '\\"') + '"'
+        if _is_array(segment):
+            out += "[*]"
+    return out + " ? (@ starts with $v)"
+
+
+def _pg_predicate(doc, field: DocField, value: str):
+    doc = type_coerce(doc, JSONB)
+    if not field.prefix:
+        return doc.op("@>")(literal(_containment(field.path, value), JSONB))
+    return func.jsonb_path_exists(doc, literal(_jsonpath(field.path), JSONPATH), func.jsonb_build_object("v", value))
+
+
+# ---------- SQLite ----------
+
+def _sqlite_path(keys: List[str]) -> str:
+    return "$" + "".join("." + k for k in keys)
+
+
+def _sqlite_predicate(doc, field: DocField, value: str):
+    *containers, leaf = field.path
+    source, keys, sources = doc, [], []
+    for segment in containers:
+        keys.append(_key(segment))
+        if _is_array(segment):
+            each = func.json_each(source, _sqlite_path(keys)).table_valued("value").alias(f"je{len(sources)}")
+            sources.append(each)
+            source, keys = each.c.value, []
+
+    if leaf is None:  # prvek pole hodnot (norms[])
+        target = source
+    else:
+        keys.append(leaf)
+        # konstantní cesta (ne bind parametr), aby šel použít výrazový index
+        target = func.json_extract(source, literal_column("'" + _sqlite_path(keys) + "'"))
+
+    condition = func.substr(target, 1, len(value)) == value if field.prefix else target == value
+    if not sources:
+        return condition
+    return exists(select(literal(1)).select_from(*sources).where(condition))
+
+
+def sql_predicate(doc, field: DocField, value: str, postgres: bool):
+    return _pg_predicate(doc, field, value) if postgres else _sqlite_predicate(doc, field, value)
@@ -0,0 +1,144 @@
+# utils/revision_summary.py
+# -----------------------------------------------------------------------------
+# Denormalized facts from revision data_json (board / component / defect
+# counts, conclusion safety, client name, next revision date) kept in the
+# revision_summaries sidecar table, so listings can filter and sort on them
+# without loading the document.
+#
+# The row is upserted from mapper events whenever data_json is inserted or
+# changed through the ORM. The Postgres JSON patch pushdown (Core UPDATE)
+# computes the same facts in SQL via summary_returning() instead.
+# scripts/backfill_revision_summaries.py fills rows for existing revisions.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, and_, case, column, event, func, inspect, literal, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Revision, RevisionSummary
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return ""
+    return str(value).strip()
+
+
+def _list(value: Any) -> list:
+    return value if isinstance(value, list) else []
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(_text(value)[:10])
+    except ValueError:
+        return None
+
+
+def _scalar_facts(conclusion: Any, client: Any) -> Dict[str, Any]:
+    conclusion = conclusion if isinstance(conclusion, dict) else {}
+    return {
+        "conclusion_safety": _text(conclusion.get("safety"))[:20] or None,
+        "client_name": _text(client) or None,
+        "next_revision_date": _parse_date(conclusion.get("validUntil")),
+    }
+
+
+def summarize(doc: Any) -> Dict[str, Any]:
+    """data_json -> hodnoty sloupců revision_summaries."""
+    doc = doc if isinstance(doc, dict) else {}
+    boards = _list(doc.get("boards"))
+    return {
+        "board_count": len(boards),
+        "component_count": sum(len(_list(b.get("komponenty"))) for b in boards if isinstance(b, dict)),
+        "defect_count": sum(
+            1 for d in _list(doc.get("defects")) if isinstance(d, dict) and _text(d.get("description"))
+        ),
+        **_scalar_facts(doc.get("conclusion"), doc.get("objednatel")),
+    }
+
+
+def upsert_statement(dialect_name: str, revision_id: int, values: Dict[str, Any]):
+    table = RevisionSummary.__table__
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    row = {**values, "updated_at": datetime.utcnow()}
+    return (
+        insert(table)
+        .values(revision_id=revision_id, **row)
+        .on_conflict_do_update(index_elements=[table.c.revision_id], set_=row)
+    )
+
+
+# ---------- ORM zápisy ----------
+
+@event.listens_for(Revision, "after_insert")
+def _summary_after_insert(mapper, connection, target) -> None:
+    connection.execute(upsert_statement(connection.dialect.name, target.id, summarize(target.data_json)))
+
+
+@event.listens_for(Revision, "after_update")
+def _summary_after_update(mapper, connection, target) -> None:
+    if inspect(target).attrs.data_json.history.has_changes():
+        connection.execute(upsert_statement(connection.dialect.name, target.id, summarize(target.data_json)))
+
+
+# ---------- Postgres pushdown (UPDATE ... RETURNING) ----------
+
+def _jsonb_array(node):
+    return case((func.jsonb_typeof(node) == "array", node), else_=literal([], JSONB))
+
+
+def summary_returning(doc) -> list:
+    """
+    RETURNING výrazy pro nový jsonb dokument `doc`; výsledek převede
+    summary_from_returning(). Počty se spočtou v DB, zbytek v Pythonu.
+    """
+    doc = type_coerce(doc, JSONB)
+    boards = func.jsonb_array_elements(_jsonb_array(doc["boards"])).table_valued(column("value", JSONB)).alias("board")
+    defects = func.jsonb_array_elements(_jsonb_array(doc["defects"])).table_valued(column("value", JSONB)).alias("defect")
+    components = boards.c.value["komponenty"]
+    description = defects.c.value["description"]
+    return [
+        func.jsonb_array_length(_jsonb_array(doc["boards"])).label("board_count"),
+        select(
+            func.coalesce(
+                func.sum(
+                    case(
+                        (func.jsonb_typeof(components) == "array", func.jsonb_array_length(components)),
+                        else_=0,
+                    )
+                ),
+                0,
+            ).cast(Integer)
+        )
+        .select_from(boards)
+        .scalar_subquery()
+        .label("component_count"),
+        select(func.count())
+        .select_from(defects)
+        .where(
+            and_(
+                func.jsonb_typeof(description).in_(["string", "number"]),
+                func.btrim(description.astext, " \t\r\n") != "",
+            )
+        )
+        .scalar_subquery()
+        .label("defect_count"),
+        doc["conclusion"].label("summary_conclusion"),
+        doc["objednatel"].label("summary_client"),
+    ]
+
+
+def summary_from_returning(row) -> Dict[str, Any]:
+    m = row._mapping
+    return {
+        "board_count": m["board_count"] or 0,
+        "component_count": m["component_count"] or 0,
+        "defect_count": m["defect_count"] or 0,
+        **_scalar_facts(m["summary_conclusion"], m["summary_client"]),
+    }
@@ -0,0 +1,229 @@
+# utils/upload_limits.py
+# -----------------------------------------------------------------------------
+# Upload size enforcement without buffering whole payloads in memory.
+#
+# - BodySizeLimitMiddleware rejects requests to registered upload routes with
+#   413: up front from Content-Length, otherwise as soon as the streamed body
+#   crosses the limit (before the multipart parser has read all of it)
+# - spool_multipart() parses a multipart body straight from the request stream:
+#   each file part is written once, to a named temp file (the image pipeline in
+#   another process opens it by path), and hashed and size-checked on the way.
+#   No Starlette SpooledTemporaryFile and no second copy.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Pattern, Tuple
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import FormData, Headers, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+SPOOL_DIR = (os.getenv("UPLOAD_SPOOL_DIR") or "").strip() or None
+
+_LIMITS: List[Tuple[str, Pattern[str], int]] = []
+
+
+def register_upload_limit(method: str, path_pattern: str, max_bytes: int) -> None:
+    """Limit celé velikosti těla požadavku pro danou routu (regex nad celou cestou)."""
+    _LIMITS.append((method.upper(), re.compile(path_pattern), max_bytes))
+
+
+def _limit_for(method: str, path: str) -> Optional[int]:
+    for limit_method, pattern, max_bytes in _LIMITS:
+        if limit_method == method and pattern.fullmatch(path):
+            return max_bytes
+    return None
+
+
+def _too_large_detail(limit: int) -> str:
+    return f"Request body exceeds {limit // (1024 * 1024)} MB"
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = _limit_for(scope["method"], scope["path"])
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": _too_large_detail(limit)}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI propaguje HTTPException z parsování těla beze změny
+                    raise HTTPException(413, detail=_too_large_detail(limit))
+            return message
+
+        return await self.app(scope, limited_receive, send)
+
+
+# ---------- spool ----------
+
+class SpoolFile:
+    """
+    Pojmenovaný dočasný soubor jedné souborové části. Data se průběžně hashují
+    (sha256 originálu pro dedup) a počítají; po překročení `max_bytes` se zbytek
+    části zahodí a `too_large` je True. close() soubor i smaže.
+    """
+
+    def __init__(self, max_bytes: int, suffix: str = "") -> None:
+        fd, name = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=SPOOL_DIR)
+        self.path = Path(name)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.too_large = False
+        self.digest = hashlib.sha256()
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.too_large or self.size > self.max_bytes:
+            if not self.too_large:
+                self.too_large = True
+                self._file.truncate(0)
+            return
+        self.digest.update(data)
+        self._file.write(data)
+
+    def finish(self) -> None:
+        # zapsáno celé – proces pipeline může soubor otevřít
+        self._file.close()
+
+    def close(self) -> None:
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+def spooled(upload: UploadFile) -> SpoolFile:
+    return upload.file  # type: ignore[return-value]
+
+
+def form_files(form: FormData, field: str) -> List[UploadFile]:
+    return [item for item in form.getlist(field) if isinstance(item, UploadFile)]
+
+
+async def spool_multipart(
+    request: Request,
+    max_file_bytes: int,
+    max_files: int,
+    max_field_bytes: int = 64 * 1024,
+) -> FormData:
+    """
+    multipart/form-data z request.stream() -> FormData; soubory jsou UploadFile nad
+    SpoolFile (spooled(upload).path / .size / .digest / .too_large). Zápis na disk
+    běží ve vlákně. Volající po zpracování zavolá `await form.close()`.
+    400 = nečitelné tělo, 413 = víc než `max_files` souborů.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(400, detail="Expected a multipart/form-data body")
+
+    items: List[Tuple[str, object]] = []
+    part: dict = {}
+    pending: List[Tuple[SpoolFile, Optional[bytes]]] = []  # (soubor, data | None = konec části)
+    header: List[bytes] = [b"", b""]
+    files = 0
+
+    def on_part_begin() -> None:
+        part.clear()
+        part["headers"] = []
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header[0] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header[1] += data[start:end]
+
+    def on_header_end() -> None:
+        part["headers"].append((header[0].lower(), header[1]))
+        header[0] = header[1] = b""
+
+    def on_headers_finished() -> None:
+        nonlocal files
+        headers = dict(part["headers"])
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise HTTPException(400, detail="Multipart part without a name")
+        part["name"] = options[b"name"].decode("utf-8", "replace")
+        if b"filename" not in options:
+            part["data"] = bytearray()
+            return
+        files += 1
+        if files > max_files:
+            raise HTTPException(413, detail=f"At most {max_files} files per request")
+        filename = options[b"filename"].decode("utf-8", "replace")
+        spool = SpoolFile(max_file_bytes, suffix=Path(filename).suffix.lower()[:10])
+        part["file"] = spool
+        items.append((part["name"], UploadFile(spool, size=None, filename=filename, headers=Headers(raw=part["headers"]))))  # type: ignore[arg-type]
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if "file" in part:
+            pending.append((part["file"], data[start:end]))
+            return
+        part["data"] += data[start:end]
+        if len(part["data"]) > max_field_bytes:
+            raise HTTPException(413, detail="Form field is too large")
+
+    def on_part_end() -> None:
+        if "file" in part:
+            pending.append((part["file"], None))
+        else:
+            items.append((part["name"], part["data"].decode("utf-8", "replace")))
+
+    def flush(batch: List[Tuple[SpoolFile, Optional[bytes]]]) -> None:
+        for spool, data in batch:
+            if data is None:
+                spool.finish()
+            else:
+                spool.write(data)
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if pending:
+                batch, pending[:] = list(pending), []
+                await asyncio.to_thread(flush, batch)
+        parser.finalize()
+    except BaseException as exc:
+        await FormData(items).close()
+        if isinstance(exc, MultipartParseError):
+            raise HTTPException(400, detail="Malformed multipart body")
+        raise
+    return FormData(items)